@@ -3,12 +3,13 @@ Database models for Persian Invoicing System
 Enhanced with proper decimal handling and Persian date support
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Boolean, Text, Index, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import TypeDecorator, DECIMAL
 from datetime import datetime
-import jdatetime
+from services.persian_utils import format_amount, jalali_date, parse_number
 
 Base = declarative_base()
 
@@ -22,23 +23,9 @@ class PersianDecimal(TypeDecorator):
         # Convert to integer (remove decimal parts for Iranian currency)
         if isinstance(value, (int, float)):
             return int(value)
-        # Handle string input
+        # Handle string input with separators and Persian digits
         if isinstance(value, str):
-            # Remove commas and convert Persian digits
-            value = value.replace(',', '').replace('٬', '')
-            persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-            arabic_digits = '٠١٢٣٤٥٦٧٨٩'
-            english_digits = '0123456789'
-            
-            for i, persian_digit in enumerate(persian_digits):
-                value = value.replace(persian_digit, english_digits[i])
-            for i, arabic_digit in enumerate(arabic_digits):
-                value = value.replace(arabic_digit, english_digits[i])
-            
-            try:
-                return int(float(value))
-            except (ValueError, TypeError):
-                return 0
+            return parse_number(value)
         return int(value) if value else 0
     
     def process_result_value(self, value, dialect):
@@ -58,12 +45,17 @@ class Product(Base):
     """Product inventory model with enhanced validation"""
     __tablename__ = 'products'
     
+    DEFAULT_REORDER_THRESHOLD = 5
+    DEFAULT_TAX_RATE = 0
+    
     id = Column(Integer, primary_key=True)
     name = Column(String(200), nullable=False)
     # Removed code field as requested
     purchase_price = Column(PersianDecimal, default=0, nullable=False)
     sale_price = Column(PersianDecimal, default=0, nullable=False)
     stock_quantity = Column(Integer, default=0, nullable=False)
+    reorder_threshold = Column(Integer, default=DEFAULT_REORDER_THRESHOLD, nullable=False)
+    tax_rate = Column(Integer, default=DEFAULT_TAX_RATE, nullable=False)  # VAT in basis points: 1000 is 10%
     # Removed unit field as requested - all items are counted as numbers
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -73,18 +65,36 @@ class Product(Base):
     # Relationship with invoice items
     invoice_items = relationship("InvoiceItem", back_populates="product")
     
+    __table_args__ = (
+        # Only low-stock rows are indexed, so the low-stock list never scans all products
+        Index('ix_products_low_stock', 'stock_quantity',
+              sqlite_where=text('stock_quantity <= reorder_threshold AND is_active = 1')),
+        # Active names are unique, which bulk import upserts against
+        Index('ux_products_active_name', 'name', unique=True, sqlite_where=text('is_active = 1')),
+    )
+    
     def __repr__(self):
         return f"<Product(name='{self.name}', sale_price={self.sale_price})>"
     
     @property
     def formatted_sale_price(self):
         """Return formatted price with thousand separators"""
-        return f"{self.sale_price:,} تومان"
+        return format_amount(self.sale_price)
     
     @property
     def formatted_purchase_price(self):
         """Return formatted purchase price with thousand separators"""
-        return f"{self.purchase_price:,} تومان"
+        return format_amount(self.purchase_price)
+    
+    @property
+    def tax_percent(self):
+        """VAT rate as a percentage"""
+        return (self.tax_rate or 0) / 100
+    
+    @hybrid_property
+    def is_low_stock(self):
+        """Whether stock is at or below the product's reorder threshold"""
+        return self.stock_quantity <= self.reorder_threshold
 
 class Invoice(Base):
     """Invoice model with Persian date support"""
@@ -98,7 +108,8 @@ class Invoice(Base):
     issue_date = Column(DateTime, default=datetime.now)
     total_amount = Column(PersianDecimal, default=0)
     discount_amount = Column(PersianDecimal, default=0)
-    final_amount = Column(PersianDecimal, default=0)
+    tax_amount = Column(PersianDecimal, default=0)  # VAT of all lines
+    final_amount = Column(PersianDecimal, default=0)  # total - discount + tax
     notes = Column(Text)
     background_image_path = Column(String(500))  # New field for custom background
     header_text = Column(Text)  # New field for custom header
@@ -115,24 +126,20 @@ class Invoice(Base):
     @property
     def persian_date(self):
         """Return Persian date string"""
-        if self.issue_date:
-            jdate = jdatetime.datetime.fromgregorian(datetime=self.issue_date)
-            return jdate.strftime('%Y/%m/%d')
-        return ""
+        return jalali_date(self.issue_date)
     
     @property
     def formatted_total(self):
         """Return formatted total with thousand separators"""
-        return f"{self.final_amount:,} تومان"
+        return format_amount(self.final_amount)
     
     @classmethod
     def generate_invoice_number(cls, session):
         """Generate invoice number based on Persian date"""
         now = datetime.now()
-        jdate = jdatetime.datetime.fromgregorian(datetime=now)
         
         # Format: INV-YYYYMMDD-NNNN
-        date_part = jdate.strftime('%Y%m%d')
+        date_part = jalali_date(now).replace('/', '')
         
         # Find last invoice for today
         prefix = f"INV-{date_part}-"
@@ -159,6 +166,9 @@ class InvoiceItem(Base):
     quantity = Column(Integer, nullable=False, default=1)
     unit_price = Column(PersianDecimal, nullable=False)
     total_price = Column(PersianDecimal, nullable=False)
+    discount_amount = Column(PersianDecimal, default=0, nullable=False)  # Share of the invoice discount
+    tax_rate = Column(Integer, default=0, nullable=False)  # Product's VAT rate when sold, in basis points
+    tax_amount = Column(PersianDecimal, default=0, nullable=False)
     
     # Relationships
     invoice = relationship("Invoice", back_populates="items")
@@ -170,7 +180,190 @@ class InvoiceItem(Base):
     @property
     def formatted_total(self):
         """Return formatted total with thousand separators"""
-        return f"{self.total_price:,} تومان"
+        return format_amount(self.total_price)
+
+class StockMovement(Base):
+    """Append-only stock ledger entry"""
+    __tablename__ = 'stock_movements'
+    
+    SALE = 'sale'
+    PURCHASE = 'purchase'
+    ADJUSTMENT = 'adjustment'
+    RETURN = 'return'
+    
+    TYPE_LABELS = {
+        SALE: 'فروش',
+        PURCHASE: 'خرید',
+        ADJUSTMENT: 'اصلاح موجودی',
+        RETURN: 'مرجوعی'
+    }
+    
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    movement_type = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False)  # Signed: negative for outgoing stock
+    balance_after = Column(Integer, nullable=False)  # On-hand quantity after this movement
+    reference = Column(String(50))  # Invoice number or other document
+    note = Column(Text)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    
+    product = relationship("Product")
+    
+    __table_args__ = (
+        Index('ix_stock_movements_product_id', 'product_id', 'id'),
+        Index('ix_stock_movements_created_at', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<StockMovement(product_id={self.product_id}, type='{self.movement_type}', quantity={self.quantity})>"
+    
+    @property
+    def type_label(self):
+        """Persian label of the movement type"""
+        return self.TYPE_LABELS.get(self.movement_type, self.movement_type)
+
+class StockSnapshot(Base):
+    """Checkpoint of a product's on-hand quantity for point-in-time queries"""
+    __tablename__ = 'stock_snapshots'
+    
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)  # Movements up to this id are included
+    taken_at = Column(DateTime, default=datetime.now, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_stock_snapshots_taken_at', 'taken_at'),
+    )
+
+class DailySalesSummary(Base):
+    """Sales totals of one day, kept up to date as invoices are issued and cancelled"""
+    __tablename__ = 'daily_sales_summary'
+    
+    sale_date = Column(Date, primary_key=True)  # Gregorian date
+    jalali_key = Column(Integer, nullable=False)  # Persian date as YYYYMMDD
+    invoice_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Integer, default=0, nullable=False)  # Sum of final amounts
+    discount = Column(Integer, default=0, nullable=False)
+    items_sold = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_daily_sales_summary_jalali_key', 'jalali_key'),
+    )
+    
+    def __repr__(self):
+        return f"<DailySalesSummary(date={self.sale_date}, invoices={self.invoice_count}, revenue={self.revenue})>"
+
+class MonthlyTaxSummary(Base):
+    """VAT totals of one Persian month and rate, kept up to date as invoices are issued and cancelled"""
+    __tablename__ = 'monthly_tax_summary'
+    
+    year = Column(Integer, primary_key=True)  # Persian year
+    month = Column(Integer, primary_key=True)  # Persian month
+    tax_rate = Column(Integer, primary_key=True)  # Basis points
+    line_count = Column(Integer, default=0, nullable=False)
+    taxable_amount = Column(Integer, default=0, nullable=False)  # Line totals after discount
+    tax_amount = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<MonthlyTaxSummary({self.year}/{self.month:02d}, rate={self.tax_rate}, tax={self.tax_amount})>"
+
+class PriceUpdate(Base):
+    """One bulk repricing run, kept so it can be undone"""
+    __tablename__ = 'price_updates'
+    
+    id = Column(Integer, primary_key=True)
+    description = Column(String(500))  # Rule as shown to the user
+    product_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    undone_at = Column(DateTime)
+    
+    items = relationship("PriceUpdateItem", back_populates="price_update", cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<PriceUpdate(id={self.id}, products={self.product_count})>"
+
+class PriceUpdateItem(Base):
+    """Sale price of one product before and after a bulk repricing run"""
+    __tablename__ = 'price_update_items'
+    
+    id = Column(Integer, primary_key=True)
+    price_update_id = Column(Integer, ForeignKey('price_updates.id'), nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    old_price = Column(PersianDecimal, nullable=False)
+    new_price = Column(PersianDecimal, nullable=False)
+    
+    price_update = relationship("PriceUpdate", back_populates="items")
+    
+    __table_args__ = (
+        Index('ix_price_update_items_update_id', 'price_update_id', 'product_id'),
+    )
+
+class AuditEvent(Base):
+    """Append-only record of a security-relevant action"""
+    __tablename__ = 'audit_events'
+    
+    INVOICE_CREATED = 'invoice_created'
+    INVOICE_CANCELLED = 'invoice_cancelled'
+    PRODUCT_UPDATED = 'product_updated'
+    PRODUCT_DELETED = 'product_deleted'
+    PRODUCTS_IMPORTED = 'products_imported'
+    PRICES_UPDATED = 'prices_updated'
+    PRICE_UPDATE_UNDONE = 'price_update_undone'
+    LOGIN_SUCCEEDED = 'login_succeeded'
+    LOGIN_FAILED = 'login_failed'
+    BACKUP_CREATED = 'backup_created'
+    BACKUP_FAILED = 'backup_failed'
+    
+    TYPE_LABELS = {
+        INVOICE_CREATED: 'صدور فاکتور',
+        INVOICE_CANCELLED: 'ابطال فاکتور',
+        PRODUCT_UPDATED: 'ویرایش کالا',
+        PRODUCT_DELETED: 'حذف کالا',
+        PRODUCTS_IMPORTED: 'ورود گروهی کالا',
+        PRICES_UPDATED: 'تغییر گروهی قیمت',
+        PRICE_UPDATE_UNDONE: 'بازگردانی تغییر قیمت',
+        LOGIN_SUCCEEDED: 'ورود موفق',
+        LOGIN_FAILED: 'ورود ناموفق',
+        BACKUP_CREATED: 'پشتیبان‌گیری',
+        BACKUP_FAILED: 'خطای پشتیبان‌گیری'
+    }
+    
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    event_type = Column(String(30), nullable=False)
+    username = Column(String(50))
+    target = Column(String(200))  # Invoice number, product name, backup file...
+    details = Column(Text)
+    
+    __table_args__ = (
+        Index('ix_audit_events_created_at', 'created_at'),
+        Index('ix_audit_events_type', 'event_type', 'created_at'),
+    )
+    
+    @property
+    def type_label(self):
+        """Persian name of the event type"""
+        return self.TYPE_LABELS.get(self.event_type, self.event_type)
+
+class JalaliCalendarDay(Base):
+    """Calendar dimension: one Gregorian day with its Persian calendar attributes"""
+    __tablename__ = 'jalali_calendar'
+    
+    gregorian_date = Column(Date, primary_key=True)
+    jalali_key = Column(Integer, unique=True, nullable=False)  # YYYYMMDD
+    jalali_date = Column(String(10), nullable=False)  # YYYY/MM/DD
+    year = Column(Integer, nullable=False)  # Also the fiscal year
+    month = Column(Integer, nullable=False)
+    day = Column(Integer, nullable=False)
+    weekday = Column(Integer, nullable=False)  # Saturday = 0
+    week_of_year = Column(Integer, nullable=False)
+    fiscal_quarter = Column(Integer, nullable=False)
+    is_holiday = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_jalali_calendar_year_month', 'year', 'month'),
+    )
 
 class Settings(Base):
     """Application settings model"""
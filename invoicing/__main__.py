@@ -0,0 +1,9 @@
+"""
+Command Line Entry Point for Persian Invoicing System
+Runs the headless command line with python -m invoicing
+"""
+
+import sys
+from invoicing.cli import main
+
+sys.exit(main())
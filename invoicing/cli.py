@@ -0,0 +1,243 @@
+"""
+Command Line Interface for Persian Invoicing System
+Reports, exports, backups, maintenance, imports and benchmarks without Qt
+"""
+
+import argparse
+import csv
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+REPORT_TYPES = ('sales', 'products', 'customers', 'stock', 'monthly', 'quarterly', 'yearly',
+                'tax_monthly', 'tax_quarterly')
+
+def parse_date(text):
+    """Date from YYYY/MM/DD or YYYY-MM-DD text; years before 1700 are Persian"""
+    import jdatetime
+    from services.persian_utils import to_latin_digits
+
+    try:
+        year, month, day = (int(part) for part in to_latin_digits(text).replace('-', '/').split('/'))
+        if year < 1700:
+            return jdatetime.date(year, month, day).togregorian()
+        return date(year, month, day)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {text}")
+
+def default_start_date():
+    """First day of the current Persian year"""
+    import jdatetime
+
+    return jdatetime.date(jdatetime.date.today().year, 1, 1).togregorian()
+
+def setup_logging(verbose):
+    """Log to logs/database.log, and to stderr for warnings unless verbose"""
+    os.makedirs('logs', exist_ok=True)
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO if verbose else logging.WARNING)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler('logs/database.log'), console]
+    )
+
+def open_database(args):
+    """Database service on the --database file"""
+    from services.database_service import DatabaseService
+
+    return DatabaseService(args.database)
+
+def report_progress(args, label):
+    """Progress callback printing to a terminal on stderr, or None when --quiet or unattended"""
+    if args.quiet or not sys.stderr.isatty():
+        return None
+    return lambda value, *_: print(f"\r{label}: {value:,}", end='', file=sys.stderr, flush=True)
+
+def end_progress(args):
+    """Finish a progress line on stderr"""
+    if not args.quiet and sys.stderr.isatty():
+        print(file=sys.stderr)
+
+def command_report(args):
+    """Write a report to standard output as tab-separated text"""
+    from services.export_pipeline import report_export, transform_rows
+
+    db_service = open_database(args)
+    export = report_export(args.report_type)
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow([column.title for column in export.columns])
+    with db_service.read_snapshot(args.start_date, args.end_date) as snapshot:
+        writer.writerows(transform_rows(export.columns, export.rows(snapshot), args.persian_digits))
+    return 0
+
+def command_export(args):
+    """Stream a report into a file"""
+    from services.export_pipeline import export_report
+
+    db_service = open_database(args)
+    rows = export_report(
+        db_service, args.report_type, args.start_date, args.end_date, args.output,
+        args.format, args.persian_digits, report_progress(args, "rows")
+    )
+    end_progress(args)
+    print(f"{rows:,} rows written to {args.output}")
+    return 0
+
+def command_backup(args):
+    """Create a verified, rotated backup"""
+    db_service = open_database(args)
+    success, message = db_service.backup_database(report_progress(args, "percent"))
+    end_progress(args)
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+def command_optimize(args):
+    """Quick check, ANALYZE, PRAGMA optimize and vacuum"""
+    from services.maintenance_service import MaintenanceService
+
+    success, message, before, after = MaintenanceService(args.database).optimize(
+        report_progress(args, "percent")
+    )
+    end_progress(args)
+    if not success:
+        print(message, file=sys.stderr)
+        return 1
+    print(message)
+    print(f"size: {before['file_size']:,} -> {after['file_size']:,} bytes, "
+          f"free pages: {before['freelist_count']:,} -> {after['freelist_count']:,}")
+    return 0
+
+def command_import(args):
+    """Upsert products from an Excel or CSV file"""
+    from services.product_import import ProductImporter, write_error_report
+
+    db_service = open_database(args)
+    result = ProductImporter(db_service).import_file(args.file, report_progress(args, "rows"))
+    end_progress(args)
+    print(f"{result.inserted:,} added, {result.updated:,} updated, {len(result.errors):,} rejected")
+
+    if result.errors:
+        if args.errors:
+            write_error_report(args.errors, result.errors)
+            print(f"error report written to {args.errors}")
+        else:
+            for issue in result.errors[:20]:
+                print(f"row {issue.row}: {issue.name}: {issue.message}", file=sys.stderr)
+    return 0
+
+def command_benchmark(args):
+    """Time the main read paths and every report"""
+    from services.export_pipeline import report_export, transform_rows
+
+    db_service = open_database(args)
+
+    def report_rows(report_type):
+        def run():
+            export = report_export(report_type)
+            with db_service.read_snapshot(args.start_date, args.end_date) as snapshot:
+                return sum(1 for _ in transform_rows(export.columns, export.rows(snapshot)))
+        return run
+
+    operations = [
+        ('dashboard', lambda: len(db_service.get_dashboard_stats())),
+        ('products', lambda: len(db_service.get_products())),
+        ('low_stock', lambda: len(db_service.get_low_stock_products())),
+        ('invoices', lambda: len(db_service.get_invoices_in_range(args.start_date, args.end_date))),
+    ] + [(f"report:{report_type}", report_rows(report_type)) for report_type in REPORT_TYPES]
+
+    print(f"{'operation':<24}{'rows':>10}{'best ms':>12}{'median ms':>12}")
+    for name, operation in operations:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = operation()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<24}{rows:>10,}{min(timings):>12.1f}{statistics.median(timings):>12.1f}")
+    return 0
+
+def add_range_arguments(parser):
+    """--from and --to dates, Persian or Gregorian"""
+    parser.add_argument('--from', dest='start_date', type=parse_date, default=None,
+                        help="start date, e.g. 1403/01/01 (default: start of the Persian year)")
+    parser.add_argument('--to', dest='end_date', type=parse_date, default=None,
+                        help="end date, inclusive (default: today)")
+
+def add_common_arguments(parser, suppress_defaults=False):
+    """--database, --quiet and --verbose; suppressed defaults leave values already parsed alone"""
+    def default(value):
+        return argparse.SUPPRESS if suppress_defaults else value
+
+    parser.add_argument('--database', default=default('invoicing.db'), help="database file (default: invoicing.db)")
+    parser.add_argument('-q', '--quiet', action='store_true', default=default(False), help="no progress output")
+    parser.add_argument('-v', '--verbose', action='store_true', default=default(False),
+                        help="log informational messages to stderr")
+
+def build_parser():
+    """Argument parser with one subcommand per operation"""
+    parser = argparse.ArgumentParser(
+        prog='python -m invoicing',
+        description="Persian Invoicing System command line"
+    )
+    add_common_arguments(parser)
+    # The common options are accepted after the command name too
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_arguments(common, suppress_defaults=True)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', parents=[common], help="print a report as tab-separated text")
+    report.add_argument('report_type', choices=REPORT_TYPES)
+    report.add_argument('--persian-digits', action='store_true')
+    add_range_arguments(report)
+    report.set_defaults(handler=command_report)
+
+    export = commands.add_parser('export', parents=[common], help="export a report to a file")
+    export.add_argument('report_type', choices=REPORT_TYPES)
+    export.add_argument('output', help="output file; the format follows its extension")
+    export.add_argument('--format', default=None, help="xlsx, csv, tsv, jsonl or parquet")
+    export.add_argument('--persian-digits', action='store_true')
+    add_range_arguments(export)
+    export.set_defaults(handler=command_export)
+
+    backup = commands.add_parser('backup', parents=[common], help="create a database backup")
+    backup.set_defaults(handler=command_backup)
+
+    optimize = commands.add_parser('optimize', aliases=['vacuum'], parents=[common],
+                                   help="analyze and vacuum the database")
+    optimize.set_defaults(handler=command_optimize)
+
+    product_import = commands.add_parser('import', parents=[common], help="import products from xlsx or csv")
+    product_import.add_argument('file')
+    product_import.add_argument('--errors', default=None, help="write rejected rows to this CSV file")
+    product_import.set_defaults(handler=command_import)
+
+    benchmark = commands.add_parser('benchmark', parents=[common], help="time read paths and reports")
+    benchmark.add_argument('--repeat', type=int, default=3)
+    add_range_arguments(benchmark)
+    benchmark.set_defaults(handler=command_benchmark)
+
+    return parser
+
+def main(argv=None):
+    """Run one command; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    if hasattr(args, 'start_date'):
+        args.start_date = args.start_date or default_start_date()
+        args.end_date = args.end_date or date.today()
+    setup_logging(args.verbose)
+
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Output piped into a command that stopped reading, such as head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except Exception as e:
+        # Logged to the file and, at error level, to stderr
+        logging.getLogger(__name__).error(f"Command {args.command} failed: {e}")
+        return 1
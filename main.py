@@ -5,26 +5,42 @@ Enhanced with login system and improved UI
 
 import sys
 import os
+import math
+from services import startup_timer
+from services.theme_service import ThemeService, set_style_class
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                            QMessageBox, QFrame, QSizePolicy)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont, QPixmap, QPalette, QColor, QIcon
-from main_window import MainWindow
-from services.database_service import DatabaseService
 import hashlib
+from views.lock_screen import AuthenticationThread
 
 class LoginDialog(QWidget):
     """Enhanced login dialog with Persian support"""
     
-    login_successful = pyqtSignal()
+    login_successful = pyqtSignal(str)
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = None
+        self.auth_thread = None
         self.is_first_run = self.check_first_run()
         self.setup_ui()
-        self.setup_styling()
+        
+        # Counts down while failed attempts lock the login out
+        self.lockout_timer = QTimer(self)
+        self.lockout_timer.timeout.connect(self.update_lockout)
+        
+    def open_database(self):
+        """Database service, opened after the window is shown so it appears without waiting"""
+        if self.db_service is None:
+            from services.database_service import get_database_service
+            
+            self.db_service = get_database_service()
+            startup_timer.mark("database ready")
+            startup_timer.report("login window")
+        return self.db_service
         
     def check_first_run(self):
         """Check if this is the first run (no users exist)"""
@@ -36,6 +52,7 @@ class LoginDialog(QWidget):
         self.setWindowTitle("ورود به سیستم مدیریت فاکتور فروش")
         self.setFixedSize(400, 500)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+        self.setObjectName("login_dialog")
         
         # Main layout
         main_layout = QVBoxLayout()
@@ -50,12 +67,11 @@ class LoginDialog(QWidget):
         title_label = QLabel("سیستم مدیریت فاکتور فروش")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         title_label.setFont(QFont("Vazirmatn", 18, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #ffffff; margin-bottom: 10px;")
         
         subtitle_label = QLabel("نسخه پیشرفته با قابلیت مدیریت کامل")
         subtitle_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         subtitle_label.setFont(QFont("Vazirmatn", 10))
-        subtitle_label.setStyleSheet("color: #cccccc; margin-bottom: 20px;")
+        subtitle_label.setProperty("class", "muted")
         
         header_layout.addWidget(title_label)
         header_layout.addWidget(subtitle_label)
@@ -68,10 +84,10 @@ class LoginDialog(QWidget):
         # Mode label
         if self.is_first_run:
             mode_label = QLabel("🔐 تنظیم اولیه - ایجاد حساب کاربری")
-            mode_label.setStyleSheet("color: #4CAF50; font-weight: bold; margin-bottom: 10px;")
+            mode_label.setProperty("class", "success")
         else:
             mode_label = QLabel("🔑 ورود به سیستم")
-            mode_label.setStyleSheet("color: #2196F3; font-weight: bold; margin-bottom: 10px;")
+            mode_label.setProperty("class", "info")
         
         mode_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         form_layout.addWidget(mode_label)
@@ -115,12 +131,13 @@ class LoginDialog(QWidget):
         # Buttons
         button_layout = QHBoxLayout()
         
-        self.login_button = QPushButton("ورود" if not self.is_first_run else "ایجاد حساب")
+        self.login_button = QPushButton(self.login_button_text())
         self.login_button.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
         self.login_button.clicked.connect(self.handle_login)
         
         self.exit_button = QPushButton("خروج")
         self.exit_button.setFont(QFont("Vazirmatn", 11))
+        self.exit_button.setProperty("class", "danger")
         self.exit_button.clicked.connect(self.close)
         
         button_layout.addWidget(self.exit_button)
@@ -139,83 +156,18 @@ class LoginDialog(QWidget):
         self.password_edit.returnPressed.connect(self.handle_login)
         if self.is_first_run:
             self.confirm_password_edit.returnPressed.connect(self.handle_login)
+        self.username_edit.textChanged.connect(self.update_lockout)
         
-    def setup_styling(self):
-        """Setup modern dark theme styling"""
-        self.setStyleSheet("""
-            QWidget {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #1e3c72, stop:1 #2a5298);
-                color: #ffffff;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-            
-            QLineEdit {
-                background-color: rgba(255, 255, 255, 0.1);
-                border: 2px solid rgba(255, 255, 255, 0.2);
-                border-radius: 8px;
-                padding: 12px 15px;
-                color: #ffffff;
-                font-size: 11pt;
-                margin: 5px 0px;
-            }
-            
-            QLineEdit:focus {
-                border-color: #4CAF50;
-                background-color: rgba(255, 255, 255, 0.15);
-            }
-            
-            QLineEdit::placeholder {
-                color: rgba(255, 255, 255, 0.6);
-            }
-            
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                color: white;
-                font-weight: bold;
-                font-size: 11pt;
-                min-width: 100px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #45a049, stop:1 #3d8b40);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #3d8b40, stop:1 #2e7d32);
-            }
-            
-            QPushButton#exit_button {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #f44336, stop:1 #d32f2f);
-            }
-            
-            QPushButton#exit_button:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #d32f2f, stop:1 #c62828);
-            }
-            
-            QLabel {
-                color: #ffffff;
-                margin: 5px 0px;
-            }
-            
-            QFrame {
-                background: transparent;
-            }
-        """)
-        
-        # Set object names for specific styling
-        self.exit_button.setObjectName("exit_button")
+    def login_button_text(self):
+        """Login button caption for the current mode"""
+        return "ایجاد حساب" if self.is_first_run else "ورود"
         
     def handle_login(self):
         """Handle login/registration process"""
+        # Disabled while a check is running or failed attempts lock the user name out
+        if not self.login_button.isEnabled():
+            return
+        
         username = self.username_edit.text().strip()
         password = self.password_edit.text()
         
@@ -239,23 +191,56 @@ class LoginDialog(QWidget):
             if password != confirm_password:
                 self.show_message("خطا", "رمز عبور و تکرار آن یکسان نیستند", QMessageBox.Icon.Warning)
                 return
-            
-            success, message = self.db_service.create_user(username, password)
+        
+        self.start_authentication(username, password)
+    
+    def start_authentication(self, username, password):
+        """Check or create the user in a worker thread; bcrypt is deliberately slow"""
+        self.set_busy(True)
+        self.auth_thread = AuthenticationThread(self.open_database(), username, password, self.is_first_run)
+        self.auth_thread.auth_finished.connect(self.on_authentication_finished)
+        self.auth_thread.start()
+    
+    def on_authentication_finished(self, success, message):
+        """Handle the result of a login or registration"""
+        self.set_busy(False)
+        if self.is_first_run:
             if success:
                 self.show_message("موفقیت", "حساب کاربری با موفقیت ایجاد شد", QMessageBox.Icon.Information)
                 self.is_first_run = False
                 self.update_ui_for_login_mode()
             else:
                 self.show_message("خطا", message, QMessageBox.Icon.Critical)
+        elif success:
+            self.login_successful.emit(self.auth_thread.username)
+            self.close()
         else:
-            # Login mode
-            if self.db_service.authenticate_user(username, password):
-                self.login_successful.emit()
-                self.close()
-            else:
-                self.show_message("خطا", "نام کاربری یا رمز عبور اشتباه است", QMessageBox.Icon.Critical)
-                self.password_edit.clear()
-                self.password_edit.setFocus()
+            self.show_message("خطا", message, QMessageBox.Icon.Critical)
+            self.password_edit.clear()
+            self.password_edit.setFocus()
+            self.update_lockout()
+    
+    def set_busy(self, busy):
+        """Disable the form while a password is being checked"""
+        for widget in [self.username_edit, self.password_edit, self.confirm_password_edit, self.login_button]:
+            widget.setEnabled(not busy)
+        self.login_button.setText("⏳ در حال بررسی..." if busy else self.login_button_text())
+    
+    def update_lockout(self):
+        """Keep the login button disabled, with a countdown, while the user name is locked out"""
+        if self.db_service is None or (self.auth_thread and self.auth_thread.isRunning()):
+            return
+        
+        wait = self.db_service.login_retry_after(self.username_edit.text().strip())
+        if wait > 0:
+            self.login_button.setEnabled(False)
+            self.login_button.setText(f"⏳ {math.ceil(wait)} ثانیه")
+            if not self.lockout_timer.isActive():
+                self.lockout_timer.start(1000)
+        else:
+            self.lockout_timer.stop()
+            self.login_button.setEnabled(True)
+            self.login_button.setText(self.login_button_text())
     
     def update_ui_for_login_mode(self):
         """Update UI from registration to login mode"""
@@ -267,7 +252,7 @@ class LoginDialog(QWidget):
         mode_label = self.findChild(QLabel)
         if mode_label:
             mode_label.setText("🔑 ورود به سیستم")
-            mode_label.setStyleSheet("color: #2196F3; font-weight: bold; margin-bottom: 10px;")
+            set_style_class(mode_label, "info")
         
         # Clear fields
         self.username_edit.clear()
@@ -280,32 +265,13 @@ class LoginDialog(QWidget):
         msg_box.setWindowTitle(title)
         msg_box.setText(message)
         msg_box.setIcon(icon)
-        
-        # Apply dark theme to message box
-        msg_box.setStyleSheet("""
-            QMessageBox {
-                background-color: #2b2b2b;
-                color: #ffffff;
-                font-family: 'Vazirmatn';
-            }
-            QMessageBox QPushButton {
-                background-color: #4CAF50;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                color: white;
-                font-weight: bold;
-                min-width: 60px;
-            }
-            QMessageBox QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        
         msg_box.exec()
     
     def closeEvent(self, event):
         """Handle close event"""
+        if self.auth_thread and self.auth_thread.isRunning():
+            self.auth_thread.wait()
+        
         if not self.is_first_run:
             event.accept()
         else:
@@ -341,12 +307,9 @@ class InvoiceApplication(QApplication):
         if os.path.exists("assets/icon.png"):
             self.setWindowIcon(QIcon("assets/icon.png"))
         
-        # Apply global stylesheet
-        self.setStyleSheet("""
-            * {
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-        """)
+        # Apply the application stylesheet once; views only set style classes
+        self.theme_service = ThemeService(self)
+        self.theme_service.apply()
     
     def start(self):
         """Start the application with login"""
@@ -356,15 +319,29 @@ class InvoiceApplication(QApplication):
         
         # Center the login dialog
         self.center_widget(self.login_dialog)
+        startup_timer.mark("login shown")
         
-    def show_main_window(self):
+        # Open the database while the user types
+        QTimer.singleShot(0, self.open_database)
+        
+    def open_database(self):
+        """Open the database and follow the saved appearance settings"""
+        db_service = self.login_dialog.open_database()
+        self.theme_service.bind_settings(db_service.get_settings_store())
+        
+    def show_main_window(self, username):
         """Show main window after successful login"""
         try:
-            self.main_window = MainWindow()
+            startup_timer.restart()
+            from main_window import MainWindow
+            
+            self.main_window = MainWindow(username)
             self.main_window.show()
             
             # Center the main window
             self.center_widget(self.main_window)
+            startup_timer.mark("main window shown")
+            QTimer.singleShot(0, self.on_dashboard_shown)
             
         except Exception as e:
             QMessageBox.critical(
@@ -374,6 +351,11 @@ class InvoiceApplication(QApplication):
             )
             self.quit()
     
+    def on_dashboard_shown(self):
+        """Log start-up timing once the dashboard has loaded"""
+        startup_timer.mark("dashboard loaded")
+        startup_timer.report("main window")
+    
     def center_widget(self, widget):
         """Center widget on screen"""
         screen = self.primaryScreen().geometry()
@@ -391,6 +373,7 @@ def main():
     os.makedirs('assets', exist_ok=True)
     
     # Create and start application
+    startup_timer.mark("imports")
     app = InvoiceApplication(sys.argv)
     app.start()
     
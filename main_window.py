@@ -4,19 +4,22 @@ Enhanced with modern UI and improved navigation
 """
 
 import os
+import time
+import logging
+import importlib
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QTabWidget, QMenuBar, QStatusBar, QLabel, 
                            QPushButton, QFrame, QMessageBox, QApplication,
-                           QSizePolicy, QToolBar)
+                           QSizePolicy, QToolBar, QDialog)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QAction, QPixmap
 from views.dashboard_view import DashboardView
-from views.invoice_view import InvoiceView
-from views.products_view import ProductsView
-from views.reports_view import ReportsView
-from views.settings_dialog import SettingsDialog
-from services.database_service import DatabaseService
-import jdatetime
+from services.database_service import get_database_service
+from services.backup_scheduler import BackupScheduler
+from services.stock_monitor import LowStockMonitor
+from services.idle_monitor import IdleMonitor
+from views.lock_screen import LockScreen
+from services.persian_utils import jalali_date
 from datetime import datetime
 
 class ModernTabWidget(QTabWidget):
@@ -27,49 +30,33 @@ class ModernTabWidget(QTabWidget):
         self.setTabPosition(QTabWidget.TabPosition.West)
         self.setMovable(False)
         self.setTabsClosable(False)
-        
-        # Custom styling for tabs
-        self.setStyleSheet("""
-            QTabWidget::pane {
-                border: 2px solid #dee2e6;
-                border-radius: 8px;
-                background-color: white;
-                margin-left: 10px;
-            }
-            
-            QTabWidget::tab-bar {
-                alignment: left;
-            }
-            
-            QTabBar::tab {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f8f9fa, stop:1 #e9ecef);
-                border: 2px solid #dee2e6;
-                border-bottom: none;
-                border-top-left-radius: 8px;
-                border-bottom-left-radius: 8px;
-                min-width: 120px;
-                min-height: 60px;
-                padding: 10px;
-                margin: 2px 0px;
-                color: #495057;
-                font-weight: bold;
-                font-size: 11pt;
-            }
-            
-            QTabBar::tab:selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border-color: #4CAF50;
-            }
-            
-            QTabBar::tab:hover:!selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #e3f2fd, stop:1 #bbdefb);
-                border-color: #2196F3;
-            }
-        """)
+        self.setObjectName("main_tabs")
+
+class LazyTab(QWidget):
+    """Tab page that imports and builds its view the first time it is shown"""
+    
+    view_created = pyqtSignal(QWidget)
+    
+    def __init__(self, module_name, class_name):
+        super().__init__()
+        self.module_name = module_name
+        self.class_name = class_name
+        self.view = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+    def ensure_view(self):
+        """Build the view if it does not exist yet and return it"""
+        if self.view is None:
+            started = time.perf_counter()
+            view_class = getattr(importlib.import_module(self.module_name), self.class_name)
+            self.view = view_class()
+            self.layout().addWidget(self.view)
+            logging.getLogger(__name__).info(
+                f"{self.class_name} created in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            self.view_created.emit(self.view)
+        return self.view
 
 class StatusBarWidget(QStatusBar):
     """Enhanced status bar with system information"""
@@ -92,25 +79,18 @@ class StatusBarWidget(QStatusBar):
         # Connection status
         self.db_status_label = QLabel("💾 دیتابیس: متصل")
         self.db_status_label.setFont(QFont("Vazirmatn", 9))
-        self.db_status_label.setStyleSheet("color: #27ae60;")
+        self.db_status_label.setProperty("class", "success")
+        
+        # Backup status
+        self.backup_status_label = QLabel()
+        self.backup_status_label.setFont(QFont("Vazirmatn", 9))
         
         # Add widgets
         self.addWidget(self.system_label)
+        self.addPermanentWidget(self.backup_status_label)
         self.addPermanentWidget(self.db_status_label)
         self.addPermanentWidget(self.datetime_label)
         
-        # Styling
-        self.setStyleSheet("""
-            QStatusBar {
-                background-color: #f8f9fa;
-                border-top: 1px solid #dee2e6;
-                padding: 5px;
-            }
-            QStatusBar::item {
-                border: none;
-            }
-        """)
-        
     def setup_timer(self):
         """Setup timer for updating date/time"""
         self.timer = QTimer()
@@ -121,22 +101,31 @@ class StatusBarWidget(QStatusBar):
     def update_datetime(self):
         """Update date and time display"""
         now = datetime.now()
-        jdate = jdatetime.datetime.fromgregorian(datetime=now)
-        
-        persian_date = jdate.strftime('%Y/%m/%d')
+        persian_date = jalali_date(now)
         time_str = now.strftime('%H:%M:%S')
         
         self.datetime_label.setText(f"📅 {persian_date} | 🕐 {time_str}")
+        
+    def set_backup_status(self, text):
+        """Show backup scheduler status"""
+        self.backup_status_label.setText(text)
 
 class MainWindow(QMainWindow):
     """Enhanced main window with modern design"""
     
-    def __init__(self):
+    def __init__(self, username):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
+        self.username = username
+        self.backup_scheduler = BackupScheduler(self.db_service, self)
+        self.manual_backup_pending = False
+        self.stock_monitor = LowStockMonitor(self.db_service, self)
+        self.idle_monitor = IdleMonitor(self.db_service.get_settings_store(), self)
         self.setup_ui()
-        self.setup_styling()
         self.setup_connections()
+        self.backup_scheduler.start()
+        self.stock_monitor.start()
+        self.idle_monitor.start()
         
     def setup_ui(self):
         """Setup the main user interface"""
@@ -163,17 +152,17 @@ class MainWindow(QMainWindow):
         # Create tab widget
         self.tab_widget = ModernTabWidget()
         
-        # Create views
+        # Create views; all but the dashboard are built when their tab is first opened
         self.dashboard_view = DashboardView()
-        self.invoice_view = InvoiceView()
-        self.products_view = ProductsView()
-        self.reports_view = ReportsView()
+        self.invoice_tab = LazyTab('views.invoice_view', 'InvoiceView')
+        self.products_tab = LazyTab('views.products_view', 'ProductsView')
+        self.reports_tab = LazyTab('views.reports_view', 'ReportsView')
         
         # Add tabs with icons
         self.tab_widget.addTab(self.dashboard_view, "📊 داشبورد")
-        self.tab_widget.addTab(self.invoice_view, "🧾 صدور فاکتور")
-        self.tab_widget.addTab(self.products_view, "📦 مدیریت کالاها")
-        self.tab_widget.addTab(self.reports_view, "📈 گزارشات")
+        self.tab_widget.addTab(self.invoice_tab, "🧾 صدور فاکتور")
+        self.tab_widget.addTab(self.products_tab, "📦 مدیریت کالاها")
+        self.tab_widget.addTab(self.reports_tab, "📈 گزارشات")
         
         main_layout.addWidget(self.tab_widget)
         
@@ -187,10 +176,39 @@ class MainWindow(QMainWindow):
         # Set initial tab
         self.tab_widget.setCurrentIndex(0)
         
+        # Covers the window while the session is locked
+        self.lock_screen = LockScreen(self.db_service, self.username, self)
+        
+    @property
+    def invoice_view(self):
+        """Invoice view, or None until its tab is opened"""
+        return self.invoice_tab.view
+    
+    @property
+    def products_view(self):
+        """Products view, or None until its tab is opened"""
+        return self.products_tab.view
+    
+    @property
+    def reports_view(self):
+        """Reports view, or None until its tab is opened"""
+        return self.reports_tab.view
+    
+    def on_tab_changed(self, index):
+        """Build a lazy tab's view on first activation"""
+        tab = self.tab_widget.widget(index)
+        if isinstance(tab, LazyTab):
+            tab.ensure_view()
+    
+    def on_invoice_view_created(self, invoice_view):
+        """Connect the invoice view once it exists"""
+        invoice_view.invoice_created.connect(self.on_invoice_created)
+        
     def create_header(self):
         """Create application header"""
         header_frame = QFrame()
         header_frame.setFrameStyle(QFrame.Shape.Box)
+        header_frame.setObjectName("app_header")
         header_layout = QHBoxLayout(header_frame)
         header_layout.setContentsMargins(20, 15, 20, 15)
         
@@ -199,11 +217,9 @@ class MainWindow(QMainWindow):
         
         app_title = QLabel("سیستم مدیریت فاکتور فروش")
         app_title.setFont(QFont("Vazirmatn", 16, QFont.Weight.Bold))
-        app_title.setStyleSheet("color: #2c3e50;")
         
         app_subtitle = QLabel("نسخه پیشرفته با قابلیت‌های کامل مدیریت")
         app_subtitle.setFont(QFont("Vazirmatn", 10))
-        app_subtitle.setStyleSheet("color: #7f8c8d;")
         
         title_layout.addWidget(app_title)
         title_layout.addWidget(app_subtitle)
@@ -227,35 +243,6 @@ class MainWindow(QMainWindow):
         header_layout.addStretch()
         header_layout.addLayout(actions_layout)
         
-        # Header styling
-        header_frame.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #667eea, stop:1 #764ba2);
-                border: none;
-                border-radius: 12px;
-                margin-bottom: 10px;
-            }
-            QLabel {
-                color: white;
-            }
-            QPushButton {
-                background: rgba(255, 255, 255, 0.2);
-                color: white;
-                border: 2px solid rgba(255, 255, 255, 0.3);
-                border-radius: 6px;
-                padding: 8px 12px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background: rgba(255, 255, 255, 0.3);
-                border-color: white;
-            }
-            QPushButton:pressed {
-                background: rgba(255, 255, 255, 0.1);
-            }
-        """)
-        
         return header_frame
         
     def create_menu_bar(self):
@@ -312,6 +299,11 @@ class MainWindow(QMainWindow):
         refresh_action.triggered.connect(self.refresh_all_views)
         tools_menu.addAction(refresh_action)
         
+        lock_action = QAction('🔒 قفل برنامه', self)
+        lock_action.setShortcut('Ctrl+L')
+        lock_action.triggered.connect(self.lock_session)
+        tools_menu.addAction(lock_action)
+        
         # Help menu
         help_menu = menubar.addMenu('راهنما')
         
@@ -323,48 +315,6 @@ class MainWindow(QMainWindow):
         help_action.triggered.connect(self.show_help)
         help_menu.addAction(help_action)
         
-        # Menu styling
-        menubar.setStyleSheet("""
-            QMenuBar {
-                background-color: #f8f9fa;
-                border-bottom: 1px solid #dee2e6;
-                padding: 5px;
-            }
-            QMenuBar::item {
-                background: transparent;
-                padding: 8px 12px;
-                border-radius: 4px;
-                margin: 2px;
-            }
-            QMenuBar::item:selected {
-                background-color: #e3f2fd;
-                color: #1976d2;
-            }
-            QMenu {
-                background-color: white;
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-                padding: 5px;
-            }
-            QMenu::item {
-                padding: 8px 20px;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background-color: #e3f2fd;
-                color: #1976d2;
-            }
-        """)
-        
-    def setup_styling(self):
-        """Setup global window styling"""
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f8f9fa;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-        """)
-        
     def setup_connections(self):
         """Setup signal connections between components"""
         # Connect quick action buttons
@@ -379,15 +329,35 @@ class MainWindow(QMainWindow):
         dashboard_buttons['new_product'].clicked.connect(lambda: self.tab_widget.setCurrentIndex(2))
         dashboard_buttons['reports'].clicked.connect(lambda: self.tab_widget.setCurrentIndex(3))
         
+        # Build lazy tabs when first opened
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        self.invoice_tab.view_created.connect(self.on_invoice_view_created)
+        
         # Connect view refresh signals
         self.dashboard_view.refresh_requested.connect(self.refresh_dashboard_dependents)
-        self.invoice_view.invoice_created.connect(self.on_invoice_created)
+        
+        # Connect backup scheduler
+        self.backup_scheduler.status_changed.connect(self.status_bar.set_backup_status)
+        self.backup_scheduler.backup_finished.connect(self.on_backup_finished)
+        self.backup_scheduler.backup_finished.connect(self.dashboard_view.on_backup_finished)
+        self.dashboard_view.backup_requested.connect(self.create_backup)
+        
+        # Lock the session when idle
+        self.idle_monitor.idle_timeout.connect(self.lock_session)
+        self.lock_screen.unlocked.connect(self.on_session_unlocked)
+        
+        # Connect low stock alerts
+        self.stock_monitor.low_stock_alert.connect(self.on_low_stock_alert)
+        self.stock_monitor.stock_recovered.connect(
+            lambda alerts: self.dashboard_view.load_low_stock_products()
+        )
         
     def refresh_all_views(self):
         """Refresh all views"""
         try:
             self.dashboard_view.load_dashboard_data()
-            self.products_view.load_products()
+            if self.products_view:
+                self.products_view.load_products()
             self.status_bar.system_label.setText("📊 همه بخش‌ها به‌روزرسانی شدند")
             
             # Reset status message after 3 seconds
@@ -399,12 +369,14 @@ class MainWindow(QMainWindow):
     
     def refresh_dashboard_dependents(self):
         """Refresh views that depend on dashboard data"""
-        self.products_view.load_products()
+        if self.products_view:
+            self.products_view.load_products()
     
     def on_invoice_created(self, message):
         """Handle invoice creation"""
         self.dashboard_view.load_dashboard_data()
-        self.products_view.load_products()
+        if self.products_view:
+            self.products_view.load_products()
         self.status_bar.system_label.setText(f"✅ {message}")
         
         # Reset status message after 5 seconds
@@ -412,23 +384,47 @@ class MainWindow(QMainWindow):
             self.status_bar.system_label.setText("سیستم مدیریت فاکتور فروش")
         )
     
+    def on_low_stock_alert(self, alerts):
+        """Handle products falling to their reorder threshold"""
+        self.dashboard_view.load_low_stock_products()
+        names = "، ".join(alert['name'] for alert in alerts[:3])
+        if len(alerts) > 3:
+            names += f" و {len(alerts) - 3} کالای دیگر"
+        self.status_bar.system_label.setText(f"⚠️ موجودی به حد سفارش رسید: {names}")
+        
+        # Reset status message after 8 seconds
+        QTimer.singleShot(8000, lambda: 
+            self.status_bar.system_label.setText("سیستم مدیریت فاکتور فروش")
+        )
+    
     def create_backup(self):
-        """Create database backup"""
-        try:
-            success, message = self.db_service.backup_database()
+        """Create database backup in the background"""
+        if self.backup_scheduler.backup_now():
+            self.manual_backup_pending = True
+        else:
+            QMessageBox.information(self, "پشتیبان‌گیری", "پشتیبان‌گیری در حال انجام است")
+    
+    def on_backup_finished(self, success, message):
+        """Handle backup completion"""
+        if success:
+            self.status_bar.system_label.setText("💾 پشتیبان با موفقیت ایجاد شد")
+        else:
+            self.status_bar.system_label.setText("❌ خطا در ایجاد پشتیبان")
+        
+        # Only manual backups interrupt the user
+        if self.manual_backup_pending:
+            self.manual_backup_pending = False
             if success:
                 QMessageBox.information(self, "موفقیت", message)
-                self.status_bar.system_label.setText("💾 پشتیبان با موفقیت ایجاد شد")
             else:
                 QMessageBox.critical(self, "خطا", message)
-                self.status_bar.system_label.setText("❌ خطا در ایجاد پشتیبان")
-        except Exception as e:
-            QMessageBox.critical(self, "خطا", f"خطا در ایجاد پشتیبان: {str(e)}")
     
     def show_settings(self):
         """Show settings dialog"""
         try:
-            settings_dialog = SettingsDialog(self)
+            from views.settings_dialog import SettingsDialog
+            
+            settings_dialog = SettingsDialog(self.backup_scheduler, self)
             settings_dialog.exec()
         except Exception as e:
             QMessageBox.critical(self, "خطا", f"خطا در باز کردن تنظیمات: {str(e)}")
@@ -492,8 +488,48 @@ class MainWindow(QMainWindow):
         help_dialog.setTextFormat(Qt.TextFormat.RichText)
         help_dialog.exec()
     
+    def lock_session(self):
+        """Hide the window behind the lock screen; views and data stay loaded"""
+        if self.lock_screen.is_locked():
+            return
+        
+        # An open modal dialog would keep input away from the lock screen
+        modal = QApplication.activeModalWidget()
+        while modal is not None:
+            if isinstance(modal, QDialog):
+                modal.reject()
+            else:
+                modal.close()
+            if QApplication.activeModalWidget() is modal:
+                break
+            modal = QApplication.activeModalWidget()
+        
+        self.lock_screen.lock()
+        self.idle_monitor.lock(self.lock_screen)
+        
+    def on_session_unlocked(self):
+        """Give input back to the window after re-authentication"""
+        self.idle_monitor.unlock()
+        self.status_bar.system_label.setText("🔓 قفل برنامه باز شد")
+        
+        # Reset status message after 3 seconds
+        QTimer.singleShot(3000, lambda: 
+            self.status_bar.system_label.setText("سیستم مدیریت فاکتور فروش")
+        )
+        
+    def resizeEvent(self, event):
+        """Keep the lock screen over the whole window"""
+        super().resizeEvent(event)
+        if self.lock_screen.is_locked():
+            self.lock_screen.setGeometry(self.rect())
+        
     def closeEvent(self, event):
         """Handle window close event"""
+        # The confirmation could not be answered behind the lock screen
+        if self.lock_screen.is_locked():
+            event.ignore()
+            return
+        
         reply = QMessageBox.question(
             self,
             'تأیید خروج',
@@ -505,6 +541,9 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             # Save any pending data
             try:
+                self.backup_scheduler.stop()
+                self.stock_monitor.stop()
+                self.idle_monitor.stop()
                 self.db_service.close()
             except:
                 pass
@@ -0,0 +1,254 @@
+"""
+Archive Service for Persian Invoicing System
+Moves old fiscal years into per-year SQLite files and reads across them
+"""
+
+import os
+import re
+import logging
+from datetime import datetime, time, timedelta
+from sqlalchemy import create_engine, select, union_all, MetaData
+from database.models import Base, Invoice, InvoiceItem
+import jdatetime
+
+ARCHIVE_PREFIX = 'invoicing_'
+ARCHIVED_TABLES = [Invoice.__table__, InvoiceItem.__table__]
+
+# SQLAlchemy stores SQLite datetimes as sortable text in this format
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+def fiscal_year_of(value):
+    """Persian fiscal year (starting 1 Farvardin) of a date or datetime"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return jdatetime.date.fromgregorian(date=value).year
+
+def fiscal_year_bounds(year):
+    """Gregorian [start, end) datetimes of a Persian fiscal year"""
+    start = jdatetime.date(year, 1, 1).togregorian()
+    end = jdatetime.date(year + 1, 1, 1).togregorian()
+    return datetime.combine(start, time.min), datetime.combine(end, time.min)
+
+class ArchiveService:
+    """Per-fiscal-year archive databases attached on demand"""
+
+    def __init__(self, db_path, engine=None):
+        self.db_path = db_path
+        self.engine = engine or create_engine(f'sqlite:///{db_path}', echo=False)
+        self.archive_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archives')
+        self.logger = logging.getLogger(__name__)
+        self._archived_tables = {}
+
+    def archive_path(self, year):
+        """File holding the archive of a fiscal year"""
+        return os.path.join(self.archive_dir, f"{ARCHIVE_PREFIX}{year}.db")
+
+    def archived_years(self):
+        """Fiscal years that have an archive file, oldest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+
+        years = []
+        for name in os.listdir(self.archive_dir):
+            match = re.fullmatch(rf"{ARCHIVE_PREFIX}(\d{{4}})\.db", name)
+            if match:
+                years.append(int(match.group(1)))
+        return sorted(years)
+
+    def archives_for_range(self, start, end):
+        """Archived fiscal years overlapping the [start, end) datetime range"""
+        years = []
+        for year in self.archived_years():
+            year_start, year_end = fiscal_year_bounds(year)
+            if year_start < end and start < year_end:
+                years.append(year)
+        return years
+
+    def archivable_years(self, keep_years):
+        """Fiscal years in the live database older than the last keep_years years"""
+        first_kept_year = fiscal_year_of(datetime.now()) - keep_years + 1
+        with self.engine.connect() as connection:
+            oldest = connection.execute(
+                select(Invoice.__table__.c.issue_date).order_by(Invoice.__table__.c.issue_date).limit(1)
+            ).scalar()
+
+        if oldest is None:
+            return []
+        return list(range(fiscal_year_of(oldest), first_kept_year))
+
+    def archive_old_years(self, keep_years, progress=None):
+        """Archive every fiscal year before the last keep_years years
+
+        Returns (success, message).
+        """
+        try:
+            years = self.archivable_years(keep_years)
+            archived_count = 0
+            archived_years = 0
+            for index, year in enumerate(years):
+                if progress:
+                    progress(int(index * 100 / len(years)), f"بایگانی سال {year}")
+                count = self.archive_year(year)
+                archived_count += count
+                archived_years += 1 if count else 0
+
+            if progress:
+                progress(100, "پایان")
+            if not archived_count:
+                return True, "فاکتوری برای بایگانی وجود ندارد"
+            return True, f"{archived_count:,} فاکتور در {archived_years} سال مالی بایگانی شد"
+        except Exception as e:
+            self.logger.error(f"Error archiving invoices: {e}")
+            return False, f"خطا در بایگانی فاکتورها: {str(e)}"
+
+    def archive_year(self, year):
+        """Move invoices and items of a fiscal year into its archive file
+
+        SQLite in WAL mode does not commit atomically across attached files,
+        so the copy is committed to the archive first and the live rows are
+        deleted in a second transaction once every one of them is found in
+        the archive. The copy ignores rows already archived, so a run that
+        stopped between the two steps is finished by running it again.
+        Returns the number of archived invoices.
+        """
+        start, end = fiscal_year_bounds(year)
+        params = (start.strftime(SQLITE_DATETIME_FORMAT), end.strftime(SQLITE_DATETIME_FORMAT))
+        in_year = "issue_date >= ? AND issue_date < ?"
+
+        with self.engine.connect() as connection:
+            count = connection.exec_driver_sql(
+                f"SELECT COUNT(*) FROM invoices WHERE {in_year}", params
+            ).scalar()
+        if not count:
+            return 0
+
+        path = self.archive_path(year)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        archive_engine = create_engine(f'sqlite:///{path}', echo=False)
+        try:
+            Base.metadata.create_all(archive_engine, tables=ARCHIVED_TABLES)
+        finally:
+            archive_engine.dispose()
+
+        invoice_columns = ', '.join(column.name for column in Invoice.__table__.columns)
+        item_columns = ', '.join(column.name for column in InvoiceItem.__table__.columns)
+        year_invoices = f"SELECT id FROM main.invoices WHERE {in_year}"
+
+        with self.engine.connect() as connection:
+            # ATTACH is not allowed inside a transaction
+            connection.exec_driver_sql("ATTACH DATABASE ? AS archive", (path,))
+            connection.commit()
+            try:
+                try:
+                    connection.exec_driver_sql(
+                        f"INSERT OR IGNORE INTO archive.invoices ({invoice_columns}) "
+                        f"SELECT {invoice_columns} FROM main.invoices WHERE {in_year}", params
+                    )
+                    connection.exec_driver_sql(
+                        f"INSERT OR IGNORE INTO archive.invoice_items ({item_columns}) "
+                        f"SELECT {item_columns} FROM main.invoice_items WHERE invoice_id IN ({year_invoices})",
+                        params
+                    )
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+
+                missing_invoices = connection.exec_driver_sql(
+                    f"SELECT COUNT(*) FROM main.invoices WHERE {in_year} "
+                    f"AND id NOT IN (SELECT id FROM archive.invoices)", params
+                ).scalar()
+                missing_items = connection.exec_driver_sql(
+                    f"SELECT COUNT(*) FROM main.invoice_items WHERE invoice_id IN ({year_invoices}) "
+                    f"AND id NOT IN (SELECT id FROM archive.invoice_items)", params
+                ).scalar()
+                connection.commit()
+                if missing_invoices or missing_items:
+                    raise ValueError(
+                        f"{missing_invoices} فاکتور و {missing_items} ردیف فاکتور سال {year} "
+                        f"در فایل بایگانی یافت نشد؛ داده‌ها حذف نشدند"
+                    )
+
+                try:
+                    # Only rows present in the archive are removed, even if invoices were added meanwhile
+                    connection.exec_driver_sql(
+                        f"DELETE FROM main.invoice_items WHERE invoice_id IN ({year_invoices}) "
+                        f"AND id IN (SELECT id FROM archive.invoice_items)", params
+                    )
+                    archived_count = connection.exec_driver_sql(
+                        f"DELETE FROM main.invoices WHERE {in_year} "
+                        f"AND id IN (SELECT id FROM archive.invoices)", params
+                    ).rowcount
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+            finally:
+                connection.exec_driver_sql("DETACH DATABASE archive")
+                connection.commit()
+
+        self.logger.info(f"Archived {archived_count} invoices of fiscal year {year} to {path}")
+        return archived_count
+
+    def archived_table(self, table, schema):
+        """Copy of a table bound to an attached archive schema"""
+        key = (table.name, schema)
+        archived = self._archived_tables.get(key)
+        if archived is None:
+            archived = table.to_metadata(MetaData(), schema=schema)
+            self._archived_tables[key] = archived
+        return archived
+
+    def attach_archives(self, connection, years):
+        """Attach archive files for years; returns their schema names"""
+        schemas = []
+        for year in years:
+            schema = f"archive_{year}"
+            connection.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (self.archive_path(year),))
+            schemas.append(schema)
+        return schemas
+
+    def detach_archives(self, connection, schemas):
+        """Detach archive schemas attached by attach_archives"""
+        for schema in schemas:
+            connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+
+    def invoices_statement(self, start, end, schemas, active_only=True):
+        """SELECT over live invoices, UNION ALL the attached archives"""
+        selects = []
+        for table in [Invoice.__table__] + [self.archived_table(Invoice.__table__, s) for s in schemas]:
+            statement = select(table).where(table.c.issue_date >= start, table.c.issue_date < end)
+            if active_only:
+                statement = statement.where(table.c.is_active == True)
+            selects.append(statement)
+        return selects[0] if len(selects) == 1 else union_all(*selects)
+
+    def date_range(self, start_date, end_date):
+        """[start, end) datetimes covering two dates inclusive"""
+        return (datetime.combine(start_date, time.min),
+                datetime.combine(end_date + timedelta(days=1), time.min))
+
+    def query_invoices(self, connection, start, end, schemas, active_only=True):
+        """Run invoices_statement on connection; detached Invoice objects, newest first"""
+        rows = connection.execute(
+            self.invoices_statement(start, end, schemas, active_only)
+        ).mappings().all()
+
+        invoices = [Invoice(**row) for row in rows]
+        invoices.sort(key=lambda invoice: invoice.issue_date, reverse=True)
+        return invoices
+
+    def get_invoices(self, start_date, end_date, active_only=True):
+        """Invoices issued between two dates (inclusive), newest first
+
+        Archives are attached only when the range reaches into them.
+        Returns detached Invoice objects without items.
+        """
+        start, end = self.date_range(start_date, end_date)
+        with self.engine.connect() as connection:
+            schemas = self.attach_archives(connection, self.archives_for_range(start, end))
+            try:
+                return self.query_invoices(connection, start, end, schemas, active_only)
+            finally:
+                self.detach_archives(connection, schemas)
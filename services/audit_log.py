@@ -0,0 +1,210 @@
+"""
+Audit Log for Persian Invoicing System
+Security events queued in memory and written in batches by a background thread
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, select, delete, func
+from database.models import AuditEvent
+
+# Queue marker that stops the writer thread
+_STOP = object()
+
+class AuditLog:
+    """Append-only audit trail that never makes the caller wait for the disk
+
+    record() only puts a dict on a bounded queue. A daemon thread with its own
+    engine inserts queued events in batches and enforces the retention window.
+    """
+
+    # Events waiting for the writer; further events are dropped and counted
+    MAX_PENDING = 10000
+    BATCH_SIZE = 200
+    # Seconds the writer waits for more events before writing a partial batch
+    FLUSH_INTERVAL = 1.0
+    # Seconds between retention runs, and rows deleted per transaction
+    PURGE_INTERVAL = 60 * 60
+    PURGE_CHUNK = 5000
+    SETTINGS_KEYS = ('security.audit_log', 'security.log_retention_days')
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self.retention_days = 90
+        self.username = None
+        self.dropped = 0
+        self.settings_store = None
+        self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._engine = None
+        self._next_purge = 0
+
+    def bind_settings(self, settings_store):
+        """Follow the audit settings of settings_store; later calls are ignored"""
+        if self.settings_store is not None:
+            return
+        self.settings_store = settings_store
+        settings_store.subscribe(self.on_settings_changed, self.SETTINGS_KEYS)
+        self.apply_settings()
+
+    def apply_settings(self):
+        """Enable or disable recording according to settings"""
+        self.enabled = bool(self.settings_store.get('security.audit_log'))
+        self.retention_days = max(1, self.settings_store.get('security.log_retention_days', 90))
+        # Apply a shorter window at the next batch instead of an hour later
+        self._next_purge = 0
+        if self.enabled:
+            self.start()
+
+    def on_settings_changed(self, changed):
+        """Settings store subscriber for audit settings"""
+        self.apply_settings()
+
+    def set_user(self, username):
+        """User recorded with the events that follow"""
+        self.username = username
+
+    def record(self, event_type, target="", details="", username=None):
+        """Queue an event; returns at once and never raises"""
+        if not self.enabled:
+            return
+        event = {
+            'created_at': datetime.now(),
+            'event_type': event_type,
+            'username': username or self.username,
+            'target': str(target)[:200],
+            'details': details,
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if not self.dropped:
+                self.logger.warning("Audit queue full; dropping events until the writer catches up")
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        """Start the writer thread if it is not running"""
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._engine = create_engine(f'sqlite:///{self.db_path}', echo=False)
+            self._thread = threading.Thread(target=self.run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def run(self):
+        """Writer loop: gather a batch, insert it, purge expired events when due"""
+        stopping = False
+        while not stopping:
+            batch = []
+            waiters = []
+            try:
+                item = self._queue.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                item = None
+
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch:
+                self.write_batch(batch)
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.PURGE_INTERVAL
+                self.purge_expired()
+            for waiter in waiters:
+                waiter.set()
+
+    def write_batch(self, batch):
+        """Insert queued events with one executemany in one transaction"""
+        try:
+            with self._engine.begin() as connection:
+                connection.execute(insert(AuditEvent.__table__), batch)
+        except Exception as e:
+            self.logger.error(f"Error writing {len(batch)} audit events: {e}")
+
+    def purge_expired(self):
+        """Delete events older than the retention window
+
+        The index on created_at finds the newest expired id, and the deletes
+        walk the primary key up to it in chunks to keep write locks short.
+        The date is checked again so a clock change never removes newer events.
+        """
+        table = AuditEvent.__table__
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        try:
+            with self._engine.connect() as connection:
+                last_expired = connection.execute(
+                    select(func.max(table.c.id)).where(table.c.created_at < cutoff)
+                ).scalar()
+                if last_expired is None:
+                    return 0
+                lower = connection.execute(select(func.min(table.c.id))).scalar()
+
+            removed = 0
+            while lower <= last_expired:
+                upper = min(lower + self.PURGE_CHUNK - 1, last_expired)
+                with self._engine.begin() as connection:
+                    removed += connection.execute(
+                        delete(table).where(table.c.id.between(lower, upper), table.c.created_at < cutoff)
+                    ).rowcount
+                lower = upper + 1
+            self.logger.info(f"Removed {removed} audit events older than {self.retention_days} days")
+            return removed
+        except Exception as e:
+            self.logger.error(f"Error purging audit events: {e}")
+            return 0
+
+    def flush(self, timeout=5):
+        """Wait until the events queued so far are written"""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Write the pending events and stop the writer thread"""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if self._engine is not None:
+            self._engine.dispose()
+        atexit.unregister(self.close)
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+def get_audit_log(db_path):
+    """Return the audit log shared by every service on the same database"""
+    key = os.path.abspath(db_path)
+    with _logs_lock:
+        audit_log = _logs.get(key)
+        if audit_log is None:
+            audit_log = AuditLog(db_path)
+            _logs[key] = audit_log
+        return audit_log
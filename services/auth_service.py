@@ -0,0 +1,169 @@
+"""
+Authentication Service for Persian Invoicing System
+bcrypt hashing with a configurable cost, rehash on login and login backoff
+"""
+
+import math
+import time
+import threading
+import logging
+import bcrypt
+from database.models import User, AuditEvent
+
+# bcrypt cost factor (log2 of the key expansion rounds)
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = 10
+MAX_ROUNDS = 15
+
+def clamp_rounds(rounds):
+    """A bcrypt cost within the supported range"""
+    try:
+        return max(MIN_ROUNDS, min(MAX_ROUNDS, int(rounds)))
+    except (TypeError, ValueError):
+        return DEFAULT_ROUNDS
+
+def hash_password(password, rounds=DEFAULT_ROUNDS):
+    """bcrypt hash of a password as text"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(clamp_rounds(rounds))).decode('utf-8')
+
+def check_password(password, password_hash):
+    """Whether a password matches a bcrypt hash"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False
+
+def password_rounds(password_hash):
+    """Cost factor a bcrypt hash was made with, or None if it is not a bcrypt hash"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class LoginThrottle:
+    """Failed logins per user name with exponential backoff; never sleeps"""
+
+    # Failures allowed before the first delay
+    FREE_ATTEMPTS = 3
+    BASE_DELAY = 2
+    MAX_DELAY = 300
+    # Failures older than this are forgotten
+    RESET_AFTER = 15 * 60
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(username):
+        """User names differing only in case or spacing share a counter"""
+        return username.strip().casefold()
+
+    def retry_after(self, username):
+        """Seconds until username may try again; 0 when a login is allowed now"""
+        with self._lock:
+            entry = self._failures.get(self.key(username))
+        if entry is None:
+            return 0
+        return max(0, entry[1] - self.clock())
+
+    def record_failure(self, username):
+        """Count a failed login and return the delay it imposes in seconds"""
+        now = self.clock()
+        key = self.key(username)
+        with self._lock:
+            count, _, last_failure = self._failures.get(key, (0, 0, now))
+            if now - last_failure > self.RESET_AFTER:
+                count = 0
+            count += 1
+            excess = count - self.FREE_ATTEMPTS
+            delay = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** (excess - 1)) if excess > 0 else 0
+            self._failures[key] = (count, now + delay, now)
+        return delay
+
+    def record_success(self, username):
+        """Forget the failures of a user who logged in"""
+        with self._lock:
+            self._failures.pop(self.key(username), None)
+
+class AuthService:
+    """Checks and creates users; safe to call from a worker thread"""
+
+    ROUNDS_SETTING = 'security.password_rounds'
+
+    def __init__(self, db_service):
+        self.db_service = db_service
+        self.throttle = LoginThrottle()
+        self.logger = logging.getLogger(__name__)
+        self._dummy_hashes = {}
+
+    def rounds(self):
+        """Configured bcrypt cost"""
+        return clamp_rounds(self.db_service.get_settings_store().get(self.ROUNDS_SETTING, DEFAULT_ROUNDS))
+
+    def hash_password(self, password):
+        """Hash a password at the configured cost"""
+        return hash_password(password, self.rounds())
+
+    def dummy_hash(self, rounds):
+        """Hash checked for unknown users so they take as long as known ones"""
+        if rounds not in self._dummy_hashes:
+            self._dummy_hashes[rounds] = hash_password('invalid-user', rounds)
+        return self._dummy_hashes[rounds]
+
+    def authenticate(self, username, password):
+        """Check a user's password, upgrading its hash to the configured cost
+
+        Returns (success, message).
+        """
+        wait = self.throttle.retry_after(username)
+        if wait > 0:
+            return False, f"تلاش‌های ناموفق زیاد است؛ {math.ceil(wait)} ثانیه دیگر دوباره تلاش کنید"
+
+        rounds = self.rounds()
+        session = self.db_service.SessionLocal()
+        try:
+            user = session.query(User).filter_by(username=username, is_active=True).first()
+            if user is None:
+                check_password(password, self.dummy_hash(rounds))
+                success = False
+            else:
+                success = check_password(password, user.password_hash)
+
+            if not success:
+                delay = self.throttle.record_failure(username)
+                message = "نام کاربری یا رمز عبور اشتباه است"
+                if delay:
+                    message += f"\nتا {math.ceil(delay)} ثانیه امکان ورود وجود ندارد"
+                self.logger.warning(f"Failed login for {username!r}")
+                self.db_service.audit_log.record(AuditEvent.LOGIN_FAILED, username, username=username)
+                return False, message
+
+            self.throttle.record_success(username)
+            self.db_service.audit_log.set_user(username)
+            self.db_service.audit_log.record(AuditEvent.LOGIN_SUCCEEDED, username)
+            if password_rounds(user.password_hash) != rounds:
+                # The password is known only now, so this is the moment to rehash it
+                user.password_hash = hash_password(password, rounds)
+                session.commit()
+                self.logger.info(f"Password hash of {username!r} upgraded to cost {rounds}")
+            return True, "ورود موفق"
+        finally:
+            session.close()
+
+    def create_user(self, username, password):
+        """Create a user with a password hashed at the configured cost"""
+        session = self.db_service.SessionLocal()
+        try:
+            if session.query(User.id).filter_by(username=username).first():
+                return False, "کاربر با این نام کاربری قبلاً ثبت شده است"
+
+            session.add(User(username=username, password_hash=self.hash_password(password)))
+            session.commit()
+            return True, "کاربر با موفقیت ایجاد شد"
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
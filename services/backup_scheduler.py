@@ -0,0 +1,174 @@
+"""
+Backup Scheduler for Persian Invoicing System
+Runs automatic backups in a worker thread when the database has changed
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+from services.backup_service import BackupService
+from services.audit_log import get_audit_log
+
+class BackupWorker(QThread):
+    """Thread for creating a backup without blocking UI"""
+
+    progress = pyqtSignal(int)
+    backup_finished = pyqtSignal(bool, str)
+
+    def __init__(self, db_path, settings_store=None):
+        super().__init__()
+        self.db_path = db_path
+        self.settings_store = settings_store
+
+    def run(self):
+        """Create the backup and report the result"""
+        backup_service = BackupService(self.db_path, self.settings_store)
+        success, message = backup_service.create_backup(self.progress.emit)
+        # Write the backup's own audit event before the scheduler reads the data version
+        get_audit_log(self.db_path).flush()
+        self.backup_finished.emit(success, message)
+
+class BackupScheduler(QObject):
+    """Automatic backups following the database settings"""
+
+    status_changed = pyqtSignal(str)
+    backup_finished = pyqtSignal(bool, str)
+
+    # How often to check whether a backup is due
+    CHECK_INTERVAL_MS = 10 * 60 * 1000
+    SETTINGS_KEYS = ('database.auto_backup', 'database.backup_interval_days',
+                     'database.backup_location')
+
+    def __init__(self, db_service, parent=None):
+        super().__init__(parent)
+        self.db_path = db_service.db_path
+        self.settings_store = db_service.get_settings_store()
+        self.logger = logging.getLogger(__name__)
+        self.worker = None
+
+        # PRAGMA data_version on a dedicated connection changes whenever
+        # another connection commits, so idle periods can be detected cheaply
+        self.change_connection = sqlite3.connect(self.db_path)
+        self.backup_data_version = None
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check_backup)
+
+    def start(self):
+        """Follow backup settings and schedule backups"""
+        self.settings_store.subscribe(self.on_settings_changed, self.SETTINGS_KEYS)
+        self.apply_settings()
+
+    def apply_settings(self):
+        """Start or stop the schedule according to settings"""
+        if self.settings_store.get('database.auto_backup'):
+            self.timer.start(self.CHECK_INTERVAL_MS)
+            QTimer.singleShot(0, self.check_backup)
+            self.status_changed.emit(self.describe_last_backup())
+        else:
+            self.timer.stop()
+            self.status_changed.emit("💾 پشتیبان خودکار: غیرفعال")
+
+    def on_settings_changed(self, changed):
+        """Settings store subscriber for backup settings"""
+        # A new backup location has its own history
+        if 'database.backup_location' in changed:
+            self.backup_data_version = None
+        self.apply_settings()
+
+    def data_version(self):
+        """Current SQLite data version seen by the change connection"""
+        return self.change_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def last_backup_time(self):
+        """Time of the newest backup, or None"""
+        backups = BackupService(self.db_path, self.settings_store).list_backups()
+        if not backups:
+            return None
+        return datetime.fromtimestamp(os.path.getmtime(backups[0]))
+
+    def describe_last_backup(self):
+        """Status text for the newest backup"""
+        last_backup = self.last_backup_time()
+        if last_backup is None:
+            return "💾 پشتیبان خودکار: هنوز پشتیبانی ایجاد نشده"
+        return f"💾 آخرین پشتیبان: {last_backup.strftime('%Y/%m/%d %H:%M')}"
+
+    def has_changes(self, last_backup):
+        """Whether the database changed since the last backup"""
+        if last_backup is None:
+            return True
+
+        if self.backup_data_version is None:
+            # First check since startup: compare file modification times
+            paths = [self.db_path, f"{self.db_path}-wal"]
+            modified = max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+            return modified > last_backup.timestamp()
+
+        return self.data_version() != self.backup_data_version
+
+    def is_running(self):
+        """Whether a backup is in progress"""
+        return self.worker is not None and self.worker.isRunning()
+
+    def check_backup(self):
+        """Start a backup if one is due and the database changed"""
+        if self.is_running() or not self.settings_store.get('database.auto_backup'):
+            return
+
+        try:
+            last_backup = self.last_backup_time()
+            interval = timedelta(days=self.settings_store.get('database.backup_interval_days', 7))
+            if last_backup is not None and datetime.now() - last_backup < interval:
+                return
+
+            if not self.has_changes(last_backup):
+                self.status_changed.emit("💾 پشتیبان خودکار: تغییری از آخرین پشتیبان نیست")
+                return
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"Error checking backup schedule: {e}")
+            return
+
+        self.start_backup()
+
+    def backup_now(self):
+        """Start a backup immediately; returns False if one is running"""
+        return self.start_backup()
+
+    def start_backup(self):
+        """Run a backup in the worker thread"""
+        if self.is_running():
+            return False
+
+        self.worker = BackupWorker(self.db_path, self.settings_store)
+        self.worker.progress.connect(
+            lambda percent: self.status_changed.emit(f"💾 در حال پشتیبان‌گیری... {percent}%")
+        )
+        self.worker.backup_finished.connect(self.on_backup_finished)
+        self.status_changed.emit("💾 در حال پشتیبان‌گیری...")
+        self.worker.start()
+        return True
+
+    def on_backup_finished(self, success, message):
+        """Remember what was backed up and report the result"""
+        if success:
+            # Read after the worker flushed the backup's audit event, so that
+            # event alone does not make the next check back up an idle database.
+            # A commit made while the copy was verified and compressed is
+            # taken as backed up until the next change.
+            self.backup_data_version = self.data_version()
+            self.status_changed.emit(self.describe_last_backup())
+        else:
+            self.status_changed.emit("❌ خطا در پشتیبان‌گیری خودکار")
+
+        self.backup_finished.emit(success, message)
+
+    def stop(self):
+        """Stop scheduling and wait for a running backup"""
+        self.timer.stop()
+        self.settings_store.unsubscribe(self.on_settings_changed)
+        if self.worker is not None:
+            self.worker.wait()
+        self.change_connection.close()
@@ -0,0 +1,177 @@
+"""
+Backup Service for Persian Invoicing System
+Online SQLite backups with verification, compression and rotation
+"""
+
+import os
+import gzip
+import shutil
+import sqlite3
+import logging
+from datetime import datetime
+from database.models import AuditEvent
+from services.audit_log import get_audit_log
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BACKUP_PREFIX = 'backup_'
+BACKUP_EXTENSIONS = {
+    'none': '.db',
+    'gzip': '.db.gz',
+    'zstd': '.db.zst',
+}
+
+class BackupService:
+    """Consistent backups of a live database through the SQLite backup API"""
+
+    # Pages copied per backup step; writers can proceed between steps
+    PAGES_PER_STEP = 256
+    # Chunk size used when streaming a backup through the compressor
+    COPY_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, db_path, settings_store=None):
+        self.db_path = db_path
+        self.settings_store = settings_store
+        self.logger = logging.getLogger(__name__)
+
+    def setting(self, key, default):
+        """Read a backup setting, falling back to default without a store"""
+        if self.settings_store is None:
+            return default
+        value = self.settings_store.get(key)
+        return default if value in (None, '') else value
+
+    def backup_directory(self):
+        """Directory backups are written to"""
+        return self.setting('database.backup_location', 'backups')
+
+    def compression(self):
+        """Configured compression, downgraded to gzip when zstandard is missing"""
+        compression = self.setting('database.backup_compression', 'none')
+        if compression not in BACKUP_EXTENSIONS:
+            compression = 'none'
+        if compression == 'zstd' and zstandard is None:
+            self.logger.warning("zstandard is not installed, using gzip for backups")
+            compression = 'gzip'
+        return compression
+
+    def create_backup(self, progress=None):
+        """Back up the database, verify it, compress it and rotate old backups
+
+        progress(percent) is called while pages are copied.
+        Returns (success, message).
+        """
+        directory = self.backup_directory()
+        compression = self.compression()
+        backup_path = snapshot_path = None
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            backup_path, snapshot_path = self.reserve_backup_paths(directory, compression)
+            self.copy_database(snapshot_path, progress)
+            self.verify_database(snapshot_path)
+
+            if compression == 'none':
+                os.replace(snapshot_path, backup_path)
+            else:
+                self.compress_file(snapshot_path, backup_path, compression)
+                os.remove(snapshot_path)
+
+            removed = self.rotate_backups()
+            self.logger.info(f"Database backup created: {backup_path}")
+            if removed:
+                self.logger.info(f"Removed {len(removed)} old backups")
+            get_audit_log(self.db_path).record(AuditEvent.BACKUP_CREATED, os.path.basename(backup_path))
+            return True, f"پشتیبان در مسیر {backup_path} ایجاد شد"
+        except Exception as e:
+            self.logger.error(f"Error creating backup: {e}")
+            get_audit_log(self.db_path).record(AuditEvent.BACKUP_FAILED, os.path.basename(backup_path or ''), str(e))
+            for path in (snapshot_path, backup_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            return False, f"خطا در ایجاد پشتیبان: {str(e)}"
+
+    def reserve_backup_paths(self, directory, compression):
+        """(backup path, snapshot path) with a timestamp no other backup is using
+
+        Creating the snapshot file exclusively claims the name, so backups
+        started in the same moment by the scheduler, a manual backup or the
+        command line never write to the same file.
+        """
+        while True:
+            # Microseconds keep names unique and still sort chronologically
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            backup_path = os.path.join(directory, f"{BACKUP_PREFIX}{timestamp}{BACKUP_EXTENSIONS[compression]}")
+            snapshot_path = os.path.join(directory, f"{BACKUP_PREFIX}{timestamp}.db.partial")
+            if os.path.exists(backup_path):
+                continue
+            try:
+                open(snapshot_path, 'x').close()
+            except FileExistsError:
+                continue
+            return backup_path, snapshot_path
+
+    def copy_database(self, target_path, progress=None):
+        """Copy the live database page by page with sqlite3.Connection.backup"""
+        def report(status, remaining, total):
+            if progress and total:
+                progress(int((total - remaining) * 100 / total))
+
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=self.PAGES_PER_STEP, progress=report)
+        finally:
+            target.close()
+            source.close()
+
+    def verify_database(self, path):
+        """Raise if the database at path fails an integrity check"""
+        connection = sqlite3.connect(path)
+        try:
+            result = connection.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            connection.close()
+
+        if result != 'ok':
+            raise ValueError(f"بررسی سلامت پشتیبان ناموفق بود: {result}")
+
+    def compress_file(self, source_path, target_path, compression):
+        """Stream source_path through the compressor into target_path"""
+        with open(source_path, 'rb') as source:
+            if compression == 'zstd':
+                with open(target_path, 'wb') as target:
+                    with zstandard.ZstdCompressor().stream_writer(target) as writer:
+                        shutil.copyfileobj(source, writer, self.COPY_CHUNK_SIZE)
+            else:
+                with gzip.open(target_path, 'wb') as writer:
+                    shutil.copyfileobj(source, writer, self.COPY_CHUNK_SIZE)
+
+    def list_backups(self):
+        """Completed backup files, newest first"""
+        directory = self.backup_directory()
+        if not os.path.isdir(directory):
+            return []
+
+        backups = [
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(BACKUP_PREFIX)
+            and name.endswith(tuple(BACKUP_EXTENSIONS.values()))
+        ]
+        # Timestamped names sort chronologically
+        return sorted(backups, key=os.path.basename, reverse=True)
+
+    def rotate_backups(self):
+        """Delete backups beyond the configured maximum, oldest first"""
+        max_backups = int(self.setting('database.max_backups', 10))
+        removed = []
+        for path in self.list_backups()[max_backups:]:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                self.logger.error(f"Error removing old backup {path}: {e}")
+        return removed
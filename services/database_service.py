@@ -4,25 +4,65 @@ Enhanced with proper error handling and validation
 """
 
 import os
-import shutil
-from datetime import datetime
-from sqlalchemy import create_engine, and_
+import threading
+from datetime import date, datetime
+from sqlalchemy import create_engine, and_, event, func, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from database.models import Base, Product, Invoice, InvoiceItem, User, Settings
-import bcrypt
+from database.models import (Base, Product, Invoice, InvoiceItem, User, Settings, AuditEvent,
+                             StockMovement, StockSnapshot)
+from services.settings_store import get_settings_store
+from services.backup_service import BackupService
+from services.archive_service import ArchiveService, ARCHIVED_TABLES
+from services.read_snapshot import ReadSnapshot
+from services.stock_alerts import get_stock_alerts, make_alert
+from services.sales_summary import SalesSummaryService
+from services.tax_summary import TaxSummaryService
+from services.price_update import PriceUpdateService, describe_rule
+from services.auth_service import AuthService
+from services.audit_log import get_audit_log
+from services.jalali_calendar import JalaliCalendar
+from services.invoice_totals import TAX_RATE_SCALE, compute_invoice, compute_batch
+from services.persian_utils import normalize_text
 import logging
 
 class DatabaseService:
     """Enhanced database service with improved error handling"""
     
+    # Ledger entries between stock snapshot checkpoints
+    STOCK_SNAPSHOT_INTERVAL = 500
+    
     def __init__(self, db_path="invoicing.db"):
         self.db_path = db_path
         self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
-        self.SessionLocal = scoped_session(sessionmaker(bind=self.engine))
+        event.listen(self.engine, 'connect', self.configure_connection)
+        session_factory = sessionmaker(bind=self.engine)
+        event.listen(session_factory, 'after_commit', self.publish_stock_alerts)
+        event.listen(session_factory, 'after_rollback', self.discard_stock_alerts)
+        self.SessionLocal = scoped_session(session_factory)
+        self.stock_alerts = get_stock_alerts(db_path)
+        self.archive_service = ArchiveService(db_path, self.engine)
+        self.jalali_calendar = JalaliCalendar(self.engine)
+        self.sales_summary = SalesSummaryService(self.archive_service, self.jalali_calendar)
+        self.tax_summary = TaxSummaryService(self.archive_service)
+        self.price_updates = PriceUpdateService(self.engine)
+        self.auth = AuthService(self)
+        self.audit_log = get_audit_log(db_path)
         self.setup_logging()
         self.create_tables()
         self.create_default_user()
+        self.create_opening_stock_movements()
+        self.create_sales_summary()
+        self.prepare_calendar()
+        self.create_tax_summary()
+        self.audit_log.bind_settings(self.get_settings_store())
+    
+    @staticmethod
+    def configure_connection(dbapi_connection, connection_record):
+        """Use WAL so report snapshots and sales never block each other"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
     
     def setup_logging(self):
         """Setup logging for database operations"""
@@ -42,11 +82,51 @@ class DatabaseService:
             os.makedirs('logs', exist_ok=True)
             os.makedirs('backups', exist_ok=True)
             Base.metadata.create_all(self.engine)
+            self.upgrade_schema(self.engine, Base.metadata.sorted_tables)
+            self.upgrade_archives()
             self.logger.info("Database tables created successfully")
         except Exception as e:
             self.logger.error(f"Error creating tables: {e}")
             raise
     
+    def upgrade_schema(self, engine, tables):
+        """Add columns and indexes introduced after the database was created"""
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in tables:
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    if column.default is not None and column.default.is_scalar:
+                        default = column.default.arg
+                        if isinstance(default, str):
+                            default = "'" + default.replace("'", "''") + "'"
+                        elif isinstance(default, bool):
+                            default = int(default)
+                        ddl += f"{'' if column.nullable else ' NOT NULL'} DEFAULT {default}"
+                    connection.exec_driver_sql(ddl)
+                    self.logger.info(f"Added column {table.name}.{column.name}")
+                
+                for index in table.indexes:
+                    try:
+                        index.create(connection, checkfirst=True)
+                    except IntegrityError as e:
+                        # A unique index over rows that are not unique yet; the app still works without it
+                        self.logger.warning(f"Index {index.name} not created: {e}")
+    
+    def upgrade_archives(self):
+        """Bring archived fiscal years up to the current invoice schema"""
+        for year in self.archive_service.archived_years():
+            archive_engine = create_engine(f'sqlite:///{self.archive_service.archive_path(year)}', echo=False)
+            try:
+                self.upgrade_schema(archive_engine, ARCHIVED_TABLES)
+            finally:
+                archive_engine.dispose()
+    
     def create_default_user(self):
         """Create default admin user if no users exist"""
         session = self.SessionLocal()
@@ -56,10 +136,7 @@ class DatabaseService:
                 default_username = "admin"
                 default_password = "admin123"
                 
-                password_hash = bcrypt.hashpw(
-                    default_password.encode('utf-8'), 
-                    bcrypt.gensalt()
-                ).decode('utf-8')
+                password_hash = self.auth.hash_password(default_password)
                 
                 user = User(
                     username=default_username,
@@ -74,59 +151,238 @@ class DatabaseService:
         finally:
             session.close()
     
-    def authenticate_user(self, username, password):
-        """Authenticate user with username and password"""
+    def get_settings_store(self):
+        """Return the in-memory settings store shared by services on this database"""
+        return get_settings_store(self)
+    
+    def create_opening_stock_movements(self):
+        """Open the stock ledger with current quantities of existing products"""
         session = self.SessionLocal()
         try:
-            user = session.query(User).filter_by(
-                username=username, 
-                is_active=True
-            ).first()
-            
-            if user and bcrypt.checkpw(
-                password.encode('utf-8'), 
-                user.password_hash.encode('utf-8')
-            ):
-                return True
-            return False
+            if session.query(StockMovement.id).first():
+                return
+            
+            products = session.query(Product).filter(Product.stock_quantity != 0).all()
+            for product in products:
+                session.add(StockMovement(
+                    product_id=product.id,
+                    movement_type=StockMovement.ADJUSTMENT,
+                    quantity=product.stock_quantity,
+                    balance_after=product.stock_quantity,
+                    note="موجودی افتتاحیه"
+                ))
+            
+            if products:
+                session.commit()
+                self.logger.info(f"Opening stock recorded for {len(products)} products")
         except Exception as e:
-            self.logger.error(f"Authentication error: {e}")
-            return False
+            session.rollback()
+            self.logger.error(f"Error creating opening stock movements: {e}")
         finally:
             session.close()
     
-    def create_user(self, username, password):
-        """Create new user"""
+    def create_sales_summary(self):
+        """Build the daily sales summary once for databases that predate it"""
+        try:
+            if not self.sales_summary.is_empty():
+                return
+            
+            with self.engine.connect() as connection:
+                has_invoices = connection.exec_driver_sql("SELECT 1 FROM invoices LIMIT 1").first()
+            if has_invoices or self.archive_service.archived_years():
+                self.sales_summary.rebuild()
+        except Exception as e:
+            self.logger.error(f"Error creating sales summary: {e}")
+    
+    def prepare_calendar(self):
+        """Cover every sales day in the Jalali calendar table and cache it"""
+        try:
+            with self.engine.connect() as connection:
+                first_sale = connection.exec_driver_sql(
+                    "SELECT MIN(sale_date) FROM daily_sales_summary"
+                ).scalar()
+            self.jalali_calendar.prepare(date.fromisoformat(first_sale) if first_sale else None)
+        except Exception as e:
+            self.logger.error(f"Error preparing Jalali calendar: {e}")
+    
+    def create_tax_summary(self):
+        """Build the monthly tax summary once for databases that predate it"""
+        try:
+            if not self.tax_summary.is_empty():
+                return
+            
+            with self.engine.connect() as connection:
+                has_items = connection.exec_driver_sql("SELECT 1 FROM invoice_items LIMIT 1").first()
+            if has_items or self.archive_service.archived_years():
+                # Lines sold before tax support get their discount shares first
+                self.tax_summary.recompute()
+                self.tax_summary.rebuild()
+        except Exception as e:
+            self.logger.error(f"Error creating tax summary: {e}")
+    
+    def rebuild_sales_summary(self, progress=None):
+        """Recompute the daily sales summary from all invoices"""
+        return self.sales_summary.rebuild(progress)
+    
+    def rebuild_tax_summary(self, progress=None):
+        """Recompute the monthly tax summary from all invoice lines"""
+        return self.tax_summary.rebuild(progress)
+    
+    def record_stock_movement(self, session, product, quantity, movement_type, reference="", note=""):
+        """Append a ledger entry and update on-hand stock in the caller's transaction"""
+        was_low = product.is_low_stock
+        product.stock_quantity += quantity
+        product.updated_at = datetime.now()
+        self.track_stock_level(session, product, was_low)
+        
+        movement = StockMovement(
+            product_id=product.id,
+            movement_type=movement_type,
+            quantity=quantity,
+            balance_after=product.stock_quantity,
+            reference=reference,
+            note=note
+        )
+        session.add(movement)
+        return movement
+    
+    def track_stock_level(self, session, product, was_low):
+        """Remember a product's low-stock state so a threshold crossing is published on commit"""
+        tracked = session.info.setdefault('stock_alerts', {})
+        entry = tracked.setdefault(product.id, {'was_low': was_low})
+        entry['alert'] = make_alert(product, product.is_low_stock)
+    
+    def publish_stock_alerts(self, session):
+        """Publish products that crossed their reorder threshold in the committed transaction"""
+        tracked = session.info.pop('stock_alerts', {})
+        alerts = [entry['alert'] for entry in tracked.values()
+                  if entry['alert']['low'] != entry['was_low']]
+        self.stock_alerts.publish(alerts)
+    
+    def discard_stock_alerts(self, session):
+        """Forget threshold crossings of a rolled back transaction"""
+        session.info.pop('stock_alerts', None)
+    
+    def checkpoint_stock_if_due(self, session):
+        """Snapshot all on-hand quantities every STOCK_SNAPSHOT_INTERVAL movements"""
+        session.flush()
+        last_movement_id = session.query(func.max(StockMovement.id)).scalar() or 0
+        last_snapshot = session.query(StockSnapshot).order_by(StockSnapshot.id.desc()).first()
+        covered_id = last_snapshot.last_movement_id if last_snapshot else 0
+        
+        if last_movement_id - covered_id < self.STOCK_SNAPSHOT_INTERVAL:
+            return
+        
+        taken_at = datetime.now()
+        for product_id, quantity in session.query(Product.id, Product.stock_quantity).all():
+            session.add(StockSnapshot(
+                product_id=product_id,
+                quantity=quantity,
+                last_movement_id=last_movement_id,
+                taken_at=taken_at
+            ))
+        self.logger.info(f"Stock snapshot taken at movement {last_movement_id}")
+    
+    def adjust_stock(self, product_id, quantity, movement_type=StockMovement.ADJUSTMENT,
+                     reference="", note=""):
+        """Record a purchase, return or adjustment for a product"""
         session = self.SessionLocal()
         try:
-            # Check if user already exists
-            existing_user = session.query(User).filter_by(username=username).first()
-            if existing_user:
-                return False, "کاربر با این نام کاربری قبلاً ثبت شده است"
-            
-            password_hash = bcrypt.hashpw(
-                password.encode('utf-8'), 
-                bcrypt.gensalt()
-            ).decode('utf-8')
-            
-            user = User(username=username, password_hash=password_hash)
-            session.add(user)
+            quantity = int(quantity)
+            if quantity == 0:
+                return False, "مقدار تغییر موجودی نمی‌تواند صفر باشد"
+            
+            product = session.query(Product).filter_by(id=product_id, is_active=True).first()
+            if not product:
+                return False, "کالا یافت نشد"
+            
+            if product.stock_quantity + quantity < 0:
+                return False, f"موجودی کالا {product.name} کافی نیست. موجودی فعلی: {product.stock_quantity}"
+            
+            self.record_stock_movement(session, product, quantity, movement_type, reference, note.strip())
+            self.checkpoint_stock_if_due(session)
             session.commit()
-            return True, "کاربر با موفقیت ایجاد شد"
+            return True, "موجودی کالا با موفقیت ثبت شد"
         except Exception as e:
             session.rollback()
-            self.logger.error(f"Error creating user: {e}")
-            return False, f"خطا در ایجاد کاربر: {str(e)}"
+            self.logger.error(f"Error adjusting stock: {e}")
+            return False, f"خطا در ثبت موجودی: {str(e)}"
+        finally:
+            session.close()
+    
+    def get_stock_on_date(self, at, product_id=None):
+        """On-hand quantities at a point in time: one snapshot plus a delta scan
+
+        Returns {product_id: quantity}.
+        """
+        session = self.SessionLocal()
+        try:
+            # Latest checkpoint at or before the requested time
+            taken_at = session.query(func.max(StockSnapshot.taken_at)).filter(
+                StockSnapshot.taken_at <= at
+            ).scalar()
+            
+            levels = {}
+            covered_id = 0
+            if taken_at is not None:
+                covered_id = session.query(StockSnapshot.last_movement_id).filter(
+                    StockSnapshot.taken_at == taken_at
+                ).limit(1).scalar()
+                snapshot_query = session.query(StockSnapshot.product_id, StockSnapshot.quantity).filter(
+                    StockSnapshot.taken_at == taken_at
+                )
+                if product_id is not None:
+                    snapshot_query = snapshot_query.filter(StockSnapshot.product_id == product_id)
+                levels = dict(snapshot_query.all())
+            
+            # Movements after the checkpoint up to the requested time
+            delta_query = session.query(
+                StockMovement.product_id, func.sum(StockMovement.quantity)
+            ).filter(
+                StockMovement.id > covered_id,
+                StockMovement.created_at <= at
+            )
+            if product_id is not None:
+                delta_query = delta_query.filter(StockMovement.product_id == product_id)
+            for movement_product_id, delta in delta_query.group_by(StockMovement.product_id).all():
+                levels[movement_product_id] = levels.get(movement_product_id, 0) + delta
+            
+            return levels
+        except Exception as e:
+            self.logger.error(f"Error getting stock on date: {e}")
+            return {}
         finally:
             session.close()
     
-    def add_product(self, name, purchase_price=0, sale_price=0, stock_quantity=0, description=""):
+    def authenticate_user(self, username, password):
+        """Authenticate user with username and password; returns (success, message)"""
+        try:
+            return self.auth.authenticate(username, password)
+        except Exception as e:
+            self.logger.error(f"Authentication error: {e}")
+            return False, "خطا در بررسی اطلاعات ورود"
+    
+    def login_retry_after(self, username):
+        """Seconds until username may try to log in again after failed attempts"""
+        return self.auth.throttle.retry_after(username)
+    
+    def create_user(self, username, password):
+        """Create new user"""
+        try:
+            return self.auth.create_user(username, password)
+        except Exception as e:
+            self.logger.error(f"Error creating user: {e}")
+            return False, f"خطا در ایجاد کاربر: {str(e)}"
+    
+    def add_product(self, name, purchase_price=0, sale_price=0, stock_quantity=0, description="",
+                    reorder_threshold=Product.DEFAULT_REORDER_THRESHOLD, tax_rate=Product.DEFAULT_TAX_RATE):
         """Add new product with improved validation"""
         session = self.SessionLocal()
         try:
             # Validate input
             if not name or name.strip() == "":
                 return False, "نام کالا الزامی است"
+            name = normalize_text(name)
             
             # Check for duplicate names
             existing_product = session.query(Product).filter_by(
@@ -141,16 +397,35 @@ class DatabaseService:
             purchase_price = int(float(purchase_price)) if purchase_price else 0
             sale_price = int(float(sale_price)) if sale_price else 0
             stock_quantity = int(stock_quantity) if stock_quantity else 0
+            reorder_threshold = int(reorder_threshold) if reorder_threshold else 0
+            if reorder_threshold < 0:
+                return False, "حد سفارش مجدد نمی‌تواند منفی باشد"
+            tax_rate = int(tax_rate) if tax_rate else 0
+            if not 0 <= tax_rate <= TAX_RATE_SCALE:
+                return False, "نرخ مالیات باید بین ۰ تا ۱۰۰ درصد باشد"
             
             product = Product(
                 name=name.strip(),
                 purchase_price=purchase_price,
                 sale_price=sale_price,
-                stock_quantity=stock_quantity,
+                stock_quantity=0,
+                reorder_threshold=reorder_threshold,
+                tax_rate=tax_rate,
                 description=description.strip()
             )
             
             session.add(product)
+            session.flush()  # Get product ID
+            
+            # A new product that starts at or below its threshold is reported as low
+            self.track_stock_level(session, product, False)
+            
+            if stock_quantity:
+                self.record_stock_movement(
+                    session, product, stock_quantity, StockMovement.ADJUSTMENT, note="موجودی اولیه"
+                )
+                self.checkpoint_stock_if_due(session)
+            
             session.commit()
             self.logger.info(f"Product added: {name}")
             return True, "کالا با موفقیت اضافه شد"
@@ -162,13 +437,20 @@ class DatabaseService:
         finally:
             session.close()
     
-    def update_product(self, product_id, name, purchase_price, sale_price, stock_quantity, description=""):
+    def update_product(self, product_id, name, purchase_price, sale_price, stock_quantity, description="",
+                       reorder_threshold=None, tax_rate=None):
         """Update existing product"""
         session = self.SessionLocal()
         try:
+            if reorder_threshold is not None and int(reorder_threshold) < 0:
+                return False, "حد سفارش مجدد نمی‌تواند منفی باشد"
+            if tax_rate is not None and not 0 <= int(tax_rate) <= TAX_RATE_SCALE:
+                return False, "نرخ مالیات باید بین ۰ تا ۱۰۰ درصد باشد"
+            
             product = session.query(Product).filter_by(id=product_id, is_active=True).first()
             if not product:
                 return False, "کالا یافت نشد"
+            name = normalize_text(name)
             
             # Check for duplicate names (excluding current product)
             existing_product = session.query(Product).filter(
@@ -184,12 +466,29 @@ class DatabaseService:
             product.name = name.strip()
             product.purchase_price = int(float(purchase_price)) if purchase_price else 0
             product.sale_price = int(float(sale_price)) if sale_price else 0
-            product.stock_quantity = int(stock_quantity) if stock_quantity else 0
             product.description = description.strip()
             product.updated_at = datetime.now()
+            if tax_rate is not None:
+                product.tax_rate = int(tax_rate)
+            
+            if reorder_threshold is not None:
+                was_low = product.is_low_stock
+                product.reorder_threshold = int(reorder_threshold)
+                self.track_stock_level(session, product, was_low)
+            
+            # Stock edits go through the ledger as adjustments
+            stock_quantity = int(stock_quantity) if stock_quantity else 0
+            if stock_quantity != product.stock_quantity:
+                self.record_stock_movement(
+                    session, product, stock_quantity - product.stock_quantity,
+                    StockMovement.ADJUSTMENT, note="ویرایش کالا"
+                )
+                self.checkpoint_stock_if_due(session)
             
             session.commit()
             self.logger.info(f"Product updated: {name}")
+            self.audit_log.record(AuditEvent.PRODUCT_UPDATED, product.name,
+                                  f"قیمت فروش {product.sale_price}، موجودی {product.stock_quantity}")
             return True, "کالا با موفقیت به‌روزرسانی شد"
             
         except Exception as e:
@@ -220,6 +519,7 @@ class DatabaseService:
             product.updated_at = datetime.now()
             session.commit()
             self.logger.info(f"Product deleted: {product.name}")
+            self.audit_log.record(AuditEvent.PRODUCT_DELETED, product.name)
             return True, "کالا با موفقیت حذف شد"
             
         except Exception as e:
@@ -229,6 +529,57 @@ class DatabaseService:
         finally:
             session.close()
     
+    def preview_price_update(self, rule, limit=200):
+        """Products a repricing rule would change, without changing them
+        
+        Returns (success, message, preview).
+        """
+        try:
+            preview = self.price_updates.preview(rule, limit)
+            return True, f"قیمت {preview['count']:,} کالا تغییر می‌کند", preview
+        except ValueError as e:
+            return False, str(e), None
+        except Exception as e:
+            self.logger.error(f"Error previewing price update: {e}")
+            return False, f"خطا در پیش‌نمایش تغییر قیمت: {str(e)}", None
+    
+    def apply_price_update(self, rule):
+        """Reprice every product matching a rule in one transaction"""
+        try:
+            price_update_id, count = self.price_updates.apply(rule)
+            self.audit_log.record(AuditEvent.PRICES_UPDATED, describe_rule(rule),
+                                  f"شماره {price_update_id} - {count} کالا")
+            return True, f"قیمت {count:,} کالا تغییر کرد"
+        except ValueError as e:
+            return False, str(e)
+        except Exception as e:
+            self.logger.error(f"Error applying price update: {e}")
+            return False, f"خطا در تغییر قیمت: {str(e)}"
+    
+    def undo_price_update(self, price_update_id):
+        """Restore the prices a repricing run replaced"""
+        try:
+            restored, skipped = self.price_updates.undo(price_update_id)
+            self.audit_log.record(AuditEvent.PRICE_UPDATE_UNDONE, f"شماره {price_update_id}",
+                                  f"{restored} کالا بازگردانده شد")
+            message = f"قیمت {restored:,} کالا بازگردانده شد"
+            if skipped:
+                message += f"\n{skipped:,} کالا پس از این تغییر دوباره قیمت‌گذاری شده و دست نخورد"
+            return True, message
+        except ValueError as e:
+            return False, str(e)
+        except Exception as e:
+            self.logger.error(f"Error undoing price update: {e}")
+            return False, f"خطا در بازگردانی قیمت‌ها: {str(e)}"
+    
+    def get_price_updates(self, limit=20):
+        """Recent repricing runs, newest first"""
+        try:
+            return self.price_updates.history(limit)
+        except Exception as e:
+            self.logger.error(f"Error getting price updates: {e}")
+            return []
+    
     def get_products(self, search_term="", active_only=True):
         """Get products with search functionality"""
         session = self.SessionLocal()
@@ -251,6 +602,27 @@ class DatabaseService:
         finally:
             session.close()
     
+    def low_stock_query(self, session):
+        """Active products at or below their reorder threshold; served by the partial index"""
+        return session.query(Product).filter(
+            Product.is_low_stock,
+            Product.is_active == True
+        )
+    
+    def get_low_stock_products(self, limit=None):
+        """Products at or below their reorder threshold, lowest stock first"""
+        session = self.SessionLocal()
+        try:
+            query = self.low_stock_query(session).order_by(Product.stock_quantity, Product.name)
+            if limit:
+                query = query.limit(limit)
+            return query.all()
+        except Exception as e:
+            self.logger.error(f"Error getting low stock products: {e}")
+            return []
+        finally:
+            session.close()
+    
     def create_invoice(self, customer_name, customer_phone="", customer_address="", 
                       items=None, discount_amount=0, notes="", background_image_path="", header_text=""):
         """Create new invoice with automatic stock management"""
@@ -262,8 +634,6 @@ class DatabaseService:
             # Generate invoice number
             invoice_number = Invoice.generate_invoice_number(session)
             
-            # Calculate totals
-            total_amount = 0
             invoice_items = []
             
             for item in items:
@@ -282,20 +652,19 @@ class DatabaseService:
                 if product.stock_quantity < quantity:
                     return False, f"موجودی کالا {product.name} کافی نیست. موجودی فعلی: {product.stock_quantity}"
                 
-                unit_price = product.sale_price
-                total_price = unit_price * quantity
-                total_amount += total_price
-                
                 invoice_items.append({
                     'product_id': product_id,
                     'quantity': quantity,
-                    'unit_price': unit_price,
-                    'total_price': total_price
+                    'unit_price': product.sale_price,
+                    'tax_rate': product.tax_rate
                 })
             
-            # Apply discount
-            discount_amount = int(float(discount_amount)) if discount_amount else 0
-            final_amount = total_amount - discount_amount
+            # Calculate totals
+            totals = compute_invoice(invoice_items, discount_amount)
+            for item_data, line in zip(invoice_items, totals.lines):
+                item_data['total_price'] = line.total_price
+                item_data['discount_amount'] = line.discount
+                item_data['tax_amount'] = line.tax
             
             # Create invoice
             invoice = Invoice(
@@ -303,9 +672,10 @@ class DatabaseService:
                 customer_name=customer_name.strip(),
                 customer_phone=customer_phone.strip(),
                 customer_address=customer_address.strip(),
-                total_amount=total_amount,
-                discount_amount=discount_amount,
-                final_amount=final_amount,
+                total_amount=totals.subtotal,
+                discount_amount=totals.discount,
+                tax_amount=totals.tax,
+                final_amount=totals.final_amount,
                 notes=notes.strip(),
                 background_image_path=background_image_path,
                 header_text=header_text.strip()
@@ -315,6 +685,13 @@ class DatabaseService:
             session.flush()  # Get invoice ID
             
             # Add invoice items and update stock
+            self.sales_summary.record_invoice(
+                session, invoice, sum(item_data['quantity'] for item_data in invoice_items)
+            )
+            self.tax_summary.record_invoice(
+                session, invoice.issue_date,
+                [(line.tax_rate, line.taxable, line.tax) for line in totals.lines]
+            )
             for item_data in invoice_items:
                 invoice_item = InvoiceItem(
                     invoice_id=invoice.id,
@@ -322,13 +699,17 @@ class DatabaseService:
                 )
                 session.add(invoice_item)
                 
-                # Update product stock
+                # Update product stock through the ledger
                 product = session.query(Product).filter_by(id=item_data['product_id']).first()
-                product.stock_quantity -= item_data['quantity']
-                product.updated_at = datetime.now()
+                self.record_stock_movement(
+                    session, product, -item_data['quantity'], StockMovement.SALE, reference=invoice_number
+                )
             
+            self.checkpoint_stock_if_due(session)
             session.commit()
             self.logger.info(f"Invoice created: {invoice_number}")
+            self.audit_log.record(AuditEvent.INVOICE_CREATED, invoice_number,
+                                  f"{customer_name.strip()} - مبلغ {totals.final_amount}")
             return True, f"فاکتور {invoice_number} با موفقیت ایجاد شد"
             
         except Exception as e:
@@ -338,6 +719,166 @@ class DatabaseService:
         finally:
             session.close()
     
+    def recalculate_invoice_totals(self, start_date=None, end_date=None):
+        """Recompute stored totals of live invoices from their items in one batch
+        
+        Returns (success, message).
+        """
+        session = self.SessionLocal()
+        try:
+            filters = [Invoice.is_active == True]
+            if start_date is not None and end_date is not None:
+                start, end = self.archive_service.date_range(start_date, end_date)
+                filters += [Invoice.issue_date >= start, Invoice.issue_date < end]
+            
+            invoices = session.query(
+                Invoice.id, Invoice.total_amount, Invoice.discount_amount,
+                Invoice.tax_amount, Invoice.final_amount
+            ).filter(*filters).order_by(Invoice.id).all()
+            if not invoices:
+                return True, "فاکتوری برای محاسبه مجدد وجود ندارد"
+            
+            items = session.query(
+                InvoiceItem.id, InvoiceItem.invoice_id, InvoiceItem.quantity, InvoiceItem.unit_price,
+                InvoiceItem.total_price, InvoiceItem.discount_amount, InvoiceItem.tax_rate,
+                InvoiceItem.tax_amount
+            ).join(Invoice).filter(*filters).order_by(InvoiceItem.id).all()
+            
+            position = {invoice.id: index for index, invoice in enumerate(invoices)}
+            totals = compute_batch(
+                [position[item.invoice_id] for item in items],
+                [item.quantity for item in items],
+                [item.unit_price for item in items],
+                [item.tax_rate for item in items],
+                [invoice.discount_amount for invoice in invoices]
+            )
+            
+            item_updates = [
+                {
+                    'id': item.id,
+                    'total_price': int(total_price),
+                    'discount_amount': int(discount),
+                    'tax_amount': int(tax)
+                }
+                for item, total_price, discount, tax in zip(
+                    items, totals['line_total_price'], totals['line_discount'], totals['line_tax']
+                )
+                if (item.total_price, item.discount_amount, item.tax_amount) != (total_price, discount, tax)
+            ]
+            invoice_updates = [
+                {
+                    'id': invoice.id,
+                    'total_amount': int(subtotal),
+                    'discount_amount': int(discount),
+                    'tax_amount': int(tax),
+                    'final_amount': int(final_amount)
+                }
+                for invoice, subtotal, discount, tax, final_amount in zip(
+                    invoices, totals['subtotal'], totals['discount'], totals['tax'], totals['final_amount']
+                )
+                if (invoice.total_amount, invoice.discount_amount, invoice.tax_amount, invoice.final_amount)
+                != (subtotal, discount, tax, final_amount)
+            ]
+            
+            session.bulk_update_mappings(InvoiceItem, item_updates)
+            session.bulk_update_mappings(Invoice, invoice_updates)
+            session.commit()
+            
+            if invoice_updates:
+                self.sales_summary.rebuild()
+            if item_updates:
+                self.tax_summary.rebuild()
+            self.logger.info(f"Invoice totals recalculated: {len(invoice_updates)} of {len(invoices)} changed")
+            return True, f"{len(invoices):,} فاکتور بررسی و {len(invoice_updates):,} فاکتور اصلاح شد"
+            
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"Error recalculating invoice totals: {e}")
+            return False, f"خطا در محاسبه مجدد فاکتورها: {str(e)}"
+        finally:
+            session.close()
+    
+    def recalculate_tax(self, start_date=None, end_date=None, use_product_rates=False):
+        """Recompute VAT of live invoices between two dates in SQL
+        
+        With use_product_rates lines are re-rated at their product's current
+        VAT rate. Returns (success, message).
+        """
+        try:
+            start = end = None
+            if start_date is not None and end_date is not None:
+                start, end = self.archive_service.date_range(start_date, end_date)
+            
+            changed = self.tax_summary.recompute(start, end, use_product_rates)
+            if changed:
+                self.sales_summary.rebuild()
+            return True, f"مالیات {changed:,} فاکتور اصلاح شد"
+            
+        except Exception as e:
+            self.logger.error(f"Error recalculating tax: {e}")
+            return False, f"خطا در محاسبه مجدد مالیات: {str(e)}"
+    
+    def cancel_invoice(self, invoice_id):
+        """Cancel an invoice and return its items to stock"""
+        session = self.SessionLocal()
+        try:
+            invoice = session.query(Invoice).filter_by(id=invoice_id, is_active=True).first()
+            if not invoice:
+                return False, "فاکتور یافت نشد"
+            
+            items_sold = 0
+            for item in invoice.items:
+                product = session.query(Product).filter_by(id=item.product_id).first()
+                self.record_stock_movement(
+                    session, product, item.quantity, StockMovement.RETURN,
+                    reference=invoice.invoice_number, note="ابطال فاکتور"
+                )
+                items_sold += item.quantity
+            
+            invoice.is_active = False
+            invoice.updated_at = datetime.now()
+            self.sales_summary.record_invoice(session, invoice, items_sold, sign=-1)
+            self.tax_summary.record_invoice(session, invoice.issue_date, [
+                (item.tax_rate, item.total_price - item.discount_amount, item.tax_amount)
+                for item in invoice.items
+            ], sign=-1)
+            
+            self.checkpoint_stock_if_due(session)
+            session.commit()
+            self.logger.info(f"Invoice cancelled: {invoice.invoice_number}")
+            self.audit_log.record(AuditEvent.INVOICE_CANCELLED, invoice.invoice_number,
+                                  f"{invoice.customer_name} - مبلغ {invoice.final_amount}")
+            return True, f"فاکتور {invoice.invoice_number} ابطال شد"
+            
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"Error cancelling invoice: {e}")
+            return False, f"خطا در ابطال فاکتور: {str(e)}"
+        finally:
+            session.close()
+    
+    def get_sales_totals(self, start_date=None, end_date=None):
+        """Invoice count, revenue, discount and items sold between two dates (inclusive)"""
+        session = self.SessionLocal()
+        try:
+            return self.sales_summary.get_totals(session, start_date, end_date)
+        except Exception as e:
+            self.logger.error(f"Error getting sales totals: {e}")
+            return {'invoice_count': 0, 'revenue': 0, 'discount': 0, 'items_sold': 0}
+        finally:
+            session.close()
+    
+    def get_tax_by_period(self, period, start_date=None, end_date=None):
+        """VAT per rate and Persian month, fiscal quarter or year from the monthly tax summary"""
+        session = self.SessionLocal()
+        try:
+            return self.tax_summary.get_periods(session, period, start_date, end_date)
+        except Exception as e:
+            self.logger.error(f"Error getting tax by period: {e}")
+            return []
+        finally:
+            session.close()
+    
     def get_invoices(self, search_term="", active_only=True):
         """Get invoices with search functionality"""
         session = self.SessionLocal()
@@ -363,38 +904,36 @@ class DatabaseService:
         finally:
             session.close()
     
+    def get_invoices_in_range(self, start_date, end_date, active_only=True):
+        """Get invoices between two dates, including archived fiscal years"""
+        try:
+            return self.archive_service.get_invoices(start_date, end_date, active_only)
+        except Exception as e:
+            self.logger.error(f"Error getting invoices in range: {e}")
+            return []
+    
+    def read_snapshot(self, start_date=None, end_date=None):
+        """Open a consistent read snapshot, attaching archives the date range needs"""
+        return ReadSnapshot(self, start_date, end_date)
+    
     def get_dashboard_stats(self):
         """Get dashboard statistics"""
         session = self.SessionLocal()
         try:
             # Today's stats
             today = datetime.now().date()
-            
-            today_invoices = session.query(Invoice).filter(
-                and_(Invoice.issue_date >= today,
-                     Invoice.is_active == True)
-            ).count()
-            
-            today_sales = session.query(Invoice).filter(
-                and_(Invoice.issue_date >= today,
-                     Invoice.is_active == True)
-            ).with_entities(Invoice.final_amount).all()
-            
-            today_revenue = sum(invoice.final_amount for invoice in today_sales if invoice.final_amount)
+            today_totals = self.sales_summary.get_totals(session, today, today)
             
             # Total stats
             total_products = session.query(Product).filter(Product.is_active == True).count()
-            total_invoices = session.query(Invoice).filter(Invoice.is_active == True).count()
+            total_invoices = self.sales_summary.get_totals(session)['invoice_count']
             
             # Low stock products
-            low_stock_products = session.query(Product).filter(
-                and_(Product.stock_quantity <= 5,
-                     Product.is_active == True)
-            ).count()
+            low_stock_products = self.low_stock_query(session).count()
             
             return {
-                'today_invoices': today_invoices,
-                'today_revenue': today_revenue,
+                'today_invoices': today_totals['invoice_count'],
+                'today_revenue': today_totals['revenue'],
                 'total_products': total_products,
                 'total_invoices': total_invoices,
                 'low_stock_products': low_stock_products
@@ -412,22 +951,33 @@ class DatabaseService:
         finally:
             session.close()
     
-    def backup_database(self):
-        """Create database backup"""
-        try:
-            backup_filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            backup_path = os.path.join('backups', backup_filename)
-            shutil.copy2(self.db_path, backup_path)
-            self.logger.info(f"Database backup created: {backup_path}")
-            return True, f"پشتیبان در مسیر {backup_path} ایجاد شد"
-        except Exception as e:
-            self.logger.error(f"Error creating backup: {e}")
-            return False, f"خطا در ایجاد پشتیبان: {str(e)}"
+    def backup_database(self, progress=None):
+        """Create a consistent, rotated database backup"""
+        backup_service = BackupService(self.db_path, self.get_settings_store())
+        return backup_service.create_backup(progress)
     
     def close(self):
         """Close database connection"""
         try:
+            self.audit_log.close()
             self.SessionLocal.remove()
             self.engine.dispose()
         except Exception as e:
-            self.logger.error(f"Error closing database: {e}")
\ No newline at end of file
+            self.logger.error(f"Error closing database: {e}")
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_database_service(db_path="invoicing.db"):
+    """Return the database service shared by every view on the same database
+    
+    Schema checks and summary preparation then run once per process
+    instead of once per view.
+    """
+    key = os.path.abspath(db_path)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = DatabaseService(db_path)
+            _services[key] = service
+        return service
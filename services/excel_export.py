@@ -0,0 +1,72 @@
+"""
+Excel Export for Persian Invoicing System
+Streaming right-to-left workbooks written row by row in openpyxl write-only mode
+"""
+
+from collections import namedtuple
+
+AMOUNT_FORMAT = '#,##0'
+PERCENT_FORMAT = '0.##'
+
+ExcelColumn = namedtuple('ExcelColumn', ['title', 'width', 'number_format'], defaults=[16, None])
+
+ExcelSheet = namedtuple('ExcelSheet', ['title', 'columns', 'rows'])
+
+HEADER_COLOR = 'FFFFFF'
+HEADER_BACKGROUND = '2E7D32'
+
+def write_excel(file_path, sheets, progress=None, progress_every=10000):
+    """Write sheets to an xlsx file without holding their rows in memory
+
+    Each sheet's rows is any iterable of value sequences, such as a
+    database cursor; rows are written as they are produced. progress, if
+    given, is called with the running row count every progress_every rows.
+    Returns the number of data rows written. openpyxl is imported on first
+    use and raises ImportError if it is not installed.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    header_font = Font(name='Vazirmatn', bold=True, color=HEADER_COLOR)
+    header_fill = PatternFill('solid', fgColor=HEADER_BACKGROUND)
+    header_alignment = Alignment(horizontal='center', vertical='center')
+
+    workbook = Workbook(write_only=True)
+    written = 0
+
+    for sheet in sheets:
+        worksheet = workbook.create_sheet(sheet.title[:31])
+        worksheet.sheet_view.rightToLeft = True
+        worksheet.freeze_panes = 'A2'
+        for index, column in enumerate(sheet.columns, 1):
+            worksheet.column_dimensions[get_column_letter(index)].width = column.width
+
+        header = []
+        for column in sheet.columns:
+            cell = WriteOnlyCell(worksheet, value=column.title)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header.append(cell)
+        worksheet.append(header)
+
+        # Only formatted columns need a styled cell; the rest are written as plain values
+        formats = [(index, column.number_format) for index, column in enumerate(sheet.columns)
+                   if column.number_format]
+        for row in sheet.rows:
+            if formats:
+                row = list(row)
+                for index, number_format in formats:
+                    cell = WriteOnlyCell(worksheet, value=row[index])
+                    cell.number_format = number_format
+                    row[index] = cell
+            worksheet.append(row)
+
+            written += 1
+            if progress and written % progress_every == 0:
+                progress(written)
+
+    workbook.save(file_path)
+    return written
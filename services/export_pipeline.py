@@ -0,0 +1,277 @@
+"""
+Export Pipeline for Persian Invoicing System
+Streams report rows from a read snapshot through a row transformer into a file sink
+"""
+
+import csv
+import json
+import os
+from collections import namedtuple
+from importlib.util import find_spec
+from services.excel_export import AMOUNT_FORMAT, PERCENT_FORMAT, ExcelColumn, ExcelSheet, write_excel
+from services.persian_utils import jalali_date, to_persian_digits
+from services.sales_summary import PERIOD_LABELS
+from services.tax_summary import TAX_REPORT_PERIODS
+
+# Column kinds; dates are written as Persian dates, the others keep their value
+TEXT = 'text'
+NUMBER = 'number'
+AMOUNT = 'amount'
+PERCENT = 'percent'
+DATE = 'date'
+DATETIME = 'datetime'
+
+NUMERIC_KINDS = (NUMBER, AMOUNT, PERCENT)
+
+ExportColumn = namedtuple('ExportColumn', ['key', 'title', 'kind', 'width'], defaults=[TEXT, 16])
+
+ReportExport = namedtuple('ReportExport', ['title', 'columns', 'rows'])
+
+# Rows per chunk handed to a sink; progress is reported once per chunk
+CHUNK_SIZE = 5000
+
+def sales_rows(snapshot):
+    """One row per invoice, streamed"""
+    for invoice in snapshot.iter_invoices():
+        yield (
+            invoice['invoice_number'],
+            invoice['customer_name'],
+            invoice['issue_date'],
+            invoice['discount_amount'],
+            invoice['tax_amount'],
+            invoice['final_amount']
+        )
+
+def products_rows(snapshot):
+    """One row per active product"""
+    for product in snapshot.get_products():
+        yield (
+            product.name,
+            product.purchase_price,
+            product.sale_price,
+            product.stock_quantity,
+            product.stock_quantity * product.sale_price
+        )
+
+def customers_rows(snapshot):
+    """One row per customer, summed over streamed invoices"""
+    customers = {}
+    for invoice in snapshot.iter_invoices():
+        customer = customers.setdefault(invoice['customer_name'], [0, 0, invoice['customer_phone'], None])
+        customer[0] += 1
+        customer[1] += invoice['final_amount'] or 0
+        customer[3] = invoice['issue_date']  # Invoices arrive oldest first
+    for name, (invoice_count, total_amount, phone, last_purchase) in customers.items():
+        yield name, invoice_count, total_amount, phone or '', last_purchase
+
+def stock_rows(snapshot):
+    """One row per stock ledger entry, streamed"""
+    for movement in snapshot.iter_stock_movements():
+        yield (
+            movement['date'],
+            movement['product_name'],
+            movement['type_label'],
+            movement['quantity'],
+            movement['balance_after'],
+            movement['reference']
+        )
+
+def period_rows(period):
+    """Row source of a monthly, quarterly or yearly sales report"""
+    def rows(snapshot):
+        for row in snapshot.get_sales_by_period(period):
+            yield row['period'], row['invoice_count'], row['revenue'], row['discount'], row['items_sold']
+    return rows
+
+def tax_rows(period):
+    """Row source of a monthly or quarterly VAT report"""
+    def rows(snapshot):
+        for row in snapshot.get_tax_by_period(period):
+            yield row['period'], row['tax_rate'] / 100, row['line_count'], row['taxable_amount'], row['tax_amount']
+    return rows
+
+def report_export(report_type):
+    """Title, columns and row source of a report type"""
+    if report_type == 'sales':
+        return ReportExport('گزارش فروش', [
+            ExportColumn('invoice_number', 'شماره فاکتور', TEXT, 22),
+            ExportColumn('customer_name', 'نام مشتری', TEXT, 28),
+            ExportColumn('issue_date', 'تاریخ', DATE, 12),
+            ExportColumn('discount_amount', 'تخفیف', AMOUNT),
+            ExportColumn('tax_amount', 'مالیات', AMOUNT),
+            ExportColumn('final_amount', 'مبلغ نهایی', AMOUNT, 18)
+        ], sales_rows)
+    if report_type == 'products':
+        return ReportExport('گزارش کالاها', [
+            ExportColumn('name', 'نام کالا', TEXT, 32),
+            ExportColumn('purchase_price', 'قیمت خرید', AMOUNT),
+            ExportColumn('sale_price', 'قیمت فروش', AMOUNT),
+            ExportColumn('stock_quantity', 'موجودی', NUMBER, 10),
+            ExportColumn('stock_value', 'ارزش موجودی', AMOUNT, 18)
+        ], products_rows)
+    if report_type == 'customers':
+        return ReportExport('گزارش مشتریان', [
+            ExportColumn('customer_name', 'نام مشتری', TEXT, 28),
+            ExportColumn('invoice_count', 'تعداد فاکتور', NUMBER, 12),
+            ExportColumn('total_amount', 'مجموع خرید', AMOUNT, 18),
+            ExportColumn('phone', 'شماره تماس', TEXT),
+            ExportColumn('last_purchase', 'آخرین خرید', DATE, 12)
+        ], customers_rows)
+    if report_type == 'stock':
+        return ReportExport('گردش موجودی', [
+            ExportColumn('date', 'تاریخ', DATETIME, 18),
+            ExportColumn('product_name', 'نام کالا', TEXT, 32),
+            ExportColumn('movement_type', 'نوع گردش', TEXT, 14),
+            ExportColumn('quantity', 'تعداد', NUMBER, 10),
+            ExportColumn('balance_after', 'موجودی پس از گردش', NUMBER, 18),
+            ExportColumn('reference', 'سند مرجع', TEXT, 22)
+        ], stock_rows)
+    if report_type in PERIOD_LABELS:
+        return ReportExport('فروش دوره‌ای', [
+            ExportColumn('period', PERIOD_LABELS[report_type], TEXT, 20),
+            ExportColumn('invoice_count', 'تعداد فاکتور', NUMBER, 12),
+            ExportColumn('revenue', 'درآمد', AMOUNT, 18),
+            ExportColumn('discount', 'تخفیف', AMOUNT),
+            ExportColumn('items_sold', 'اقلام فروخته‌شده', NUMBER)
+        ], period_rows(report_type))
+    if report_type in TAX_REPORT_PERIODS:
+        period = TAX_REPORT_PERIODS[report_type]
+        return ReportExport('مالیات بر ارزش افزوده', [
+            ExportColumn('period', PERIOD_LABELS[period], TEXT, 20),
+            ExportColumn('tax_rate', 'نرخ مالیات (درصد)', PERCENT),
+            ExportColumn('line_count', 'تعداد اقلام', NUMBER, 12),
+            ExportColumn('taxable_amount', 'مبلغ مشمول مالیات', AMOUNT, 20),
+            ExportColumn('tax_amount', 'مالیات', AMOUNT)
+        ], tax_rows(period))
+    raise ValueError(f"Unknown report type: {report_type}")
+
+def transform_rows(columns, rows, persian_digits=False):
+    """Rows with Persian dates, and Persian digits in text columns if asked
+
+    Numeric columns always keep their values so other tools can read them.
+    """
+    converters = []
+    for column in columns:
+        if column.kind == DATE:
+            converter = jalali_date
+        elif column.kind == DATETIME:
+            converter = lambda value: jalali_date(value, with_time=True)
+        else:
+            converter = None
+
+        if persian_digits and column.kind not in NUMERIC_KINDS:
+            converter = (lambda value, inner=converter:
+                         to_persian_digits(inner(value) if inner else value) if value is not None else value)
+        converters.append(converter)
+
+    if not any(converters):
+        yield from rows
+        return
+
+    for row in rows:
+        yield tuple(converter(value) if converter else value for converter, value in zip(converters, row))
+
+def chunked(rows, size):
+    """Lists of up to size rows"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_xlsx(file_path, export, chunks):
+    """Write-only Excel workbook with one right-to-left sheet"""
+    number_formats = {AMOUNT: AMOUNT_FORMAT, NUMBER: AMOUNT_FORMAT, PERCENT: PERCENT_FORMAT}
+    columns = [ExcelColumn(column.title, column.width, number_formats.get(column.kind))
+               for column in export.columns]
+    write_excel(file_path, [ExcelSheet(export.title, columns, (row for chunk in chunks for row in chunk))])
+
+def write_delimited(file_path, export, chunks, delimiter):
+    """Delimited text with a title header; UTF-8 with BOM so Excel detects the encoding"""
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as output:
+        writer = csv.writer(output, delimiter=delimiter)
+        writer.writerow([column.title for column in export.columns])
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+def write_csv(file_path, export, chunks):
+    """Comma-separated values"""
+    write_delimited(file_path, export, chunks, ',')
+
+def write_tsv(file_path, export, chunks):
+    """Tab-separated values"""
+    write_delimited(file_path, export, chunks, '\t')
+
+def write_jsonl(file_path, export, chunks):
+    """One JSON object per row, keyed by column key"""
+    keys = [column.key for column in export.columns]
+    with open(file_path, 'w', encoding='utf-8') as output:
+        for chunk in chunks:
+            output.writelines(
+                json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=str) + '\n' for row in chunk
+            )
+
+def write_parquet(file_path, export, chunks):
+    """Parquet file written one row group per chunk; needs pyarrow"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {NUMBER: pa.int64(), AMOUNT: pa.int64(), PERCENT: pa.float64()}
+    schema = pa.schema([(column.key, types.get(column.kind, pa.string())) for column in export.columns])
+    with pq.ParquetWriter(file_path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)],
+                schema=schema
+            ))
+
+# File extension: (label, sink, extra dependency)
+EXPORT_FORMATS = {
+    'xlsx': ('Excel', write_xlsx, 'openpyxl'),
+    'csv': ('CSV', write_csv, None),
+    'tsv': ('TSV', write_tsv, None),
+    'jsonl': ('JSON Lines', write_jsonl, None),
+    'parquet': ('Parquet', write_parquet, 'pyarrow')
+}
+
+def available_formats():
+    """Export formats whose dependencies are installed"""
+    return [name for name, (_, _, module) in EXPORT_FORMATS.items()
+            if module is None or find_spec(module) is not None]
+
+def format_of(file_path):
+    """Export format named by a file's extension"""
+    return os.path.splitext(file_path)[1].lstrip('.').lower()
+
+def export_report(db_service, report_type, start_date, end_date, file_path, file_format=None,
+                  persian_digits=False, progress=None, chunk_size=CHUNK_SIZE):
+    """Stream a report into a file in one read snapshot
+
+    file_format defaults to the file's extension. progress, if given, is
+    called with the running row count after each chunk.
+    Returns the number of rows written.
+    """
+    file_format = file_format or format_of(file_path)
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    export = report_export(report_type)
+    sink = EXPORT_FORMATS[file_format][1]
+    written = 0
+
+    def counted(chunks):
+        nonlocal written
+        for chunk in chunks:
+            yield chunk
+            written += len(chunk)
+            if progress:
+                progress(written)
+
+    with db_service.read_snapshot(start_date, end_date) as snapshot:
+        rows = transform_rows(export.columns, export.rows(snapshot), persian_digits)
+        sink(file_path, export, counted(chunked(rows, chunk_size)))
+
+    return written
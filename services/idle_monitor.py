@@ -0,0 +1,101 @@
+"""
+Idle Monitor for Persian Invoicing System
+Application-wide activity tracking for the session timeout and auto-lock
+"""
+
+import logging
+from PyQt6.QtCore import QObject, QEvent, QElapsedTimer, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+class IdleMonitor(QObject):
+    """Event filter that notices user input and signals when the session has been idle too long"""
+
+    idle_timeout = pyqtSignal()
+
+    # Events that count as user activity; while locked they only reach the lock screen
+    ACTIVITY_EVENTS = frozenset({
+        QEvent.Type.KeyPress, QEvent.Type.KeyRelease, QEvent.Type.ShortcutOverride,
+        QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease,
+        QEvent.Type.MouseButtonDblClick, QEvent.Type.MouseMove, QEvent.Type.Wheel,
+        QEvent.Type.TouchBegin, QEvent.Type.TouchUpdate, QEvent.Type.TabletPress,
+        QEvent.Type.ContextMenu,
+    })
+
+    # How often the idle time is compared with the timeout
+    CHECK_INTERVAL_MS = 15 * 1000
+    SETTINGS_KEYS = ('security.auto_lock', 'security.session_timeout')
+
+    def __init__(self, settings_store, parent=None):
+        super().__init__(parent)
+        self.settings_store = settings_store
+        self.logger = logging.getLogger(__name__)
+        self.timeout_ms = 0
+        self.lock_widget = None
+
+        # Restarting a QElapsedTimer allocates nothing, unlike storing a new time object
+        self.activity = QElapsedTimer()
+        self.activity.start()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check_idle)
+
+    def start(self):
+        """Watch every event of the application and follow the security settings"""
+        QApplication.instance().installEventFilter(self)
+        self.settings_store.subscribe(self.on_settings_changed, self.SETTINGS_KEYS)
+        self.apply_settings()
+
+    def apply_settings(self):
+        """Start or stop the idle check according to settings"""
+        if self.settings_store.get('security.auto_lock'):
+            self.timeout_ms = max(1, self.settings_store.get('security.session_timeout')) * 60 * 1000
+            self.activity.restart()
+            self.timer.start(min(self.timeout_ms, self.CHECK_INTERVAL_MS))
+        else:
+            self.timeout_ms = 0
+            self.timer.stop()
+
+    def on_settings_changed(self, changed):
+        """Settings store subscriber for security settings"""
+        self.apply_settings()
+
+    def eventFilter(self, obj, event):
+        """Record user input; while locked, drop input meant for anything but the lock screen"""
+        event_type = event.type()
+        if event_type in self.ACTIVITY_EVENTS:
+            self.activity.restart()
+            if self.lock_widget is not None and obj.isWidgetType() and not (
+                obj is self.lock_widget or self.lock_widget.isAncestorOf(obj)
+            ):
+                return True
+        elif event_type == QEvent.Type.Shortcut and self.lock_widget is not None:
+            # Menu and window shortcuts stay dead until the session is unlocked
+            return True
+        return False
+
+    def idle_ms(self):
+        """Milliseconds since the last user input"""
+        return self.activity.elapsed()
+
+    def check_idle(self):
+        """Signal a timeout once the session has been idle for the configured time"""
+        if self.lock_widget is None and self.timeout_ms and self.activity.elapsed() >= self.timeout_ms:
+            self.logger.info(f"Session idle for {self.activity.elapsed() // 1000} s")
+            self.idle_timeout.emit()
+
+    def lock(self, lock_widget):
+        """Let input reach only lock_widget and its children"""
+        self.lock_widget = lock_widget
+
+    def unlock(self):
+        """Let input reach every widget again and start a new idle period"""
+        self.lock_widget = None
+        self.activity.restart()
+
+    def stop(self):
+        """Stop watching events and settings"""
+        self.timer.stop()
+        self.settings_store.unsubscribe(self.on_settings_changed)
+        app = QApplication.instance()
+        if app is not None:
+            app.removeEventFilter(self)
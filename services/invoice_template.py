@@ -0,0 +1,192 @@
+"""
+Invoice Template Service for Persian Invoicing System
+Declarative invoice layouts compiled once into cached layout plans
+"""
+
+import copy
+import json
+import os
+import threading
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QColor, QFontMetrics
+
+# Every output lays invoices out in pixels of a 96-DPI page and scales to its device
+LOGICAL_DPI = 96
+
+# Sections drawn above the items table on the first page
+INTRO_SECTIONS = ('header', 'invoice_info', 'customer_info')
+# Sections drawn below the items table on the last page
+CLOSING_SECTIONS = ('totals', 'footer')
+
+DEFAULT_TEMPLATE = {
+    'title': 'فاکتور فروش',
+    'sections': ['header', 'invoice_info', 'customer_info', 'items_table', 'totals', 'footer'],
+    'page': {
+        'margin_ratio': 0.05,
+        'signature_reserve': 60,
+        'background_opacity': 0.1
+    },
+    'fonts': {
+        'title': {'family': 'Vazirmatn', 'size': 16, 'bold': True},
+        'header': {'family': 'Vazirmatn', 'size': 14, 'bold': True},
+        'normal': {'family': 'Vazirmatn', 'size': 11},
+        'small': {'family': 'Vazirmatn', 'size': 9},
+        'table': {'family': 'Vazirmatn', 'size': 10},
+        'total': {'family': 'Vazirmatn', 'size': 12, 'bold': True}
+    },
+    'colors': {
+        'primary': '#2980b9',
+        'secondary': '#2e7d32',
+        'text': '#212121',
+        'light_gray': '#f5f5f5',
+        'border': '#c8c8c8',
+        'alternate_row': '#fafafa'
+    },
+    'table': {
+        'header_height': 40,
+        'row_height': 35,
+        'columns': [
+            {'key': 'product_name', 'title': 'نام کالا', 'width': 0.4, 'align': 'left'},
+            {'key': 'quantity', 'title': 'تعداد', 'width': 0.15, 'align': 'center'},
+            {'key': 'unit_price', 'title': 'قیمت واحد (تومان)', 'width': 0.225,
+             'align': 'center', 'format': 'money'},
+            {'key': 'total_price', 'title': 'قیمت کل (تومان)', 'width': 0.225,
+             'align': 'center', 'format': 'money'}
+        ]
+    },
+    'logo': {
+        'path': '',
+        'position': 'top-right',
+        'width': 120,
+        'height': 60
+    }
+}
+
+def merge_template(base, overrides):
+    """Recursively merge overrides into a copy of base"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_template(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def load_template(path=None):
+    """Load a template file (JSON, or YAML when PyYAML is installed) over the defaults"""
+    if not path:
+        return copy.deepcopy(DEFAULT_TEMPLATE)
+
+    with open(path, 'r', encoding='utf-8') as template_file:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("برای قالب‌های YAML نصب کتابخانه PyYAML الزامی است")
+            overrides = yaml.safe_load(template_file) or {}
+        else:
+            overrides = json.load(template_file)
+
+    if not isinstance(overrides, dict):
+        raise ValueError(f"قالب فاکتور نامعتبر است: {path}")
+
+    return merge_template(DEFAULT_TEMPLATE, overrides)
+
+def _make_font(spec):
+    """Build a QFont from a template font spec (size in points)
+
+    The size is fixed in logical pixels so text keeps its place in the layout
+    on printers and images of any resolution.
+    """
+    font = QFont(spec.get('family', 'Vazirmatn'))
+    font.setPixelSize(round(int(spec.get('size', 11)) * LOGICAL_DPI / 72))
+    if spec.get('bold'):
+        font.setWeight(QFont.Weight.Bold)
+    return font
+
+class LayoutPlan:
+    """Compiled invoice template: fonts, colours, metrics and geometry resolved once"""
+
+    def __init__(self, template):
+        self.template = template
+        self.title = template['title']
+
+        sections = list(template['sections'])
+        if 'items_table' not in sections:
+            sections.append('items_table')
+        table_index = sections.index('items_table')
+        self.intro_sections = tuple(s for s in sections[:table_index] if s in INTRO_SECTIONS)
+        self.closing_sections = tuple(s for s in sections[table_index + 1:] if s in CLOSING_SECTIONS)
+
+        page = template['page']
+        self.margin_ratio = float(page['margin_ratio'])
+        self.signature_reserve = int(page['signature_reserve'])
+        self.background_opacity = float(page['background_opacity'])
+
+        self.fonts = {name: _make_font(spec) for name, spec in template['fonts'].items()}
+        self.colors = {name: QColor(value) for name, value in template['colors'].items()}
+        self.line_heights = {name: QFontMetrics(font).height() for name, font in self.fonts.items()}
+
+        table = template['table']
+        self.table_header_height = int(table['header_height'])
+        self.table_row_height = int(table['row_height'])
+        self.columns = table['columns']
+        self.column_ratios = tuple(float(column['width']) for column in self.columns)
+        self.column_titles = tuple(column['title'] for column in self.columns)
+        self._column_widths = {}
+
+        logo = template['logo']
+        self.logo_path = logo.get('path') or ''
+        self.logo_position = logo.get('position', 'top-right')
+        self.logo_width = int(logo.get('width', 120))
+        self.logo_height = int(logo.get('height', 60))
+
+        # Fixed part of the totals box (four lines + padding)
+        self.totals_box_height = self.line_heights['normal'] * 5 + 40
+
+    def column_widths(self, table_width):
+        """Column widths in pixels for a table width, cached per width"""
+        widths = self._column_widths.get(table_width)
+        if widths is None:
+            widths = tuple(int(table_width * ratio) for ratio in self.column_ratios)
+            self._column_widths[table_width] = widths
+        return widths
+
+    def column_alignment(self, index):
+        """Horizontal alignment of a column"""
+        if self.columns[index].get('align') == 'left':
+            return Qt.AlignmentFlag.AlignLeft
+        return Qt.AlignmentFlag.AlignHCenter
+
+    def format_cell(self, item, index):
+        """Format an item value for a column"""
+        column = self.columns[index]
+        value = item.get(column['key'], '')
+        if column.get('format') == 'money':
+            return f"{value or 0:,}"
+        return str(value if value is not None else '')
+
+    def has_logo(self):
+        """Whether the template places a logo that exists on disk"""
+        return bool(self.logo_path) and os.path.exists(self.logo_path)
+
+_plan_cache = {}
+_plan_lock = threading.Lock()
+
+def compile_template(path=None):
+    """Return the compiled LayoutPlan for a template, cached until the file changes"""
+    if path:
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+    else:
+        key = (None, None)
+
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is None:
+            plan = LayoutPlan(load_template(path))
+            # Drop plans compiled from older versions of the same file
+            for stale_key in [k for k in _plan_cache if k[0] == path]:
+                del _plan_cache[stale_key]
+            _plan_cache[key] = plan
+        return plan
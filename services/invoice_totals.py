@@ -0,0 +1,201 @@
+"""
+Invoice Totals for Persian Invoicing System
+One engine for line totals, discounts, VAT and rounding, per invoice or in batches
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from services.persian_utils import to_latin_digits
+
+try:
+    import numpy as np
+except ImportError:  # Batches fall back to the per-invoice path
+    np = None
+
+# Tax rates are integer basis points: 900 is 9%
+TAX_RATE_SCALE = 10000
+
+# Above this the batch path's int64 products could overflow
+_INT64_SAFE = 2 ** 62
+
+def to_money(value):
+    """Whole Toman amount from an int, float, Decimal or text, rounded half up"""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = to_latin_digits(value).strip() or "0"
+    return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def percent_to_basis_points(percent):
+    """Basis points of a percentage such as 9, 9.5 or -12.5, rounded half up"""
+    return int((Decimal(str(percent or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def tax_rate_from_percent(percent):
+    """Basis-point tax rate of a percentage such as 9 or 9.5"""
+    return percent_to_basis_points(percent)
+
+def tax_of(taxable, tax_rate):
+    """Tax on an amount at a basis-point rate, rounded half up"""
+    return (taxable * tax_rate + TAX_RATE_SCALE // 2) // TAX_RATE_SCALE
+
+@dataclass(frozen=True)
+class LineTotals:
+    """Computed amounts of one invoice line"""
+    quantity: int
+    unit_price: int
+    total_price: int  # quantity * unit_price
+    discount: int  # Share of the invoice discount
+    tax_rate: int
+    tax: int
+
+    @property
+    def taxable(self):
+        """Amount after discount that tax applies to"""
+        return self.total_price - self.discount
+
+@dataclass(frozen=True)
+class InvoiceTotals:
+    """Computed amounts of one invoice"""
+    lines: tuple
+    subtotal: int
+    discount: int
+    tax: int
+    final_amount: int
+
+    @property
+    def taxable(self):
+        """Subtotal after discount"""
+        return self.subtotal - self.discount
+
+def allocate_discount(discount, totals):
+    """Split discount over line totals in proportion, largest remainder first
+
+    Ties go to the earlier line, so the split is deterministic.
+    """
+    subtotal = sum(totals)
+    if not subtotal or not discount:
+        return [0] * len(totals)
+
+    shares = []
+    remainders = []
+    for index, total in enumerate(totals):
+        share, remainder = divmod(discount * total, subtotal)
+        shares.append(share)
+        remainders.append((-remainder, index))
+
+    for _, index in sorted(remainders)[:discount - sum(shares)]:
+        shares[index] += 1
+    return shares
+
+def compute_invoice(items, discount=0):
+    """Totals of one invoice
+
+    items are dicts with quantity, unit_price and optionally tax_rate.
+    The discount is clamped to the subtotal and spread over the lines
+    before tax.
+    """
+    quantities = [int(item['quantity']) for item in items]
+    prices = [to_money(item['unit_price']) for item in items]
+    rates = [int(item.get('tax_rate') or 0) for item in items]
+    totals = [quantity * price for quantity, price in zip(quantities, prices)]
+
+    subtotal = sum(totals)
+    discount = min(max(to_money(discount), 0), subtotal)
+    shares = allocate_discount(discount, totals)
+
+    lines = tuple(
+        LineTotals(quantity, price, total, share, rate, tax_of(total - share, rate))
+        for quantity, price, total, share, rate in zip(quantities, prices, totals, shares, rates)
+    )
+    tax = sum(line.tax for line in lines)
+    return InvoiceTotals(lines, subtotal, discount, tax, subtotal - discount + tax)
+
+def compute_batch(invoice_index, quantities, unit_prices, tax_rates, discounts):
+    """Totals of many invoices at once
+
+    Lines are given as parallel sequences; invoice_index maps each line to
+    its invoice's position in discounts. Returns a dict of per-line arrays
+    (total_price, discount, tax) and per-invoice arrays (subtotal, discount,
+    tax, final_amount), identical to compute_invoice for every invoice.
+    """
+    if np is None:
+        return _compute_batch_python(invoice_index, quantities, unit_prices, tax_rates, discounts)
+
+    invoice_index = np.asarray(invoice_index, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    unit_prices = np.asarray(unit_prices, dtype=np.int64)
+    tax_rates = np.asarray(tax_rates, dtype=np.int64)
+    requested = np.asarray(discounts, dtype=np.int64)
+    invoice_count = len(requested)
+
+    line_totals = quantities * unit_prices
+    subtotals = np.zeros(invoice_count, dtype=np.int64)
+    np.add.at(subtotals, invoice_index, line_totals)
+    invoice_discounts = np.minimum(np.maximum(requested, 0), subtotals)
+
+    if len(line_totals) and int(invoice_discounts.max(initial=0)) * int(line_totals.max()) >= _INT64_SAFE:
+        return _compute_batch_python(invoice_index, quantities, unit_prices, tax_rates, discounts)
+
+    # Proportional shares, then the leftover units to the largest remainders
+    line_subtotals = subtotals[invoice_index]
+    safe_subtotals = np.where(line_subtotals == 0, 1, line_subtotals)
+    weighted = invoice_discounts[invoice_index] * line_totals
+    shares = weighted // safe_subtotals
+    remainders = weighted % safe_subtotals
+
+    allocated = np.zeros(invoice_count, dtype=np.int64)
+    np.add.at(allocated, invoice_index, shares)
+    leftover = invoice_discounts - allocated
+
+    order = np.lexsort((np.arange(len(line_totals)), -remainders, invoice_index))
+    sorted_invoices = invoice_index[order]
+    group_starts = np.searchsorted(sorted_invoices, sorted_invoices, side='left')
+    rank = np.arange(len(order)) - group_starts
+    shares[order] += (rank < leftover[sorted_invoices]).astype(np.int64)
+
+    line_taxes = ((line_totals - shares) * tax_rates + TAX_RATE_SCALE // 2) // TAX_RATE_SCALE
+    taxes = np.zeros(invoice_count, dtype=np.int64)
+    np.add.at(taxes, invoice_index, line_taxes)
+
+    return {
+        'line_total_price': line_totals,
+        'line_discount': shares,
+        'line_tax': line_taxes,
+        'subtotal': subtotals,
+        'discount': invoice_discounts,
+        'tax': taxes,
+        'final_amount': subtotals - invoice_discounts + taxes,
+    }
+
+def _compute_batch_python(invoice_index, quantities, unit_prices, tax_rates, discounts):
+    """compute_batch without NumPy, one invoice at a time"""
+    invoice_lines = [[] for _ in discounts]
+    for line, invoice in enumerate(invoice_index):
+        invoice_lines[int(invoice)].append(line)
+
+    line_count = len(invoice_index)
+    result = {key: [0] * line_count for key in ('line_total_price', 'line_discount', 'line_tax')}
+    result.update({key: [] for key in ('subtotal', 'discount', 'tax', 'final_amount')})
+
+    for invoice, lines in enumerate(invoice_lines):
+        totals = compute_invoice([
+            {
+                'quantity': int(quantities[line]),
+                'unit_price': int(unit_prices[line]),
+                'tax_rate': int(tax_rates[line])
+            }
+            for line in lines
+        ], int(discounts[invoice]))
+
+        for line, line_totals in zip(lines, totals.lines):
+            result['line_total_price'][line] = line_totals.total_price
+            result['line_discount'][line] = line_totals.discount
+            result['line_tax'][line] = line_totals.tax
+        result['subtotal'].append(totals.subtotal)
+        result['discount'].append(totals.discount)
+        result['tax'].append(totals.tax)
+        result['final_amount'].append(totals.final_amount)
+
+    return result
@@ -0,0 +1,108 @@
+"""
+Jalali Calendar for Persian Invoicing System
+Precomputed Persian calendar dimension stored in SQLite and cached in memory
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert, select
+from database.models import JalaliCalendarDay
+import jdatetime
+
+# Fixed public holidays of the solar calendar as (month, day); lunar holidays
+# move every year and are not included
+SOLAR_HOLIDAYS = {
+    (1, 1), (1, 2), (1, 3), (1, 4), (1, 12), (1, 13),
+    (3, 14), (3, 15), (11, 22), (12, 29)
+}
+
+FRIDAY = 6
+
+CALENDAR_COLUMNS = [column.name for column in JalaliCalendarDay.__table__.columns]
+
+JalaliDay = namedtuple('JalaliDay', CALENDAR_COLUMNS)
+
+def compute_day(value):
+    """Calendar attributes of a Gregorian date"""
+    jdate = jdatetime.date.fromgregorian(date=value)
+    weekday = jdate.weekday()
+    first_weekday = jdatetime.date(jdate.year, 1, 1).weekday()
+    return JalaliDay(
+        gregorian_date=value,
+        jalali_key=jdate.year * 10000 + jdate.month * 100 + jdate.day,
+        jalali_date=f"{jdate.year:04d}/{jdate.month:02d}/{jdate.day:02d}",
+        year=jdate.year,
+        month=jdate.month,
+        day=jdate.day,
+        weekday=weekday,
+        week_of_year=(jdate.yday() - 1 + first_weekday) // 7 + 1,
+        fiscal_quarter=(jdate.month - 1) // 3 + 1,
+        is_holiday=weekday == FRIDAY or (jdate.month, jdate.day) in SOLAR_HOLIDAYS
+    )
+
+_days = {}
+
+def jalali_day(value):
+    """Calendar entry of a date or datetime; a dict lookup once cached"""
+    if isinstance(value, datetime):
+        value = value.date()
+    day = _days.get(value)
+    if day is None:
+        day = compute_day(value)
+        _days[value] = day
+    return day
+
+class JalaliCalendar:
+    """Calendar table covering every sales day plus a year ahead"""
+
+    # Days kept ahead of today so new sales always have a calendar row
+    DAYS_AHEAD = 366
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def prepare(self, first_date=None):
+        """Cover first_date (or today) through DAYS_AHEAD and load the cache"""
+        today = date.today()
+        start = min(first_date or today, today)
+        self.ensure_range(start, today + timedelta(days=self.DAYS_AHEAD))
+        self.load()
+
+    def ensure_range(self, start, end):
+        """Insert missing days so the table covers start..end contiguously"""
+        table = JalaliCalendarDay.__table__
+        with self._lock, self.engine.begin() as connection:
+            first, last = connection.execute(
+                select(func.min(table.c.gregorian_date), func.max(table.c.gregorian_date))
+            ).one()
+
+            if first is None:
+                missing = [(start, end)]
+            else:
+                missing = []
+                if start < first:
+                    missing.append((start, first - timedelta(days=1)))
+                if end > last:
+                    missing.append((last + timedelta(days=1), end))
+
+            rows = []
+            for range_start, range_end in missing:
+                for offset in range((range_end - range_start).days + 1):
+                    day = compute_day(range_start + timedelta(days=offset))
+                    _days[day.gregorian_date] = day
+                    rows.append(day._asdict())
+
+            if rows:
+                connection.execute(insert(table), rows)
+                self.logger.info(f"Jalali calendar extended by {len(rows)} days")
+
+    def load(self):
+        """Load every calendar row into the in-memory cache"""
+        table = JalaliCalendarDay.__table__
+        with self.engine.connect() as connection:
+            for row in connection.execute(select(table)):
+                _days[row.gregorian_date] = JalaliDay(*row)
@@ -0,0 +1,178 @@
+"""
+Maintenance Service for Persian Invoicing System
+Integrity checks, statistics refresh, vacuuming and index rebuilds
+"""
+
+import os
+import sqlite3
+import logging
+
+class MaintenanceService:
+    """SQLite maintenance operations with progress reporting"""
+
+    # Seconds to wait for other connections to release their locks
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+
+    def connect(self):
+        """Autocommit connection, required by VACUUM"""
+        return sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+
+    def database_stats(self):
+        """File size and page statistics of the database"""
+        connection = self.connect()
+        try:
+            page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+            page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            connection.close()
+
+        wal_path = f"{self.db_path}-wal"
+        return {
+            'file_size': os.path.getsize(self.db_path),
+            'wal_size': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'auto_vacuum': auto_vacuum,
+        }
+
+    def fts_tables(self, connection):
+        """Names of full-text search tables"""
+        rows = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%USING fts%'"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def check_integrity(self, connection, quick=False):
+        """Run integrity_check (or quick_check); return a list of problems"""
+        pragma = "quick_check" if quick else "integrity_check"
+        rows = connection.execute(f"PRAGMA {pragma}").fetchall()
+        problems = [row[0] for row in rows]
+        return [] if problems == ['ok'] else problems
+
+    def current_stats(self):
+        """database_stats(), or None if the database cannot be read"""
+        try:
+            return self.database_stats()
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"Error reading database statistics: {e}")
+            return None
+
+    def run_steps(self, steps, progress=None):
+        """Run (title, function) steps, reporting progress(percent, title)
+
+        Stops at the first step that raises. Returns (before_stats, after_stats,
+        failed step title, error); the last two are None when every step ran.
+        """
+        before = self.database_stats()
+        failed_step = error = None
+        connection = self.connect()
+        try:
+            for index, (title, step) in enumerate(steps):
+                if progress:
+                    progress(int(index * 100 / len(steps)), title)
+                self.logger.info(f"Maintenance step: {title}")
+                try:
+                    step(connection)
+                except Exception as e:
+                    failed_step, error = title, e
+                    break
+        finally:
+            connection.close()
+
+        if progress and error is None:
+            progress(100, "پایان")
+        return before, self.current_stats(), failed_step, error
+
+    def optimize(self, progress=None):
+        """Quick check, refresh statistics and reclaim free pages
+
+        Returns (success, message, before_stats, after_stats).
+        """
+        def quick_check(connection):
+            problems = self.check_integrity(connection, quick=True)
+            if problems:
+                raise ValueError("دیتابیس آسیب دیده است؛ ابتدا تعمیر دیتابیس را اجرا کنید")
+
+        def vacuum(connection):
+            if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # incremental_vacuum frees one page per step; executescript runs it to the end
+                connection.executescript("PRAGMA incremental_vacuum;")
+                # In WAL mode the file only shrinks when the freed pages are checkpointed
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            else:
+                # One full VACUUM switches the file to incremental mode
+                connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.execute("VACUUM")
+
+        steps = [
+            ("بررسی سریع سلامت", quick_check),
+            ("به‌روزرسانی آمار جداول", lambda connection: connection.execute("ANALYZE")),
+            ("بهینه‌سازی برنامه‌ریز پرس‌وجو", lambda connection: connection.execute("PRAGMA optimize")),
+            ("آزادسازی فضای خالی", vacuum),
+        ]
+
+        try:
+            before, after, failed_step, error = self.run_steps(steps, progress)
+        except Exception as e:
+            self.logger.error(f"Error optimizing database: {e}")
+            return False, f"خطا در بهینه‌سازی دیتابیس: {str(e)}", None, None
+
+        if error is not None:
+            self.logger.error(f"Error optimizing database at step {failed_step!r}: {error}")
+            return False, f"خطا در بهینه‌سازی دیتابیس، مرحله «{failed_step}»: {error}", before, after
+        return True, "دیتابیس با موفقیت بهینه‌سازی شد", before, after
+
+    def repair(self, progress=None):
+        """Full integrity check, rebuild indexes and full-text indexes
+
+        REINDEX and the full-text rebuild only fix index problems, so the
+        message reports what the final check still finds.
+        Returns (success, message, before_stats, after_stats).
+        """
+        problems_found = []
+        problems_left = []
+
+        def integrity_check(connection):
+            problems_found.extend(self.check_integrity(connection))
+
+        def rebuild_fts(connection):
+            for table in self.fts_tables(connection):
+                connection.execute(f"INSERT INTO \"{table}\"(\"{table}\") VALUES('rebuild')")
+
+        def verify(connection):
+            problems_left.extend(self.check_integrity(connection))
+
+        steps = [
+            ("بررسی کامل سلامت", integrity_check),
+            ("بازسازی ایندکس‌ها", lambda connection: connection.execute("REINDEX")),
+            ("بازسازی ایندکس‌های جستجو", rebuild_fts),
+            ("بررسی نهایی", verify),
+        ]
+
+        try:
+            before, after, failed_step, error = self.run_steps(steps, progress)
+        except Exception as e:
+            self.logger.error(f"Error repairing database: {e}")
+            return False, f"خطا در تعمیر دیتابیس: {str(e)}", None, None
+
+        if error is not None:
+            self.logger.error(f"Error repairing database at step {failed_step!r}: {error}")
+            return False, f"خطا در تعمیر دیتابیس، مرحله «{failed_step}»: {error}", before, after
+        if problems_left:
+            self.logger.warning(f"Repair left {len(problems_left)} integrity problems")
+            message = (f"{len(problems_found)} مشکل یافت شد و پس از بازسازی ایندکس‌ها "
+                       f"{len(problems_left)} مشکل باقی ماند؛ از آخرین پشتیبان بازیابی کنید\n"
+                       + "؛ ".join(problems_left[:5]))
+            return False, message, before, after
+        if problems_found:
+            message = f"{len(problems_found)} مشکل یافت شد؛ بررسی نهایی پس از بازسازی ایندکس‌ها مشکلی نشان نمی‌دهد"
+        else:
+            message = "مشکلی یافت نشد؛ ایندکس‌ها بازسازی شدند"
+        return True, message, before, after
@@ -0,0 +1,63 @@
+"""
+Persian Utilities for Persian Invoicing System
+Cached Jalali date formatting, digit conversion and number formatting
+"""
+
+PERSIAN_DIGITS = '۰۱۲۳۴۵۶۷۸۹'
+ARABIC_DIGITS = '٠١٢٣٤٥٦٧٨٩'
+LATIN_DIGITS = '0123456789'
+
+# Persian digits with the Arabic thousands separator
+_TO_PERSIAN = str.maketrans(LATIN_DIGITS + ',', PERSIAN_DIGITS + '٬')
+# Latin digits with thousands separators removed
+_TO_LATIN = str.maketrans(PERSIAN_DIGITS + ARABIC_DIGITS, LATIN_DIGITS * 2, ',٬')
+
+def to_persian_digits(value):
+    """Text of value with Persian digits"""
+    return str(value).translate(_TO_PERSIAN)
+
+def to_latin_digits(text):
+    """Text with Latin digits and no thousands separators"""
+    return str(text).translate(_TO_LATIN)
+
+# Arabic letters commonly typed in place of their Persian forms
+_TO_PERSIAN_LETTERS = str.maketrans({'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه'})
+
+def normalize_text(text):
+    """Text with Persian yeh and kaf, single spaces and no surrounding whitespace"""
+    return ' '.join(str(text).translate(_TO_PERSIAN_LETTERS).split())
+
+def parse_number(text, default=0):
+    """Integer from user text in Latin, Persian or Arabic digits, with or without separators"""
+    try:
+        return int(float(to_latin_digits(text).strip()))
+    except (ValueError, TypeError):
+        return default
+
+def format_number(value, persian_digits=False):
+    """Integer with thousands separators"""
+    text = f"{int(value or 0):,}"
+    return text.translate(_TO_PERSIAN) if persian_digits else text
+
+def format_amount(value, persian_digits=False):
+    """Amount in Toman with thousands separators"""
+    return f"{format_number(value, persian_digits)} تومان"
+
+def _jalali_day(value):
+    """Calendar entry of a day, from the calendar's own cache
+
+    The calendar imports the models, which import this module, so it is
+    imported on the first call, which then rebinds this name to it.
+    """
+    global _jalali_day
+    from services.jalali_calendar import jalali_day as _jalali_day
+    return _jalali_day(value)
+
+def jalali_date(value, with_time=False, persian_digits=False):
+    """Persian YYYY/MM/DD of a date or datetime, optionally followed by HH:MM"""
+    if not value:
+        return ""
+    text = _jalali_day(value).jalali_date
+    if with_time:
+        text += value.strftime(' %H:%M')
+    return text.translate(_TO_PERSIAN) if persian_digits else text
@@ -0,0 +1,200 @@
+"""
+Price Update Service for Persian Invoicing System
+Rule-based bulk repricing applied with set-based SQL, with preview and undo
+"""
+
+import logging
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import Integer, and_, case, func, insert, literal, select, type_coerce, update
+from database.models import PriceUpdate, PriceUpdateItem, Product
+from services.invoice_totals import TAX_RATE_SCALE, percent_to_basis_points
+from services.persian_utils import format_number, normalize_text
+
+# Rule modes
+PERCENT_CHANGE = 'percent'
+MARKUP = 'markup'
+
+RULE_LABELS = {
+    PERCENT_CHANGE: 'تغییر درصدی قیمت فروش',
+    MARKUP: 'سود روی قیمت خرید'
+}
+
+PriceRule = namedtuple('PriceRule', ['mode', 'percent', 'rounding', 'name_filter', 'min_price', 'max_price'],
+                       defaults=[1000, '', None, None])
+
+def validate_rule(rule):
+    """Raise ValueError with a Persian message if a rule cannot be applied"""
+    if rule.mode not in RULE_LABELS:
+        raise ValueError("نوع قاعده قیمت نامعتبر است")
+    if rule.mode == PERCENT_CHANGE and percent_to_basis_points(rule.percent) <= -TAX_RATE_SCALE:
+        raise ValueError("کاهش قیمت باید کمتر از ۱۰۰ درصد باشد")
+    if rule.mode == MARKUP and percent_to_basis_points(rule.percent) < 0:
+        raise ValueError("درصد سود نمی‌تواند منفی باشد")
+    if int(rule.rounding or 1) < 1:
+        raise ValueError("مبلغ گرد کردن نامعتبر است")
+    if rule.min_price is not None and rule.max_price is not None and rule.min_price > rule.max_price:
+        raise ValueError("حداقل قیمت نمی‌تواند از حداکثر قیمت بیشتر باشد")
+
+def describe_rule(rule):
+    """Persian summary of a rule for the repricing history"""
+    parts = [f"{RULE_LABELS[rule.mode]} {rule.percent}٪"]
+    if int(rule.rounding or 1) > 1:
+        parts.append(f"گرد به {format_number(rule.rounding)} تومان")
+    if rule.name_filter:
+        parts.append(f"نام شامل «{normalize_text(rule.name_filter)}»")
+    if rule.min_price is not None:
+        parts.append(f"از {format_number(rule.min_price)}")
+    if rule.max_price is not None:
+        parts.append(f"تا {format_number(rule.max_price)}")
+    return "، ".join(parts)
+
+def new_price_expression(rule):
+    """SQL expression of a product's sale price under a rule, in whole Toman
+
+    Prices are rounded to the nearest step. When that would turn an
+    increase into a decrease or the reverse, the current price is kept
+    and the product is left out of the update.
+    """
+    base = Product.purchase_price if rule.mode == MARKUP else Product.sale_price
+    factor = TAX_RATE_SCALE + percent_to_basis_points(rule.percent)
+    price = (type_coerce(base, Integer) * factor + TAX_RATE_SCALE // 2) // TAX_RATE_SCALE
+
+    rounding = int(rule.rounding or 1)
+    if rounding > 1:
+        sale_price = type_coerce(Product.sale_price, Integer)
+        rounded = (price + rounding // 2) // rounding * rounding
+        price = case(
+            (and_(price > sale_price, rounded < sale_price), sale_price),
+            (and_(price < sale_price, rounded > sale_price), sale_price),
+            else_=rounded
+        )
+    return price
+
+def rule_condition(rule, new_price):
+    """Products a rule applies to and whose price it changes"""
+    sale_price = type_coerce(Product.sale_price, Integer)
+    # Rounding a low price to the nearest step can reach zero; such products keep their price
+    conditions = [Product.is_active == True, new_price != sale_price, new_price > 0]
+    if rule.mode == MARKUP:
+        # Without a purchase price a markup would zero the sale price
+        conditions.append(type_coerce(Product.purchase_price, Integer) > 0)
+    if rule.name_filter:
+        conditions.append(Product.name.contains(normalize_text(rule.name_filter), autoescape=True))
+    if rule.min_price is not None:
+        conditions.append(sale_price >= int(rule.min_price))
+    if rule.max_price is not None:
+        conditions.append(sale_price <= int(rule.max_price))
+    return and_(*conditions)
+
+class PriceUpdateService:
+    """Previews, applies and undoes repricing rules without loading product objects"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.logger = logging.getLogger(__name__)
+
+    def preview(self, rule, limit=200):
+        """Count, price totals and the first rows by name of the products a rule would change"""
+        validate_rule(rule)
+        new_price = new_price_expression(rule)
+        condition = rule_condition(rule, new_price)
+        sale_price = type_coerce(Product.sale_price, Integer)
+
+        with self.engine.connect() as connection:
+            count, old_total, new_total = connection.execute(
+                select(func.count(), func.coalesce(func.sum(sale_price), 0), func.coalesce(func.sum(new_price), 0))
+                .where(condition)
+            ).one()
+            rows = connection.execute(
+                select(Product.id, Product.name, Product.purchase_price, sale_price.label('old_price'),
+                       new_price.label('new_price'))
+                .where(condition).order_by(Product.name).limit(limit)
+            ).mappings().all()
+
+        return {
+            'count': count,
+            'old_total': old_total,
+            'new_total': new_total,
+            'rows': [dict(row, change=row['new_price'] - row['old_price']) for row in rows]
+        }
+
+    def apply(self, rule):
+        """Snapshot old and new prices, then reprice every matching product in one UPDATE
+
+        Returns (price update id, number of products repriced).
+        """
+        validate_rule(rule)
+        new_price = new_price_expression(rule)
+        items = PriceUpdateItem.__table__
+        products = Product.__table__
+
+        with self.engine.begin() as connection:
+            price_update_id = connection.execute(
+                insert(PriceUpdate.__table__).values(description=describe_rule(rule), created_at=datetime.now())
+            ).inserted_primary_key[0]
+
+            connection.execute(insert(items).from_select(
+                ['price_update_id', 'product_id', 'old_price', 'new_price'],
+                select(literal(price_update_id), Product.id, Product.sale_price, new_price)
+                .where(rule_condition(rule, new_price))
+            ))
+
+            count = connection.execute(
+                update(products)
+                .values(sale_price=items.c.new_price, updated_at=datetime.now())
+                .where(products.c.id == items.c.product_id, items.c.price_update_id == price_update_id)
+            ).rowcount
+
+            connection.execute(
+                update(PriceUpdate.__table__)
+                .values(product_count=count)
+                .where(PriceUpdate.__table__.c.id == price_update_id)
+            )
+
+        self.logger.info(f"Price update {price_update_id} repriced {count} products")
+        return price_update_id, count
+
+    def undo(self, price_update_id):
+        """Restore the old prices of a repricing run in one UPDATE
+
+        Products whose price was changed again since are left alone.
+        Returns (restored, skipped) product counts.
+        """
+        items = PriceUpdateItem.__table__
+        products = Product.__table__
+        updates = PriceUpdate.__table__
+
+        with self.engine.begin() as connection:
+            price_update = connection.execute(
+                select(updates.c.product_count, updates.c.undone_at).where(updates.c.id == price_update_id)
+            ).first()
+            if price_update is None:
+                raise ValueError("تغییر قیمت یافت نشد")
+            if price_update.undone_at is not None:
+                raise ValueError("این تغییر قیمت قبلاً بازگردانده شده است")
+
+            restored = connection.execute(
+                update(products)
+                .values(sale_price=items.c.old_price, updated_at=datetime.now())
+                .where(products.c.id == items.c.product_id,
+                       items.c.price_update_id == price_update_id,
+                       products.c.sale_price == items.c.new_price)
+            ).rowcount
+
+            connection.execute(
+                update(updates).values(undone_at=datetime.now()).where(updates.c.id == price_update_id)
+            )
+
+        self.logger.info(f"Price update {price_update_id} undone for {restored} products")
+        return restored, price_update.product_count - restored
+
+    def history(self, limit=20):
+        """Most recent repricing runs, newest first"""
+        updates = PriceUpdate.__table__
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(
+                select(updates.c.id, updates.c.description, updates.c.product_count,
+                       updates.c.created_at, updates.c.undone_at)
+                .order_by(updates.c.id.desc()).limit(limit)
+            ).mappings()]
@@ -4,64 +4,119 @@ Enhanced with PDF and image export capabilities
 """
 
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QRect, Qt
-from PyQt6.QtGui import (QPainter, QFont, QPixmap, QColor, QPen, 
-                        QBrush, QFontMetrics, QImage)
+from PyQt6.QtCore import QRect, QSize, QMarginsF, Qt
+from PyQt6.QtGui import (QPainter, QFont, QColor, QPen, QPageLayout,
+                        QPageSize, QBrush, QFontMetrics, QImage)
 from PyQt6.QtPrintSupport import QPrinter
-import jdatetime
+from services.invoice_template import LOGICAL_DPI, compile_template
+from services.persian_utils import format_amount, jalali_date, to_persian_digits
+from services.invoice_totals import compute_invoice
 
 class PrintService:
     """Enhanced print service with multiple export formats"""
     
-    def __init__(self):
+    # Scaled background and logo images kept per (path, size)
+    IMAGE_CACHE_SIZE = 8
+    
+    # Paper and margins of PDF exports and the printers the preview is laid out for
+    PAGE_SIZE = QPageSize.PageSizeId.A4
+    PAGE_MARGINS_MM = 20
+    # Resolution of image exports
+    IMAGE_DPI = 300
+    
+    # Settings the print service follows
+    SETTINGS_KEYS = ('printing.template_path', 'printing.show_logo')
+    
+    def __init__(self, template_path=None):
+        self._image_cache = OrderedDict()
+        self._image_lock = threading.Lock()
+        self.show_logo = True
+        self.set_template(template_path)
+        
+    def bind_settings(self, settings_store):
+        """Apply printing settings now and whenever they change"""
+        self.on_settings_changed({key: settings_store.get(key) for key in self.SETTINGS_KEYS})
+        settings_store.subscribe(self.on_settings_changed, self.SETTINGS_KEYS)
+        
+    def on_settings_changed(self, changed):
+        """Settings store subscriber for printing settings"""
+        if 'printing.show_logo' in changed:
+            self.show_logo = bool(changed['printing.show_logo'])
+        if 'printing.template_path' in changed:
+            try:
+                self.set_template(changed['printing.template_path'] or None)
+            except (OSError, ValueError) as e:
+                print(f"Error loading invoice template: {e}")
+        
+    def set_template(self, template_path=None):
+        """Switch to another invoice template (compiled plans are cached)"""
+        self.template_path = template_path
+        self.plan = compile_template(template_path)
         self.setup_fonts()
         self.setup_styles()
         
     def setup_fonts(self):
         """Setup fonts for different text elements"""
-        self.title_font = QFont("Vazirmatn", 16, QFont.Weight.Bold)
-        self.header_font = QFont("Vazirmatn", 14, QFont.Weight.Bold)
-        self.normal_font = QFont("Vazirmatn", 11)
-        self.small_font = QFont("Vazirmatn", 9)
-        self.table_font = QFont("Vazirmatn", 10)
+        fonts = self.plan.fonts
+        self.title_font = fonts['title']
+        self.header_font = fonts['header']
+        self.normal_font = fonts['normal']
+        self.small_font = fonts['small']
+        self.table_font = fonts['table']
+        self.total_font = fonts['total']
         
     def setup_styles(self):
         """Setup color and style constants"""
-        self.primary_color = QColor(41, 128, 185)  # Blue
-        self.secondary_color = QColor(46, 125, 50)  # Green
-        self.text_color = QColor(33, 33, 33)  # Dark gray
-        self.light_gray = QColor(245, 245, 245)
-        self.border_color = QColor(200, 200, 200)
-        
-    def print_invoice(self, invoice_data, printer):
-        """Print invoice to printer"""
+        colors = self.plan.colors
+        self.primary_color = colors['primary']
+        self.secondary_color = colors['secondary']
+        self.text_color = colors['text']
+        self.light_gray = colors['light_gray']
+        self.border_color = colors['border']
+        self.alternate_row_color = colors['alternate_row']
+        
+    def create_printer(self):
+        """High-resolution printer set to the invoice paper and margins"""
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        printer.setPageSize(QPageSize(self.PAGE_SIZE))
+        margin = self.PAGE_MARGINS_MM
+        printer.setPageMargins(QMarginsF(margin, margin, margin, margin), QPageLayout.Unit.Millimeter)
+        return printer
+    
+    def printer_page_rect(self, printer):
+        """Return the printable area of printer in logical 96-DPI pixels"""
+        paint_rect = printer.pageLayout().paintRectPixels(LOGICAL_DPI)
+        return QRect(0, 0, paint_rect.width(), paint_rect.height())
+    
+    def draw_on_printer(self, invoice_data, printer):
+        """Lay out on the logical page and scale the painter to the printer resolution"""
         painter = QPainter()
         painter.begin(printer)
         
         try:
-            self.draw_invoice(painter, invoice_data, printer.pageRect())
+            scale = printer.resolution() / LOGICAL_DPI
+            painter.scale(scale, scale)
+            self.draw_invoice(painter, invoice_data, self.printer_page_rect(printer),
+                              new_page=printer.newPage)
         finally:
             painter.end()
     
+    def print_invoice(self, invoice_data, printer):
+        """Print invoice to printer, one printer page per invoice page"""
+        self.draw_on_printer(invoice_data, printer)
+    
     def export_to_pdf(self, invoice_data, file_path):
         """Export invoice to PDF"""
         try:
-            printer = QPrinter(QPrinter.Mode.HighResolution)
+            printer = self.create_printer()
             printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
             printer.setOutputFileName(file_path)
-            printer.setPageSize(QPrinter.PageSize.A4)
-            printer.setPageMargins(20, 20, 20, 20, QPrinter.Unit.Millimeter)
-            
-            painter = QPainter()
-            painter.begin(printer)
-            
-            try:
-                self.draw_invoice(painter, invoice_data, printer.pageRect())
-                return True
-            finally:
-                painter.end()
+            self.draw_on_printer(invoice_data, printer)
+            return True
                 
         except Exception as e:
             print(f"Error exporting to PDF: {e}")
@@ -70,9 +125,11 @@ class PrintService:
     def export_to_image(self, invoice_data, file_path):
         """Export invoice to image (PNG/JPG)"""
         try:
-            # Create high-resolution image
-            width, height = 2480, 3508  # A4 at 300 DPI
-            image = QImage(width, height, QImage.Format.Format_RGB32)
+            # Whole A4 sheet laid out at 96 DPI and drawn at 300 DPI
+            page_size = QPageSize(self.PAGE_SIZE).sizePixels(LOGICAL_DPI)
+            scale = self.IMAGE_DPI / LOGICAL_DPI
+            image = QImage(round(page_size.width() * scale), round(page_size.height() * scale),
+                           QImage.Format.Format_RGB32)
             image.fill(Qt.GlobalColor.white)
             
             painter = QPainter()
@@ -80,7 +137,8 @@ class PrintService:
             painter.setRenderHint(QPainter.RenderHint.Antialiasing)
             
             try:
-                rect = QRect(0, 0, width, height)
+                painter.scale(scale, scale)
+                rect = QRect(0, 0, page_size.width(), page_size.height())
                 self.draw_invoice(painter, invoice_data, rect)
                 
                 # Save image
@@ -92,71 +150,266 @@ class PrintService:
             print(f"Error exporting to image: {e}")
             return False
     
-    def draw_invoice(self, painter, invoice_data, page_rect):
-        """Draw complete invoice on painter"""
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Calculate margins and content area
-        margin = min(page_rect.width(), page_rect.height()) * 0.05  # 5% margin
-        content_rect = QRect(
+    def content_rect(self, page_rect):
+        """Return the content area of a page after margins"""
+        margin = min(page_rect.width(), page_rect.height()) * self.plan.margin_ratio
+        return QRect(
             int(page_rect.x() + margin),
             int(page_rect.y() + margin),
             int(page_rect.width() - 2 * margin),
             int(page_rect.height() - 2 * margin)
         )
+    
+    def measure_intro_height(self, invoice_data):
+        """Height of the sections above the items table on the first page"""
+        plan = self.plan
+        line_heights = plan.line_heights
+        height = 0
+        
+        for section in plan.intro_sections:
+            if section == 'header':
+                # See draw_header
+                height += line_heights['title'] + 20
+                if self.logo_enabled() and plan.logo_position == 'top-center':
+                    height += plan.logo_height + 10
+                if invoice_data.get('header_text'):
+                    header_lines = invoice_data['header_text'].split('\\n')
+                    height += len(header_lines) * (line_heights['normal'] + 5) + 15
+                height += 30
+            elif section == 'invoice_info':
+                # See draw_invoice_info
+                height += line_heights['normal'] + 30
+            elif section == 'customer_info':
+                # See draw_customer_info
+                height += line_heights['header'] + 15
+                for key in ('customer_name', 'customer_phone', 'customer_address'):
+                    if invoice_data.get(key):
+                        height += line_heights['normal'] + 8
+                height += 20
+        
+        return height
+    
+    def measure_closing_height(self, invoice_data):
+        """Height of the sections below the items table on the last page"""
+        plan = self.plan
+        line_heights = plan.line_heights
+        height = 0
+        
+        if 'totals' in plan.closing_sections:
+            height += plan.totals_box_height + 30
+        
+        notes = invoice_data.get('notes', '')
+        if notes and 'footer' in plan.closing_sections:
+            height += line_heights['header'] + 10
+            height += len(notes.split('\\n')) * (line_heights['normal'] + 5) + 20
+        
+        return height
+    
+    def paginate(self, invoice_data, page_rect):
+        """Split invoice items into pages that fit page_rect
+        
+        Returns a list of (start, end) item ranges, one per page. The last
+        page may have an empty range when only the totals spill over.
+        """
+        plan = self.plan
+        items = invoice_data.get('items', [])
+        content_rect = self.content_rect(page_rect)
+        bottom = content_rect.y() + content_rect.height() - plan.signature_reserve
+        
+        pages = []
+        start = 0
+        current_y = content_rect.y() + self.measure_intro_height(invoice_data)
+        
+        while True:
+            available = bottom - current_y - plan.table_header_height
+            capacity = max(1, available // plan.table_row_height)
+            end = min(len(items), start + capacity)
+            pages.append((start, end))
+            
+            if end > start:
+                current_y += plan.table_header_height + (end - start) * plan.table_row_height + 20
+            start = end
+            
+            if start >= len(items):
+                break
+            current_y = content_rect.y()
+        
+        # Move totals to a page of their own if they do not fit under the table
+        if current_y + self.measure_closing_height(invoice_data) > bottom and items:
+            pages.append((len(items), len(items)))
         
+        return pages
+    
+    def draw_invoice(self, painter, invoice_data, page_rect, new_page=None):
+        """Draw complete invoice on painter
+        
+        When new_page is given, the invoice is split over several pages and
+        new_page() is called between them; otherwise everything is drawn on
+        a single page.
+        """
+        if new_page is None:
+            pages = [(0, len(invoice_data.get('items', [])))]
+        else:
+            pages = self.paginate(invoice_data, page_rect)
+        
+        for page_index in range(len(pages)):
+            if page_index > 0:
+                new_page()
+            self.draw_page(painter, invoice_data, page_rect, page_index, pages)
+    
+    def draw_page(self, painter, invoice_data, page_rect, page_index, pages):
+        """Draw a single page of a paginated invoice"""
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        content_rect = self.content_rect(page_rect)
         current_y = content_rect.y()
+        start, end = pages[page_index]
+        is_last_page = page_index == len(pages) - 1
         
         # Draw background if specified
         if invoice_data.get('background_image_path') and os.path.exists(invoice_data['background_image_path']):
             current_y = self.draw_background(painter, invoice_data['background_image_path'], content_rect, current_y)
         
-        # Draw header
-        current_y = self.draw_header(painter, invoice_data, content_rect, current_y)
+        section_painters = {
+            'header': self.draw_header,
+            'invoice_info': self.draw_invoice_info,
+            'customer_info': self.draw_customer_info,
+            'totals': self.draw_totals,
+            'footer': self.draw_footer
+        }
         
-        # Draw invoice info
-        current_y = self.draw_invoice_info(painter, invoice_data, content_rect, current_y)
-        
-        # Draw customer info
-        current_y = self.draw_customer_info(painter, invoice_data, content_rect, current_y)
+        # Sections above the table (header, invoice info, customer info)
+        if page_index == 0:
+            for section in self.plan.intro_sections:
+                current_y = section_painters[section](painter, invoice_data, content_rect, current_y)
         
         # Draw items table
-        current_y = self.draw_items_table(painter, invoice_data, content_rect, current_y)
+        current_y = self.draw_items_table(painter, invoice_data, content_rect, current_y, start, end)
         
-        # Draw totals
-        current_y = self.draw_totals(painter, invoice_data, content_rect, current_y)
+        # Sections below the table (totals, footer)
+        if is_last_page:
+            for section in self.plan.closing_sections:
+                current_y = section_painters[section](painter, invoice_data, content_rect, current_y)
         
-        # Draw footer
-        self.draw_footer(painter, invoice_data, content_rect, current_y)
+        if len(pages) > 1:
+            self.draw_page_number(painter, content_rect, page_index, len(pages))
+    
+    def draw_page_number(self, painter, content_rect, page_index, page_count):
+        """Draw page number at the bottom of the page"""
+        painter.setPen(QPen(self.text_color))
+        painter.setFont(self.small_font)
+        metrics = QFontMetrics(self.small_font)
+        
+        text = f"صفحه {page_index + 1} از {page_count}"
+        text_x = content_rect.x() + (content_rect.width() - metrics.horizontalAdvance(text)) // 2
+        painter.drawText(text_x, content_rect.y() + content_rect.height() + metrics.height(), text)
+    
+    def render_page_image(self, invoice_data, page_size, page_index, pages, zoom=1.0):
+        """Render one invoice page to a QImage at the given zoom level
+        
+        Layout is done at page_size and scaled by zoom, so every zoom level
+        shows the same layout. Safe to call from a worker thread.
+        """
+        width = max(1, int(page_size.width() * zoom))
+        height = max(1, int(page_size.height() * zoom))
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        image.fill(Qt.GlobalColor.white)
+        
+        painter = QPainter()
+        painter.begin(image)
+        try:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+            painter.scale(zoom, zoom)
+            page_rect = QRect(0, 0, page_size.width(), page_size.height())
+            self.draw_page(painter, invoice_data, page_rect, page_index, pages)
+        finally:
+            painter.end()
+        
+        return image
+        
+    def get_scaled_image(self, image_path, size, aspect_mode):
+        """Return image smooth-scaled to size, cached per path and size"""
+        try:
+            mtime = os.path.getmtime(image_path)
+        except OSError:
+            return None
+        
+        key = (image_path, mtime, size.width(), size.height(), aspect_mode)
+        with self._image_lock:
+            if key in self._image_cache:
+                self._image_cache.move_to_end(key)
+                return self._image_cache[key]
         
+        # QImage (not QPixmap) so pages can be rendered off the GUI thread
+        image = QImage(image_path)
+        if image.isNull():
+            return None
+        
+        scaled_image = image.scaled(size, aspect_mode, Qt.TransformationMode.SmoothTransformation)
+        
+        with self._image_lock:
+            self._image_cache[key] = scaled_image
+            while len(self._image_cache) > self.IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+        
+        return scaled_image
+    
     def draw_background(self, painter, image_path, content_rect, current_y):
         """Draw background image"""
         try:
-            pixmap = QPixmap(image_path)
-            if not pixmap.isNull():
-                # Scale image to fit content area while maintaining aspect ratio
-                scaled_pixmap = pixmap.scaled(
-                    content_rect.size(),
-                    Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                
+            # Scale image to fit content area while maintaining aspect ratio
+            scaled_image = self.get_scaled_image(
+                image_path, content_rect.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding
+            )
+            if scaled_image is not None:
                 # Draw with reduced opacity
-                painter.setOpacity(0.1)
-                painter.drawPixmap(content_rect, scaled_pixmap)
+                painter.setOpacity(self.plan.background_opacity)
+                painter.drawImage(content_rect, scaled_image)
                 painter.setOpacity(1.0)
         except Exception as e:
             print(f"Error drawing background: {e}")
         
         return current_y
     
+    def logo_enabled(self):
+        """Whether a logo should be drawn on the invoice"""
+        return self.show_logo and self.plan.has_logo()
+    
+    def draw_logo(self, painter, content_rect, current_y):
+        """Draw template logo at its configured position"""
+        plan = self.plan
+        logo = self.get_scaled_image(
+            plan.logo_path, QSize(plan.logo_width, plan.logo_height),
+            Qt.AspectRatioMode.KeepAspectRatio
+        )
+        if logo is None:
+            return current_y
+        
+        if plan.logo_position == 'top-left':
+            logo_x = content_rect.x()
+        elif plan.logo_position == 'top-center':
+            logo_x = content_rect.x() + (content_rect.width() - logo.width()) // 2
+        else:
+            logo_x = content_rect.x() + content_rect.width() - logo.width()
+        
+        painter.drawImage(logo_x, current_y, logo)
+        
+        # Only a centred logo pushes the title down
+        if plan.logo_position == 'top-center':
+            current_y += plan.logo_height + 10
+        return current_y
+    
     def draw_header(self, painter, invoice_data, content_rect, current_y):
         """Draw invoice header"""
+        if self.logo_enabled():
+            current_y = self.draw_logo(painter, content_rect, current_y)
+        
         # Main title
         painter.setPen(QPen(self.primary_color))
         painter.setFont(self.title_font)
         
-        title_text = "فاکتور فروش"
+        title_text = self.plan.title
         title_metrics = QFontMetrics(self.title_font)
         title_width = title_metrics.horizontalAdvance(title_text)
         title_x = content_rect.x() + (content_rect.width() - title_width) // 2
@@ -199,8 +452,7 @@ class PrintService:
         
         # Persian date
         if 'issue_date' in invoice_data:
-            jdate = jdatetime.datetime.fromgregorian(datetime=invoice_data['issue_date'])
-            date_text = f"تاریخ: {jdate.strftime('%Y/%m/%d')}"
+            date_text = f"تاریخ: {jalali_date(invoice_data['issue_date'])}"
             date_width = metrics.horizontalAdvance(date_text)
             date_x = content_rect.x() + content_rect.width() - date_width
             painter.drawText(date_x, current_y + metrics.height(), date_text)
@@ -236,30 +488,24 @@ class PrintService:
         current_y += 20
         return current_y
     
-    def draw_items_table(self, painter, invoice_data, content_rect, current_y):
-        """Draw items table"""
-        items = invoice_data.get('items', [])
+    def draw_items_table(self, painter, invoice_data, content_rect, current_y, start=0, end=None):
+        """Draw items table for items[start:end]"""
+        items = invoice_data.get('items', [])[start:end]
         if not items:
             return current_y
         
-        # Table configuration
+        # Table configuration (column ratios and titles come from the template)
+        plan = self.plan
         table_width = content_rect.width()
-        col_widths = [
-            int(table_width * 0.4),   # Product name
-            int(table_width * 0.15),  # Quantity
-            int(table_width * 0.225), # Unit price
-            int(table_width * 0.225)  # Total price
-        ]
-        
-        # Table headers
-        headers = ["نام کالا", "تعداد", "قیمت واحد (تومان)", "قیمت کل (تومان)"]
+        col_widths = plan.column_widths(table_width)
+        headers = plan.column_titles
         
         # Draw table header
         painter.setPen(QPen(self.text_color))
         painter.setFont(self.table_font)
         painter.setBrush(QBrush(self.light_gray))
         
-        header_height = 40
+        header_height = plan.table_header_height
         header_rect = QRect(content_rect.x(), current_y, table_width, header_height)
         painter.drawRect(header_rect)
         
@@ -282,11 +528,11 @@ class PrintService:
         current_y += header_height
         
         # Draw table rows
-        row_height = 35
-        for row_index, item in enumerate(items):
+        row_height = plan.table_row_height
+        for row_index, item in enumerate(items, start):
             # Alternate row colors
             if row_index % 2 == 1:
-                painter.setBrush(QBrush(QColor(250, 250, 250)))
+                painter.setBrush(QBrush(self.alternate_row_color))
                 row_rect = QRect(content_rect.x(), current_y, table_width, row_height)
                 painter.drawRect(row_rect)
                 painter.setBrush(QBrush())  # Clear brush
@@ -295,17 +541,12 @@ class PrintService:
             col_x = content_rect.x()
             text_y = current_y + (row_height + metrics.height()) // 2
             
-            row_data = [
-                item.get('product_name', ''),
-                str(item.get('quantity', 0)),
-                f"{item.get('unit_price', 0):,}",
-                f"{item.get('total_price', 0):,}"
-            ]
+            row_data = [plan.format_cell(item, i) for i in range(len(col_widths))]
             
             for i, data in enumerate(row_data):
-                if i == 0:  # Product name - left aligned
+                if plan.column_alignment(i) == Qt.AlignmentFlag.AlignLeft:
                     text_x = col_x + 10
-                else:  # Numbers - center aligned
+                else:
                     data_width = metrics.horizontalAdvance(data)
                     text_x = col_x + (col_widths[i] - data_width) // 2
                 
@@ -327,10 +568,12 @@ class PrintService:
     
     def draw_totals(self, painter, invoice_data, content_rect, current_y):
         """Draw totals section"""
-        items = invoice_data.get('items', [])
-        subtotal = sum(item.get('total_price', 0) for item in items)
-        discount = invoice_data.get('discount_amount', 0)
-        final_total = subtotal - discount
+        # Same engine as the stored invoice, so printed totals always match it
+        totals = compute_invoice(invoice_data.get('items', []), invoice_data.get('discount_amount', 0))
+        subtotal = totals.subtotal
+        discount = totals.discount
+        tax = totals.tax
+        final_total = totals.final_amount
         
         # Totals box
         totals_width = content_rect.width() // 3
@@ -341,7 +584,7 @@ class PrintService:
         metrics = QFontMetrics(self.normal_font)
         
         # Calculate box height
-        box_height = metrics.height() * 4 + 40  # 3 lines + padding
+        box_height = self.plan.totals_box_height
         
         # Draw totals box
         totals_rect = QRect(totals_x, current_y, totals_width, box_height)
@@ -353,10 +596,12 @@ class PrintService:
         text_y = current_y + 20
         
         totals_data = [
-            ("جمع کل:", f"{subtotal:,} تومان"),
-            ("تخفیف:", f"{discount:,} تومان"),
-            ("مبلغ نهایی:", f"{final_total:,} تومان")
+            ("جمع کل:", format_amount(subtotal)),
+            ("تخفیف:", format_amount(discount)),
+            ("مالیات:", format_amount(tax)),
+            ("مبلغ نهایی:", format_amount(final_total))
         ]
+        final_index = len(totals_data) - 1
         
         for i, (label, value) in enumerate(totals_data):
             # Draw label
@@ -367,9 +612,9 @@ class PrintService:
             value_x = totals_x + totals_width - value_width - 10
             
             # Highlight final total
-            if i == 2:  # Final total
+            if i == final_index:
                 painter.setPen(QPen(self.secondary_color))
-                painter.setFont(QFont("Vazirmatn", 12, QFont.Weight.Bold))
+                painter.setFont(self.total_font)
                 metrics = QFontMetrics(painter.font())
                 value_width = metrics.horizontalAdvance(value)
                 value_x = totals_x + totals_width - value_width - 10
@@ -377,7 +622,7 @@ class PrintService:
             painter.drawText(value_x, text_y + metrics.height(), value)
             
             # Reset font for next line
-            if i == 2:
+            if i == final_index:
                 painter.setPen(QPen(self.text_color))
                 painter.setFont(self.normal_font)
                 metrics = QFontMetrics(self.normal_font)
@@ -411,7 +656,7 @@ class PrintService:
             current_y += 20
         
         # Signature line
-        signature_y = content_rect.y() + content_rect.height() - 60
+        signature_y = content_rect.y() + content_rect.height() - self.plan.signature_reserve
         if current_y < signature_y:
             current_y = signature_y
         
@@ -432,14 +677,9 @@ class PrintService:
         cust_line_start_x = customer_sig_x + 100
         cust_line_end_x = content_rect.x() + content_rect.width()
         painter.drawLine(cust_line_start_x, line_y, cust_line_end_x, line_y)
+        
+        return line_y
     
     def format_persian_number(self, number):
         """Convert number to Persian digits"""
-        persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-        english_digits = '0123456789'
-        
-        number_str = str(number)
-        for i, english_digit in enumerate(english_digits):
-            number_str = number_str.replace(english_digit, persian_digits[i])
-        
-        return number_str
\ No newline at end of file
+        return to_persian_digits(number)
\ No newline at end of file
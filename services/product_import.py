@@ -0,0 +1,325 @@
+"""
+Product Import for Persian Invoicing System
+Bulk product upsert from Excel or CSV files with a validation report
+"""
+
+import csv
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from types import SimpleNamespace
+from sqlalchemy import bindparam, func, insert as table_insert, select, text
+from sqlalchemy.dialects.sqlite import insert
+from database.models import AuditEvent, Product, StockMovement
+from services.export_pipeline import chunked
+from services.invoice_totals import TAX_RATE_SCALE, tax_rate_from_percent
+from services.persian_utils import normalize_text, to_latin_digits
+from services.stock_alerts import make_alert
+
+# Header titles (English keys or the products report's Persian titles) by field
+IMPORT_HEADERS = {
+    'name': ('name', 'نام کالا', 'نام'),
+    'purchase_price': ('purchase_price', 'قیمت خرید'),
+    'sale_price': ('sale_price', 'قیمت فروش'),
+    'stock_quantity': ('stock_quantity', 'موجودی'),
+    'reorder_threshold': ('reorder_threshold', 'حد سفارش مجدد'),
+    'tax_rate': ('tax_rate', 'نرخ مالیات (درصد)', 'نرخ مالیات'),
+    'description': ('description', 'توضیحات')
+}
+
+# Field of each normalised header title
+_HEADER_FIELDS = {normalize_text(title).lower(): field
+                  for field, titles in IMPORT_HEADERS.items() for title in titles}
+
+# Product values used for inserts when a file leaves a field out or a cell blank;
+# updates keep the existing value instead
+IMPORT_DEFAULTS = {
+    'purchase_price': 0,
+    'sale_price': 0,
+    'stock_quantity': 0,
+    'reorder_threshold': Product.DEFAULT_REORDER_THRESHOLD,
+    'tax_rate': Product.DEFAULT_TAX_RATE,
+    'description': ''
+}
+
+ImportIssue = namedtuple('ImportIssue', ['row', 'name', 'message'])
+
+ImportResult = namedtuple('ImportResult', ['inserted', 'updated', 'errors'])
+
+NAME_LENGTH = Product.__table__.c.name.type.length
+
+# Rows validated and upserted per statement
+CHUNK_SIZE = 1000
+
+def header_fields(header):
+    """Field of each header column, or None for columns that are not imported"""
+    return [_HEADER_FIELDS.get(normalize_text(title or '').lower()) for title in header]
+
+def read_csv(file_path):
+    """Header and data rows of a CSV file; the delimiter is detected from the header line"""
+    with open(file_path, newline='', encoding='utf-8-sig') as source:
+        first_line = source.readline()
+        source.seek(0)
+        delimiter = '\t' if first_line.count('\t') > first_line.count(',') else ','
+        yield from csv.reader(source, delimiter=delimiter)
+
+def read_xlsx(file_path):
+    """Header and data rows of the first sheet of a workbook, read as a stream"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+IMPORT_READERS = {
+    'csv': read_csv,
+    'tsv': read_csv,
+    'txt': read_csv,
+    'xlsx': read_xlsx
+}
+
+def read_rows(file_path):
+    """(row number, {field: raw value}) pairs of a CSV or xlsx file, in file order"""
+    extension = os.path.splitext(file_path)[1].lstrip('.').lower()
+    if extension not in IMPORT_READERS:
+        raise ValueError(f"Unsupported import format: {extension}")
+
+    rows = IMPORT_READERS[extension](file_path)
+    fields = header_fields(next(rows, None) or [])
+    if 'name' not in fields:
+        raise ValueError("ستون «نام کالا» در فایل یافت نشد")
+
+    for row_number, row in enumerate(rows, 2):
+        if not any(value not in (None, '') for value in row):
+            continue
+        yield row_number, {field: value for field, value in zip(fields, row) if field}
+
+def parse_decimal(value):
+    """Decimal from a cell in Latin, Persian or Arabic digits, or None if it is not a number"""
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    try:
+        return Decimal(to_latin_digits(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+def validate_row(raw):
+    """(product values, None) for a valid row, or (None, Persian error message)
+
+    Blank cells are returned as None.
+    """
+    name = normalize_text(raw.get('name') or '')
+    if not name:
+        return None, "نام کالا الزامی است"
+    if len(name) > NAME_LENGTH:
+        return None, f"نام کالا بیش از {NAME_LENGTH} نویسه است"
+
+    product = {'name': name}
+    for field in ('purchase_price', 'sale_price', 'stock_quantity', 'reorder_threshold', 'tax_rate'):
+        if field not in raw:
+            continue
+        value = raw[field]
+        if value is None or str(value).strip() == '':
+            product[field] = None
+            continue
+
+        number = parse_decimal(value)
+        if number is None:
+            return None, f"مقدار «{value}» در ستون {IMPORT_HEADERS[field][1]} عدد نیست"
+        if number < 0:
+            return None, f"ستون {IMPORT_HEADERS[field][1]} نمی‌تواند منفی باشد"
+
+        if field == 'tax_rate':
+            product[field] = tax_rate_from_percent(number)
+            if product[field] > TAX_RATE_SCALE:
+                return None, "نرخ مالیات باید بین ۰ تا ۱۰۰ درصد باشد"
+        elif field in ('stock_quantity', 'reorder_threshold') and number != int(number):
+            return None, f"ستون {IMPORT_HEADERS[field][1]} باید عدد صحیح باشد"
+        else:
+            product[field] = int(number)
+
+    if 'description' in raw:
+        product['description'] = str(raw['description'] or '').strip() or None
+    return product, None
+
+def write_error_report(file_path, errors):
+    """CSV of rejected rows that Excel opens with the Persian text intact"""
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as output:
+        writer = csv.writer(output)
+        writer.writerow(['ردیف', 'نام کالا', 'خطا'])
+        writer.writerows(errors)
+
+class ProductImporter:
+    """Validates product rows in chunks and upserts each chunk by active product name"""
+
+    UNIQUE_NAME_INDEX = 'ux_products_active_name'
+
+    def __init__(self, db_service):
+        self.db_service = db_service
+        self.logger = logging.getLogger(__name__)
+        self.unique_names = True
+
+    def has_unique_names(self, session):
+        """Whether the unique index on active names exists
+
+        upgrade_schema cannot create it while active names are duplicated,
+        and ON CONFLICT needs it.
+        """
+        indexes = session.execute(text("PRAGMA index_list(products)")).fetchall()
+        return any(row[1] == self.UNIQUE_NAME_INDEX for row in indexes)
+
+    def import_file(self, file_path, progress=None, chunk_size=CHUNK_SIZE):
+        """Import every valid row of a file in one transaction
+
+        Existing active products with the same name are updated; only the
+        columns present in the file and not blank in the row are overwritten.
+        Stock changes are written to the ledger as adjustments. progress, if
+        given, is called with the number of rows read after each chunk.
+        Returns an ImportResult whose errors list the rejected rows.
+        """
+        inserted = updated = 0
+        errors = []
+        read = 0
+
+        session = self.db_service.SessionLocal()
+        try:
+            self.unique_names = self.has_unique_names(session)
+            if not self.unique_names:
+                self.logger.warning("Active product names are not unique; importing without ON CONFLICT")
+            for chunk in chunked(read_rows(file_path), chunk_size):
+                # Within a chunk the last row of a name wins, as it does across chunks
+                products = {}
+                columns = set()
+                for row_number, raw in chunk:
+                    product, error = validate_row(raw)
+                    if error:
+                        errors.append(ImportIssue(row_number, normalize_text(raw.get('name') or ''), error))
+                        continue
+                    products[product['name']] = product
+                    columns.update(product)
+
+                if products:
+                    added, changed = self.upsert_chunk(session, list(products.values()), columns)
+                    inserted += added
+                    updated += changed
+
+                read += len(chunk)
+                if progress:
+                    progress(read)
+
+            self.db_service.checkpoint_stock_if_due(session)
+            session.commit()
+            self.logger.info(f"Products imported from {file_path}: {inserted} added, "
+                             f"{updated} updated, {len(errors)} rejected")
+            self.db_service.audit_log.record(
+                AuditEvent.PRODUCTS_IMPORTED, os.path.basename(file_path),
+                f"{inserted} کالای جدید، {updated} به‌روزرسانی، {len(errors)} ردیف رد شده"
+            )
+            return ImportResult(inserted, updated, errors)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def upsert_chunk(self, session, products, columns):
+        """Insert or update a chunk of validated products
+
+        One ON CONFLICT statement does both; without the unique name index
+        existing names are updated by id and new ones inserted. Stock is left to the ledger entries written afterwards.
+        Returns (inserted, updated).
+        """
+        table = Product.__table__
+        names = [product['name'] for product in products]
+        existing_query = select(
+            Product.id, Product.name, Product.stock_quantity, Product.reorder_threshold
+        ).where(Product.is_active == True, Product.name.in_(names)).order_by(Product.id)
+        # With duplicated active names the newest product of a name is the one updated
+        existing = {row.name: row for row in session.execute(existing_query)}
+
+        now = datetime.now()
+        # Blank cells arrive as NULL: inserts fall back to the defaults, updates keep the old value
+        imported = {column: bindparam(f'import_{column}', type_=table.c[column].type)
+                    for column in IMPORT_DEFAULTS}
+        insert_values = {
+            **{column: func.coalesce(imported[column], default) for column, default in IMPORT_DEFAULTS.items()},
+            # New rows start at zero stock; the ledger entries below bring them to the imported quantity
+            'stock_quantity': 0,
+            'name': bindparam('import_name'),
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        update_values = {
+            **{column: func.coalesce(imported[column], table.c[column])
+               for column in columns - {'name', 'stock_quantity'}},
+            'updated_at': now
+        }
+        rows = [
+            {'import_name': product['name'],
+             **{f'import_{column}': product.get(column) for column in IMPORT_DEFAULTS}}
+            for product in products
+        ]
+
+        if self.unique_names:
+            statement = insert(table).values(**insert_values).on_conflict_do_update(
+                index_elements=[table.c.name],
+                index_where=text('is_active = 1'),
+                set_=update_values
+            )
+            session.execute(statement, rows)
+        else:
+            new_rows = [row for row in rows if row['import_name'] not in existing]
+            if new_rows:
+                session.execute(insert(table).values(**insert_values), new_rows)
+            changed_rows = [{**row, 'product_id': existing[row['import_name']].id}
+                            for row in rows if row['import_name'] in existing]
+            if changed_rows:
+                session.execute(
+                    table.update().where(table.c.id == bindparam('product_id')).values(**update_values),
+                    changed_rows
+                )
+
+        current = {row.name: row for row in session.execute(existing_query)}
+        movements = []
+        stock_updates = []
+        tracked = session.info.setdefault('stock_alerts', {})
+        for product in products:
+            row = current[product['name']]
+            before = existing.get(product['name'])
+            quantity = product.get('stock_quantity')
+            if quantity is None:
+                quantity = row.stock_quantity
+            if quantity != row.stock_quantity:
+                movements.append({
+                    'product_id': row.id,
+                    'movement_type': StockMovement.ADJUSTMENT,
+                    'quantity': quantity - row.stock_quantity,
+                    'balance_after': quantity,
+                    'reference': '',
+                    'note': "ورود گروهی کالا",
+                    'created_at': now
+                })
+                stock_updates.append({'product_id': row.id, 'quantity': quantity})
+
+            # New products count as not low before import, as add_product does
+            was_low = before is not None and before.stock_quantity <= before.reorder_threshold
+            state = SimpleNamespace(id=row.id, name=row.name, stock_quantity=quantity,
+                                    reorder_threshold=row.reorder_threshold)
+            entry = tracked.setdefault(row.id, {'was_low': was_low})
+            entry['alert'] = make_alert(state, quantity <= row.reorder_threshold)
+
+        if movements:
+            session.execute(table_insert(StockMovement.__table__), movements)
+            session.execute(
+                table.update().where(table.c.id == bindparam('product_id')).values(
+                    stock_quantity=bindparam('quantity')
+                ),
+                stock_updates
+            )
+
+        return len(products) - len(existing), len(existing)
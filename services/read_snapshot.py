@@ -0,0 +1,135 @@
+"""
+Read Snapshot for Persian Invoicing System
+Consistent point-in-time view of the database for long-running reports
+"""
+
+from datetime import timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database.models import Product, StockMovement
+
+class ReadSnapshot:
+    """One WAL read transaction held open for the duration of a report
+
+    In WAL mode readers and writers do not block each other, and every
+    query in the transaction sees the database as of its first read.
+    """
+
+    # Rows fetched per round trip by the iter_* methods
+    STREAM_BATCH = 2000
+
+    def __init__(self, db_service, start_date=None, end_date=None):
+        self.archive_service = db_service.archive_service
+        self.sales_summary = db_service.sales_summary
+        self.tax_summary = db_service.tax_summary
+        self.connection = db_service.engine.connect()
+        self.schemas = []
+        self.range = None
+
+        try:
+            # Archives must be attached before the transaction starts
+            if start_date is not None and end_date is not None:
+                self.range = self.archive_service.date_range(start_date, end_date)
+                years = self.archive_service.archives_for_range(*self.range)
+                self.schemas = self.archive_service.attach_archives(self.connection, years)
+
+            self.connection.exec_driver_sql("BEGIN")
+            # The snapshot is taken at the first read, so read right away
+            self.connection.exec_driver_sql("SELECT COUNT(*) FROM main.sqlite_master").scalar()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_invoices(self, active_only=True):
+        """Invoices in the snapshot's date range, including archived years"""
+        return self.archive_service.query_invoices(
+            self.connection, *self.range, self.schemas, active_only
+        )
+
+    def iter_invoices(self, active_only=True):
+        """Invoice rows in the snapshot's date range, oldest first, fetched as they are consumed"""
+        statement = self.archive_service.invoices_statement(*self.range, self.schemas, active_only)
+        statement = statement.order_by(statement.selected_columns.issue_date)
+        result = self.connection.execute(statement, execution_options={'yield_per': self.STREAM_BATCH})
+        yield from result.mappings()
+
+    def get_daily_sales(self):
+        """Daily sales summary rows in the snapshot's date range, oldest first"""
+        session = Session(bind=self.connection)
+        try:
+            start, end = self.range
+            return self.sales_summary.get_days(session, start.date(), (end - timedelta(days=1)).date())
+        finally:
+            session.close()
+    
+    def get_sales_by_period(self, period):
+        """Sales totals per Persian month, fiscal quarter or year in the snapshot's date range"""
+        session = Session(bind=self.connection)
+        try:
+            start, end = self.range
+            return self.sales_summary.get_periods(
+                session, period, start.date(), (end - timedelta(days=1)).date()
+            )
+        finally:
+            session.close()
+    
+    def get_tax_by_period(self, period):
+        """VAT per rate and Persian month or fiscal quarter overlapping the snapshot's date range"""
+        session = Session(bind=self.connection)
+        try:
+            start, end = self.range
+            return self.tax_summary.get_periods(
+                session, period, start.date(), (end - timedelta(days=1)).date()
+            )
+        finally:
+            session.close()
+    
+    def get_products(self, active_only=True):
+        """Products as of the snapshot"""
+        session = Session(bind=self.connection)
+        try:
+            query = session.query(Product)
+            if active_only:
+                query = query.filter(Product.is_active == True)
+            return query.order_by(Product.name).all()
+        finally:
+            session.close()
+
+    def get_stock_movements(self):
+        """Stock ledger entries in the snapshot's date range, oldest first"""
+        return list(self.iter_stock_movements())
+
+    def iter_stock_movements(self):
+        """Stock ledger entries in the snapshot's date range, oldest first, fetched as they are consumed"""
+        statement = select(
+            StockMovement.created_at, Product.name, StockMovement.movement_type,
+            StockMovement.quantity, StockMovement.balance_after, StockMovement.reference
+        ).join(Product).where(
+            StockMovement.created_at >= self.range[0],
+            StockMovement.created_at < self.range[1]
+        ).order_by(StockMovement.id)
+        result = self.connection.execute(statement, execution_options={'yield_per': self.STREAM_BATCH})
+        for created_at, product_name, movement_type, quantity, balance_after, reference in result:
+            yield {
+                'date': created_at,
+                'product_name': product_name,
+                'type_label': StockMovement.TYPE_LABELS.get(movement_type, movement_type),
+                'quantity': quantity,
+                'balance_after': balance_after,
+                'reference': reference or ''
+            }
+
+    def close(self):
+        """End the read transaction and release the connection"""
+        try:
+            self.connection.rollback()
+            self.archive_service.detach_archives(self.connection, self.schemas)
+            self.schemas = []
+        finally:
+            self.connection.close()
@@ -0,0 +1,184 @@
+"""
+Sales Summary Service for Persian Invoicing System
+Daily sales totals maintained on write for dashboards and period reports
+"""
+
+import logging
+from datetime import date
+from sqlalchemy import delete, func, insert as table_insert
+from sqlalchemy.dialects.sqlite import insert
+from database.models import DailySalesSummary, JalaliCalendarDay
+from services.jalali_calendar import jalali_day
+import jdatetime
+
+SUMMARY_COLUMNS = ('invoice_count', 'revenue', 'discount', 'items_sold')
+
+PERIOD_LABELS = {
+    'monthly': 'ماه',
+    'quarterly': 'فصل',
+    'yearly': 'سال'
+}
+
+# Calendar columns each period groups by
+PERIOD_COLUMNS = {
+    'monthly': (JalaliCalendarDay.year, JalaliCalendarDay.month),
+    'quarterly': (JalaliCalendarDay.year, JalaliCalendarDay.fiscal_quarter),
+    'yearly': (JalaliCalendarDay.year,)
+}
+
+def period_label(period, year, part=None):
+    """Persian label of a month, fiscal quarter or year"""
+    if period == 'monthly':
+        return f"{jdatetime.date.j_months_fa[part - 1]} {year}"
+    if period == 'quarterly':
+        return f"فصل {part} سال {year}"
+    return str(year)
+
+class SalesSummaryService:
+    """Daily sales summary rows, updated in the invoice's own transaction"""
+
+    def __init__(self, archive_service, calendar):
+        self.archive_service = archive_service
+        self.calendar = calendar
+        self.engine = archive_service.engine
+        self.logger = logging.getLogger(__name__)
+
+    def record_invoice(self, session, invoice, items_sold, sign=1):
+        """Add (sign=1) or remove (sign=-1) an invoice from its day's totals
+
+        A day left without invoices is deleted rather than kept at zero.
+        """
+        sale_date = invoice.issue_date.date()
+        statement = insert(DailySalesSummary).values(
+            sale_date=sale_date,
+            jalali_key=jalali_day(sale_date).jalali_key,
+            invoice_count=sign,
+            revenue=sign * (invoice.final_amount or 0),
+            discount=sign * (invoice.discount_amount or 0),
+            items_sold=sign * items_sold
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=['sale_date'],
+            set_={
+                column: getattr(DailySalesSummary, column) + getattr(statement.excluded, column)
+                for column in SUMMARY_COLUMNS
+            }
+        )
+        session.execute(statement)
+        if sign < 0:
+            session.execute(delete(DailySalesSummary).where(
+                DailySalesSummary.sale_date == sale_date, DailySalesSummary.invoice_count <= 0
+            ))
+
+    def is_empty(self):
+        """Whether no summary rows exist yet"""
+        with self.engine.connect() as connection:
+            return connection.exec_driver_sql(
+                "SELECT 1 FROM daily_sales_summary LIMIT 1"
+            ).first() is None
+
+    def rebuild(self, progress=None):
+        """Recompute every day from live and archived invoices
+
+        Returns (success, message).
+        """
+        try:
+            days = {}
+            with self.engine.connect() as connection:
+                schemas = self.archive_service.attach_archives(
+                    connection, self.archive_service.archived_years()
+                )
+                try:
+                    for index, schema in enumerate(['main'] + schemas):
+                        if progress:
+                            progress(int(index * 90 / (len(schemas) + 1)), f"جمع‌بندی {schema}")
+                        rows = connection.exec_driver_sql(f"""
+                            SELECT date(i.issue_date), COUNT(*),
+                                   COALESCE(SUM(i.final_amount), 0),
+                                   COALESCE(SUM(i.discount_amount), 0),
+                                   COALESCE(SUM((SELECT SUM(quantity) FROM {schema}.invoice_items
+                                                 WHERE invoice_id = i.id)), 0)
+                            FROM {schema}.invoices AS i
+                            WHERE i.is_active = 1 AND i.issue_date IS NOT NULL
+                            GROUP BY date(i.issue_date)
+                        """).all()
+                        for day, *totals in rows:
+                            current = days.setdefault(day, [0] * len(SUMMARY_COLUMNS))
+                            days[day] = [a + b for a, b in zip(current, totals)]
+
+                    if progress:
+                        progress(90, "ذخیره خلاصه فروش")
+                    connection.exec_driver_sql("DELETE FROM main.daily_sales_summary")
+                    if days:
+                        connection.execute(table_insert(DailySalesSummary.__table__), [
+                            {
+                                'sale_date': date.fromisoformat(day),
+                                'jalali_key': jalali_day(date.fromisoformat(day)).jalali_key,
+                                **dict(zip(SUMMARY_COLUMNS, totals))
+                            }
+                            for day, totals in days.items()
+                        ])
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    self.archive_service.detach_archives(connection, schemas)
+
+            # Period reports join every summary day to the calendar
+            if days:
+                self.calendar.prepare(date.fromisoformat(min(days)))
+
+            if progress:
+                progress(100, "پایان")
+            self.logger.info(f"Sales summary rebuilt for {len(days)} days")
+            return True, f"خلاصه فروش برای {len(days):,} روز بازسازی شد"
+        except Exception as e:
+            self.logger.error(f"Error rebuilding sales summary: {e}")
+            return False, f"خطا در بازسازی خلاصه فروش: {str(e)}"
+
+    def get_days(self, session, start_date=None, end_date=None):
+        """Summary rows between two dates (inclusive) as dicts, oldest first"""
+        query = session.query(DailySalesSummary)
+        if start_date is not None:
+            query = query.filter(DailySalesSummary.sale_date >= start_date)
+        if end_date is not None:
+            query = query.filter(DailySalesSummary.sale_date <= end_date)
+        return [
+            {
+                'date': row.sale_date,
+                'jalali_key': row.jalali_key,
+                **{column: getattr(row, column) for column in SUMMARY_COLUMNS}
+            }
+            for row in query.order_by(DailySalesSummary.sale_date).all()
+        ]
+
+    def get_totals(self, session, start_date=None, end_date=None):
+        """Summed totals between two dates (inclusive)"""
+        query = session.query(*[
+            func.coalesce(func.sum(getattr(DailySalesSummary, column)), 0) for column in SUMMARY_COLUMNS
+        ])
+        if start_date is not None:
+            query = query.filter(DailySalesSummary.sale_date >= start_date)
+        if end_date is not None:
+            query = query.filter(DailySalesSummary.sale_date <= end_date)
+        return dict(zip(SUMMARY_COLUMNS, query.one()))
+
+    def get_periods(self, session, period, start_date=None, end_date=None):
+        """Totals per Persian month, fiscal quarter or year, grouped in SQL, oldest first"""
+        group_columns = PERIOD_COLUMNS[period]
+        query = session.query(*group_columns, *[
+            func.sum(getattr(DailySalesSummary, column)) for column in SUMMARY_COLUMNS
+        ]).join(
+            JalaliCalendarDay, JalaliCalendarDay.gregorian_date == DailySalesSummary.sale_date
+        )
+        if start_date is not None:
+            query = query.filter(DailySalesSummary.sale_date >= start_date)
+        if end_date is not None:
+            query = query.filter(DailySalesSummary.sale_date <= end_date)
+
+        periods = []
+        for row in query.group_by(*group_columns).order_by(*group_columns).all():
+            keys, totals = row[:len(group_columns)], row[len(group_columns):]
+            periods.append({'period': period_label(period, *keys), **dict(zip(SUMMARY_COLUMNS, totals))})
+        return periods
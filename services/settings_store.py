@@ -0,0 +1,198 @@
+"""
+Settings Store for Persian Invoicing System
+Typed in-memory settings cache with batched writes and change notifications
+"""
+
+import os
+import threading
+import logging
+from datetime import datetime
+from database.models import Settings
+
+# key: (type, default, description)
+SETTING_DEFINITIONS = {
+    # Appearance
+    'appearance.theme': (str, 'light', 'تم رنگی'),
+    'appearance.primary_color': (str, '#4CAF50', 'رنگ اصلی'),
+    'appearance.font_family': (str, 'Vazirmatn', 'فونت اصلی'),
+    'appearance.font_size': (int, 11, 'اندازه فونت'),
+    'appearance.language': (str, 'fa', 'زبان رابط'),
+    'window.remember_size': (bool, False, 'ذخیره اندازه پنجره'),
+    'window.remember_position': (bool, False, 'ذخیره موقعیت پنجره'),
+    'window.maximize_startup': (bool, False, 'شروع با حداکثر اندازه'),
+    'window.show_statusbar': (bool, True, 'نمایش نوار وضعیت'),
+
+    # Database
+    'database.auto_backup': (bool, False, 'پشتیبان‌گیری خودکار'),
+    'database.backup_interval_days': (int, 7, 'فاصله پشتیبان‌گیری (روز)'),
+    'database.backup_location': (str, './backups/', 'مسیر پشتیبان'),
+    'database.max_backups': (int, 10, 'حداکثر تعداد پشتیبان'),
+    'database.backup_compression': (str, 'none', 'فشرده‌سازی پشتیبان'),
+    'database.archive_keep_years': (int, 2, 'تعداد سال‌های مالی نگه‌داشته در دیتابیس اصلی'),
+
+    # Printing
+    'printing.printer': (str, 'system', 'چاپگر پیش‌فرض'),
+    'printing.paper_size': (str, 'A4', 'اندازه کاغذ'),
+    'printing.quality': (str, 'high', 'کیفیت چاپ'),
+    'printing.margin_mm': (int, 20, 'حاشیه چاپ (میلی‌متر)'),
+    'printing.show_logo': (bool, True, 'نمایش لوگو'),
+    'printing.company_info': (str, '', 'اطلاعات شرکت'),
+    'printing.footer_text': (str, '', 'متن پاورقی'),
+    'printing.template_path': (str, '', 'قالب فاکتور'),
+
+    # Security
+    'security.session_timeout': (int, 60, 'مدت انقضای نشست (دقیقه)'),
+    'security.auto_lock': (bool, False, 'قفل خودکار برنامه'),
+    'security.encrypt_backups': (bool, False, 'رمزگذاری پشتیبان‌ها'),
+    'security.secure_delete': (bool, False, 'حذف امن اطلاعات'),
+    'security.audit_log': (bool, False, 'ثبت لاگ عملیات'),
+    'security.log_retention_days': (int, 90, 'مدت نگهداری لاگ‌ها (روز)'),
+    'security.password_rounds': (int, 12, 'هزینه رمزنگاری رمز عبور (bcrypt)'),
+}
+
+def default_settings():
+    """Return a dict of all settings at their default values"""
+    return {key: definition[1] for key, definition in SETTING_DEFINITIONS.items()}
+
+def parse_value(key, raw_value):
+    """Convert a stored text value to the setting's declared type"""
+    definition = SETTING_DEFINITIONS.get(key)
+    if definition is None or raw_value is None:
+        return raw_value
+
+    value_type, default, _ = definition
+    try:
+        if value_type is bool:
+            return raw_value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return value_type(raw_value)
+    except (ValueError, TypeError):
+        return default
+
+def serialize_value(value):
+    """Convert a setting value to the text stored in the database"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+class SettingsStore:
+    """All settings loaded in one query; reads are dict lookups, writes are batched"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(__name__)
+        self._values = default_settings()
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """(Re)load every setting from the database in a single query"""
+        session = self.session_factory()
+        try:
+            rows = session.query(Settings.key, Settings.value).all()
+            values = default_settings()
+            for key, raw_value in rows:
+                values[key] = parse_value(key, raw_value)
+            with self._lock:
+                self._values = values
+        except Exception as e:
+            self.logger.error(f"Error loading settings: {e}")
+        finally:
+            session.close()
+
+    def get(self, key, default=None):
+        """Return a setting value from memory"""
+        return self._values.get(key, default)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def as_dict(self):
+        """Return a copy of all settings"""
+        with self._lock:
+            return dict(self._values)
+
+    def set(self, key, value):
+        """Change a single setting"""
+        return self.set_many({key: value})
+
+    def set_many(self, values):
+        """Write changed settings in one transaction and notify subscribers
+
+        Returns (success, message) like the database service methods.
+        """
+        with self._lock:
+            changed = {
+                key: value for key, value in values.items()
+                if key not in self._values or self._values[key] != value
+            }
+            if not changed:
+                return True, "تنظیمات تغییری نکرده است"
+
+            session = self.session_factory()
+            try:
+                now = datetime.now()
+                existing = {
+                    setting.key: setting for setting in
+                    session.query(Settings).filter(Settings.key.in_(list(changed))).all()
+                }
+
+                for key, value in changed.items():
+                    setting = existing.get(key)
+                    if setting:
+                        setting.value = serialize_value(value)
+                        setting.updated_at = now
+                    else:
+                        description = SETTING_DEFINITIONS.get(key, (None, None, None))[2]
+                        session.add(Settings(key=key, value=serialize_value(value), description=description))
+
+                session.commit()
+                self._values.update(changed)
+            except Exception as e:
+                session.rollback()
+                self.logger.error(f"Error saving settings: {e}")
+                return False, f"خطا در ذخیره تنظیمات: {str(e)}"
+            finally:
+                session.close()
+
+        self.notify(changed)
+        return True, "تنظیمات با موفقیت ذخیره شد"
+
+    def reset_to_defaults(self):
+        """Restore every setting to its default value"""
+        return self.set_many(default_settings())
+
+    def subscribe(self, callback, keys=None):
+        """Call callback(changed) when any of keys (or any key) changes"""
+        self._subscribers.append((callback, frozenset(keys) if keys else None))
+
+    def unsubscribe(self, callback):
+        """Stop notifying callback"""
+        self._subscribers = [(cb, keys) for cb, keys in self._subscribers if cb != callback]
+
+    def notify(self, changed):
+        """Notify subscribers interested in the changed keys"""
+        for callback, keys in list(self._subscribers):
+            if keys is not None:
+                relevant = {key: value for key, value in changed.items() if key in keys}
+            else:
+                relevant = changed
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                self.logger.error(f"Error notifying settings subscriber: {e}")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_settings_store(db_service):
+    """Return the settings store shared by every service on the same database"""
+    key = os.path.abspath(db_service.db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SettingsStore(db_service.SessionLocal)
+            _stores[key] = store
+        return store
@@ -0,0 +1,28 @@
+"""
+Startup Timer for Persian Invoicing System
+Milliseconds from launch, or from login, to each start-up milestone
+"""
+
+import time
+import logging
+
+_started = time.perf_counter()
+_milestones = []
+
+def restart():
+    """Measure later milestones from now, such as from a successful login"""
+    global _started
+    _started = time.perf_counter()
+    _milestones.clear()
+
+def mark(milestone):
+    """Record a milestone with the time elapsed since launch or the last restart"""
+    _milestones.append((milestone, (time.perf_counter() - _started) * 1000))
+
+def report(phase):
+    """Log the milestones recorded so far on one line"""
+    if not _milestones:
+        return
+    timings = ", ".join(f"{milestone} {elapsed:.0f} ms" for milestone, elapsed in _milestones)
+    logging.getLogger(__name__).info(f"Startup timing ({phase}): {timings}")
+    _milestones.clear()
@@ -0,0 +1,56 @@
+"""
+Stock Alerts for Persian Invoicing System
+Reorder-threshold crossings published after the transaction that caused them
+"""
+
+import os
+import logging
+import threading
+
+class StockAlerts:
+    """Subscribers notified when products fall to or rise above their reorder threshold"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(alerts) with a list of alert dicts after each commit that has any"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop notifying callback"""
+        self._subscribers = [cb for cb in self._subscribers if cb != callback]
+
+    def publish(self, alerts):
+        """Notify subscribers of committed threshold crossings"""
+        if not alerts:
+            return
+        for callback in list(self._subscribers):
+            try:
+                callback(list(alerts))
+            except Exception as e:
+                self.logger.error(f"Error notifying stock alert subscriber: {e}")
+
+def make_alert(product, low):
+    """Alert dict for a product that crossed its reorder threshold"""
+    return {
+        'product_id': product.id,
+        'name': product.name,
+        'stock_quantity': product.stock_quantity,
+        'reorder_threshold': product.reorder_threshold,
+        'low': low
+    }
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+def get_stock_alerts(db_path):
+    """Return the stock alerts shared by every service on the same database"""
+    key = os.path.abspath(db_path)
+    with _hubs_lock:
+        hub = _hubs.get(key)
+        if hub is None:
+            hub = StockAlerts()
+            _hubs[key] = hub
+        return hub
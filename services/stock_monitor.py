@@ -0,0 +1,34 @@
+"""
+Stock Monitor for Persian Invoicing System
+Turns committed reorder-threshold crossings into Qt signals
+"""
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+class LowStockMonitor(QObject):
+    """Emits signals when products fall to or rise above their reorder threshold"""
+
+    # Lists of alert dicts: product_id, name, stock_quantity, reorder_threshold
+    low_stock_alert = pyqtSignal(list)
+    stock_recovered = pyqtSignal(list)
+
+    def __init__(self, db_service, parent=None):
+        super().__init__(parent)
+        self.stock_alerts = db_service.stock_alerts
+
+    def start(self):
+        """Follow stock alerts of the database"""
+        self.stock_alerts.subscribe(self.on_alerts)
+
+    def on_alerts(self, alerts):
+        """Stock alerts subscriber; may run in a worker thread, signals are queued"""
+        low = [alert for alert in alerts if alert['low']]
+        recovered = [alert for alert in alerts if not alert['low']]
+        if low:
+            self.low_stock_alert.emit(low)
+        if recovered:
+            self.stock_recovered.emit(recovered)
+
+    def stop(self):
+        """Stop following stock alerts"""
+        self.stock_alerts.unsubscribe(self.on_alerts)
@@ -0,0 +1,277 @@
+"""
+Tax Summary Service for Persian Invoicing System
+Monthly VAT totals maintained on write and set-based tax recomputation
+"""
+
+import logging
+from datetime import date
+from sqlalchemy import delete, func, insert as table_insert
+from sqlalchemy.dialects.sqlite import insert
+from database.models import MonthlyTaxSummary
+from services.archive_service import SQLITE_DATETIME_FORMAT
+from services.invoice_totals import TAX_RATE_SCALE
+from services.jalali_calendar import jalali_day
+from services.sales_summary import period_label
+import jdatetime
+
+TAX_COLUMNS = ('line_count', 'taxable_amount', 'tax_amount')
+
+# Tax reports by the period they group by
+TAX_REPORT_PERIODS = {
+    'tax_monthly': 'monthly',
+    'tax_quarterly': 'quarterly'
+}
+
+# Persian month columns each period groups by
+TAX_PERIOD_COLUMNS = {
+    'monthly': (MonthlyTaxSummary.year, MonthlyTaxSummary.month),
+    'quarterly': (MonthlyTaxSummary.year, (MonthlyTaxSummary.month - 1) // 3 + 1),
+    'yearly': (MonthlyTaxSummary.year,)
+}
+
+def month_key(value):
+    """Persian (year, month) of a date or datetime"""
+    day = jalali_day(value)
+    return day.year, day.month
+
+class TaxSummaryService:
+    """Monthly tax rows per VAT rate, updated in the invoice's own transaction"""
+
+    def __init__(self, archive_service):
+        self.archive_service = archive_service
+        self.engine = archive_service.engine
+        self.logger = logging.getLogger(__name__)
+
+    def record_invoice(self, session, issue_date, lines, sign=1):
+        """Add (sign=1) or remove (sign=-1) invoice lines from their month's totals
+
+        lines are (tax_rate, taxable_amount, tax_amount) tuples. A month rate
+        left without lines is deleted rather than kept at zero.
+        """
+        rates = {}
+        for tax_rate, taxable, tax in lines:
+            current = rates.setdefault(tax_rate, [0, 0, 0])
+            rates[tax_rate] = [current[0] + 1, current[1] + taxable, current[2] + tax]
+
+        year, month = month_key(issue_date)
+        for tax_rate, totals in rates.items():
+            statement = insert(MonthlyTaxSummary).values(
+                year=year,
+                month=month,
+                tax_rate=tax_rate,
+                **{column: sign * total for column, total in zip(TAX_COLUMNS, totals)}
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=['year', 'month', 'tax_rate'],
+                set_={
+                    column: getattr(MonthlyTaxSummary, column) + getattr(statement.excluded, column)
+                    for column in TAX_COLUMNS
+                }
+            )
+            session.execute(statement)
+        if sign < 0:
+            session.execute(delete(MonthlyTaxSummary).where(
+                MonthlyTaxSummary.year == year,
+                MonthlyTaxSummary.month == month,
+                MonthlyTaxSummary.tax_rate.in_(list(rates)),
+                MonthlyTaxSummary.line_count <= 0
+            ))
+
+    def is_empty(self):
+        """Whether no summary rows exist yet"""
+        with self.engine.connect() as connection:
+            return connection.exec_driver_sql(
+                "SELECT 1 FROM monthly_tax_summary LIMIT 1"
+            ).first() is None
+
+    def month_totals(self, connection, schema, where="1", params=()):
+        """Tax totals per (year, month, rate) of active invoices in a schema, grouped by day in SQL"""
+        rows = connection.exec_driver_sql(f"""
+            SELECT date(i.issue_date), it.tax_rate, COUNT(*),
+                   COALESCE(SUM(it.total_price - it.discount_amount), 0),
+                   COALESCE(SUM(it.tax_amount), 0)
+            FROM {schema}.invoice_items AS it
+            JOIN {schema}.invoices AS i ON i.id = it.invoice_id
+            WHERE i.is_active = 1 AND i.issue_date IS NOT NULL AND {where}
+            GROUP BY date(i.issue_date), it.tax_rate
+        """, params).all()
+
+        months = {}
+        for day, tax_rate, *totals in rows:
+            key = (*month_key(date.fromisoformat(day)), tax_rate)
+            current = months.get(key, [0] * len(TAX_COLUMNS))
+            months[key] = [a + b for a, b in zip(current, totals)]
+        return months
+
+    def save_months(self, connection, months, replace=None):
+        """Write month totals, first deleting the (year, month) pairs in replace (None deletes all)"""
+        if replace is None:
+            connection.exec_driver_sql("DELETE FROM main.monthly_tax_summary")
+        else:
+            for year, month in replace:
+                connection.exec_driver_sql(
+                    "DELETE FROM main.monthly_tax_summary WHERE year = ? AND month = ?", (year, month)
+                )
+
+        if months:
+            connection.execute(table_insert(MonthlyTaxSummary.__table__), [
+                {
+                    'year': year,
+                    'month': month,
+                    'tax_rate': tax_rate,
+                    **dict(zip(TAX_COLUMNS, totals))
+                }
+                for (year, month, tax_rate), totals in months.items()
+            ])
+
+    def rebuild(self, progress=None):
+        """Recompute every month from live and archived invoice lines
+
+        Returns (success, message).
+        """
+        try:
+            months = {}
+            with self.engine.connect() as connection:
+                schemas = self.archive_service.attach_archives(
+                    connection, self.archive_service.archived_years()
+                )
+                try:
+                    for index, schema in enumerate(['main'] + schemas):
+                        if progress:
+                            progress(int(index * 90 / (len(schemas) + 1)), f"جمع‌بندی مالیات {schema}")
+                        for key, totals in self.month_totals(connection, schema).items():
+                            current = months.get(key, [0] * len(TAX_COLUMNS))
+                            months[key] = [a + b for a, b in zip(current, totals)]
+
+                    if progress:
+                        progress(90, "ذخیره خلاصه مالیات")
+                    self.save_months(connection, months)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    self.archive_service.detach_archives(connection, schemas)
+
+            if progress:
+                progress(100, "پایان")
+            self.logger.info(f"Tax summary rebuilt for {len(months)} month rates")
+            return True, f"خلاصه مالیات برای {len({key[:2] for key in months}):,} ماه بازسازی شد"
+        except Exception as e:
+            self.logger.error(f"Error rebuilding tax summary: {e}")
+            return False, f"خطا در بازسازی خلاصه مالیات: {str(e)}"
+
+    def recompute(self, start=None, end=None, use_product_rates=False):
+        """Recompute line and invoice VAT of live invoices in [start, end) with set-based SQL
+
+        Lines take their product's current rate when use_product_rates is
+        set, otherwise keep the rate they were sold at. Discount shares are
+        reallocated the way compute_invoice does it. The tax summary months
+        of the range are refreshed in the same transaction.
+        Returns the number of invoices whose tax or final amount changed.
+        """
+        where = "i.is_active = 1"
+        params = ()
+        if start is not None and end is not None:
+            where += " AND i.issue_date >= ? AND i.issue_date < ?"
+            params = (start.strftime(SQLITE_DATETIME_FORMAT), end.strftime(SQLITE_DATETIME_FORMAT))
+        in_range = f"invoice_id IN (SELECT i.id FROM invoices AS i WHERE {where})"
+
+        with self.engine.begin() as connection:
+            if use_product_rates:
+                connection.exec_driver_sql(f"""
+                    UPDATE invoice_items
+                    SET tax_rate = (SELECT p.tax_rate FROM products AS p WHERE p.id = invoice_items.product_id)
+                    WHERE {in_range}
+                """, params)
+
+            # Proportional shares, then the leftover units to the largest remainders
+            connection.exec_driver_sql(f"""
+                UPDATE invoice_items
+                SET discount_amount = shares.share + (shares.position <= shares.leftover)
+                FROM (
+                    SELECT id, share,
+                           ROW_NUMBER() OVER (PARTITION BY invoice_id ORDER BY remainder DESC, id) AS position,
+                           discount - SUM(share) OVER (PARTITION BY invoice_id) AS leftover
+                    FROM (
+                        SELECT it.id, it.invoice_id, d.discount,
+                               CASE WHEN d.subtotal > 0 THEN d.discount * it.total_price / d.subtotal ELSE 0 END AS share,
+                               CASE WHEN d.subtotal > 0 THEN d.discount * it.total_price % d.subtotal ELSE 0 END AS remainder
+                        FROM invoice_items AS it
+                        JOIN (
+                            SELECT i.id, SUM(x.total_price) AS subtotal,
+                                   MIN(MAX(i.discount_amount, 0), SUM(x.total_price)) AS discount
+                            FROM invoices AS i JOIN invoice_items AS x ON x.invoice_id = i.id
+                            WHERE {where}
+                            GROUP BY i.id
+                        ) AS d ON d.id = it.invoice_id
+                    )
+                ) AS shares
+                WHERE invoice_items.id = shares.id
+            """, params)
+
+            connection.exec_driver_sql(f"""
+                UPDATE invoice_items
+                SET tax_amount = ((total_price - discount_amount) * tax_rate + {TAX_RATE_SCALE // 2}) / {TAX_RATE_SCALE}
+                WHERE {in_range}
+            """, params)
+
+            changed = connection.exec_driver_sql(f"""
+                UPDATE invoices
+                SET tax_amount = lines.tax,
+                    final_amount = total_amount - discount_amount + lines.tax
+                FROM (
+                    SELECT invoice_id, SUM(tax_amount) AS tax FROM invoice_items
+                    WHERE {in_range} GROUP BY invoice_id
+                ) AS lines
+                WHERE invoices.id = lines.invoice_id
+                  AND (invoices.tax_amount IS NOT lines.tax
+                       OR invoices.final_amount IS NOT invoices.total_amount - invoices.discount_amount + lines.tax)
+            """, params).rowcount
+
+            # Refresh whole months: every invoice of a month lives in the same file
+            days = connection.exec_driver_sql(
+                f"SELECT DISTINCT date(i.issue_date) FROM invoices AS i WHERE {where}", params
+            ).scalars().all()
+            replace = {month_key(date.fromisoformat(day)) for day in days if day}
+            if replace:
+                year, month = min(replace)
+                months = self.month_totals(connection, 'main', "date(i.issue_date) >= ?", (
+                    jdatetime.date(year, month, 1).togregorian().isoformat(),
+                ))
+                self.save_months(connection, {
+                    key: totals for key, totals in months.items() if key[:2] in replace
+                }, replace)
+
+        self.logger.info(f"Tax recomputed: {changed} invoices changed")
+        return changed
+
+    def get_periods(self, session, period, start_date=None, end_date=None):
+        """Tax per VAT rate and Persian month, fiscal quarter or year, oldest first
+
+        Whole months overlapping the date range are included.
+        """
+        group_columns = TAX_PERIOD_COLUMNS[period]
+        query = session.query(*group_columns, MonthlyTaxSummary.tax_rate, *[
+            func.sum(getattr(MonthlyTaxSummary, column)) for column in TAX_COLUMNS
+        ])
+        month_number = MonthlyTaxSummary.year * 100 + MonthlyTaxSummary.month
+        if start_date is not None:
+            year, month = month_key(start_date)
+            query = query.filter(month_number >= year * 100 + month)
+        if end_date is not None:
+            year, month = month_key(end_date)
+            query = query.filter(month_number <= year * 100 + month)
+
+        periods = []
+        rows = query.group_by(*group_columns, MonthlyTaxSummary.tax_rate).order_by(
+            *group_columns, MonthlyTaxSummary.tax_rate
+        ).all()
+        for row in rows:
+            keys, tax_rate, totals = row[:len(group_columns)], row[len(group_columns)], row[len(group_columns) + 1:]
+            periods.append({
+                'period': period_label(period, *keys),
+                'tax_rate': tax_rate,
+                **dict(zip(TAX_COLUMNS, totals))
+            })
+        return periods
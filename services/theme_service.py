@@ -0,0 +1,517 @@
+"""
+Theme Service for Persian Invoicing System
+One application stylesheet compiled from a colour palette, cached per theme
+"""
+
+import re
+import time
+import logging
+from functools import lru_cache
+from string import Template
+
+# Colour palettes; the primary (accent) colour comes from the appearance settings
+THEMES = {
+    'light': {
+        'window': '#f8f9fa', 'surface': '#ffffff', 'input': '#ffffff', 'alternate': '#f8f9fa',
+        'border': '#dee2e6', 'gridline': '#f1f3f4', 'text': '#495057', 'title': '#2c3e50',
+        'muted': '#6c757d', 'header_start': '#f8f9fa', 'header_end': '#e9ecef',
+        'selection': '#e3f2fd', 'selection_text': '#1976d2', 'hover_end': '#bbdefb',
+        'secondary': '#2196F3', 'danger': '#f44336', 'success': '#27ae60',
+        'disabled': '#cccccc', 'disabled_text': '#666666',
+        'banner_start': '#667eea', 'banner_end': '#764ba2',
+    },
+    'dark': {
+        'window': '#1f2430', 'surface': '#2a303c', 'input': '#323947', 'alternate': '#262c37',
+        'border': '#3c4454', 'gridline': '#343b49', 'text': '#d8dee9', 'title': '#eceff4',
+        'muted': '#8f9bb3', 'header_start': '#2f3645', 'header_end': '#2a303c',
+        'selection': '#34507a', 'selection_text': '#ffffff', 'hover_end': '#2f4a70',
+        'secondary': '#3d8bd9', 'danger': '#e05252', 'success': '#4caf50',
+        'disabled': '#4a5160', 'disabled_text': '#8f9bb3',
+        'banner_start': '#3b4a7a', 'banner_end': '#4a3866',
+    },
+    'blue': {
+        'window': '#eef4fb', 'surface': '#ffffff', 'input': '#ffffff', 'alternate': '#f4f8fd',
+        'border': '#c9d9ee', 'gridline': '#e6eef8', 'text': '#34495e', 'title': '#1f3a5f',
+        'muted': '#6b7f99', 'header_start': '#eaf2fc', 'header_end': '#d9e6f7',
+        'selection': '#d6e8fb', 'selection_text': '#1565c0', 'hover_end': '#bbdefb',
+        'secondary': '#1976D2', 'danger': '#e53935', 'success': '#2e7d32',
+        'disabled': '#c5d0dc', 'disabled_text': '#6b7f99',
+        'banner_start': '#1e88e5', 'banner_end': '#3949ab',
+    },
+    'green': {
+        'window': '#f1f8f2', 'surface': '#ffffff', 'input': '#ffffff', 'alternate': '#f5faf5',
+        'border': '#cfe5d1', 'gridline': '#e5f1e6', 'text': '#3e4e42', 'title': '#1e4620',
+        'muted': '#6f8572', 'header_start': '#edf7ee', 'header_end': '#dcefdf',
+        'selection': '#dff0e0', 'selection_text': '#2e7d32', 'hover_end': '#c8e6c9',
+        'secondary': '#00897B', 'danger': '#e53935', 'success': '#2e7d32',
+        'disabled': '#c8d6c9', 'disabled_text': '#6f8572',
+        'banner_start': '#43a047', 'banner_end': '#00897b',
+    },
+}
+
+DEFAULT_THEME = 'light'
+DEFAULT_PRIMARY_COLOR = '#4CAF50'
+
+COLOR_PATTERN = re.compile(r'^#[0-9a-fA-F]{6}$')
+
+STYLESHEET = Template("""
+* {
+    font-family: '$font_family', Arial, sans-serif;
+}
+
+QWidget {
+    background-color: $window;
+    color: $text;
+}
+
+QMainWindow, QDialog {
+    background-color: $window;
+}
+
+QLabel {
+    background: transparent;
+    color: $text;
+}
+
+QLabel[class="title"] {
+    color: $title;
+    margin-bottom: 10px;
+}
+
+QLabel[class="muted"] {
+    color: $muted;
+}
+
+QLabel[class="hint"] {
+    color: $muted;
+    font-style: italic;
+}
+
+QLabel[class="success"] {
+    color: $success;
+    font-weight: bold;
+}
+
+QLabel[class="total"] {
+    color: $success;
+    font-weight: bold;
+    font-size: ${large_font_size}pt;
+}
+
+QLabel[class="error"] {
+    color: $danger;
+}
+
+QLabel[class="stat"] {
+    padding: 5px;
+}
+
+QGroupBox {
+    font-weight: bold;
+    border: 2px solid $border;
+    border-radius: 8px;
+    margin: 10px 0px;
+    padding-top: 15px;
+    background-color: $surface;
+}
+
+QGroupBox::title {
+    subcontrol-origin: margin;
+    left: 15px;
+    padding: 0 8px 0 8px;
+    color: $text;
+    background-color: $surface;
+}
+
+QLineEdit, QTextEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit {
+    border: 2px solid $border;
+    border-radius: 6px;
+    padding: 8px;
+    font-size: ${font_size}pt;
+    background-color: $input;
+    color: $text;
+}
+
+QLineEdit:focus, QTextEdit:focus, QComboBox:focus, QSpinBox:focus,
+QDoubleSpinBox:focus, QDateEdit:focus {
+    border-color: $primary;
+}
+
+QComboBox::drop-down {
+    border: none;
+    width: 20px;
+}
+
+QPushButton {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $primary, stop:1 $primary_hover);
+    color: white;
+    border: none;
+    border-radius: 8px;
+    padding: 10px 16px;
+    font-size: ${font_size}pt;
+    font-weight: bold;
+    min-width: 80px;
+}
+
+QPushButton:hover {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $primary_hover, stop:1 $primary_pressed);
+}
+
+QPushButton:pressed {
+    background: $primary_pressed;
+}
+
+QPushButton:disabled {
+    background: $disabled;
+    color: $disabled_text;
+}
+
+QPushButton[class="secondary"] {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $secondary, stop:1 $secondary_hover);
+}
+
+QPushButton[class="secondary"]:hover {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $secondary_hover, stop:1 $secondary_pressed);
+}
+
+QPushButton[class="danger"] {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $danger, stop:1 $danger_hover);
+}
+
+QPushButton[class="danger"]:hover {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $danger_hover, stop:1 $danger_pressed);
+}
+
+QCheckBox {
+    color: $text;
+    spacing: 8px;
+}
+
+QCheckBox::indicator {
+    width: 18px;
+    height: 18px;
+    border: 2px solid $border;
+    border-radius: 4px;
+    background-color: $input;
+}
+
+QCheckBox::indicator:checked {
+    background-color: $primary;
+    border-color: $primary;
+}
+
+QTableWidget {
+    border: 1px solid $border;
+    border-radius: 8px;
+    background-color: $surface;
+    alternate-background-color: $alternate;
+    gridline-color: $gridline;
+    font-size: ${small_font_size}pt;
+}
+
+QTableWidget::item {
+    padding: 10px 8px;
+    border: none;
+}
+
+QTableWidget::item:selected {
+    background-color: $selection;
+    color: $selection_text;
+}
+
+QHeaderView::section {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $header_start, stop:1 $header_end);
+    padding: 10px 8px;
+    border: 1px solid $border;
+    font-weight: bold;
+    color: $text;
+}
+
+QProgressBar {
+    border: 2px solid $border;
+    border-radius: 5px;
+    background-color: $window;
+    text-align: center;
+}
+
+QProgressBar::chunk {
+    background-color: $primary;
+    border-radius: 3px;
+}
+
+QTabWidget::pane {
+    border: 2px solid $border;
+    border-radius: 8px;
+    background-color: $surface;
+    margin-top: 10px;
+}
+
+QTabBar::tab {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $header_start, stop:1 $header_end);
+    border: 2px solid $border;
+    border-bottom: none;
+    border-top-left-radius: 8px;
+    border-top-right-radius: 8px;
+    min-width: 120px;
+    padding: 12px 15px;
+    margin: 2px;
+    color: $text;
+    font-weight: bold;
+    font-size: ${font_size}pt;
+}
+
+QTabBar::tab:selected {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $primary, stop:1 $primary_hover);
+    color: white;
+    border-color: $primary;
+}
+
+QTabBar::tab:hover:!selected {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 $selection, stop:1 $hover_end);
+    border-color: $secondary;
+}
+
+QTabWidget#main_tabs::pane {
+    margin-top: 0px;
+    margin-left: 10px;
+}
+
+QTabWidget#main_tabs::tab-bar {
+    alignment: left;
+}
+
+#main_tabs QTabBar::tab {
+    border-top-right-radius: 0px;
+    border-bottom-left-radius: 8px;
+    min-height: 60px;
+    padding: 10px;
+    margin: 2px 0px;
+}
+
+QMenuBar {
+    background-color: $window;
+    border-bottom: 1px solid $border;
+    padding: 5px;
+}
+
+QMenuBar::item {
+    background: transparent;
+    padding: 8px 12px;
+    border-radius: 4px;
+    margin: 2px;
+}
+
+QMenuBar::item:selected, QMenu::item:selected {
+    background-color: $selection;
+    color: $selection_text;
+}
+
+QMenu {
+    background-color: $surface;
+    border: 1px solid $border;
+    border-radius: 6px;
+    padding: 5px;
+}
+
+QMenu::item {
+    padding: 8px 20px;
+    border-radius: 4px;
+}
+
+QStatusBar {
+    background-color: $window;
+    border-top: 1px solid $border;
+    padding: 5px;
+}
+
+QStatusBar::item {
+    border: none;
+}
+
+QFrame#app_header {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+        stop:0 $banner_start, stop:1 $banner_end);
+    border: none;
+    border-radius: 12px;
+    margin-bottom: 10px;
+}
+
+#app_header QLabel {
+    color: white;
+}
+
+#app_header QPushButton {
+    background: rgba(255, 255, 255, 0.2);
+    color: white;
+    border: 2px solid rgba(255, 255, 255, 0.3);
+    border-radius: 6px;
+    padding: 8px 12px;
+    min-width: 0px;
+}
+
+#app_header QPushButton:hover {
+    background: rgba(255, 255, 255, 0.3);
+    border-color: white;
+}
+
+#app_header QPushButton:pressed {
+    background: rgba(255, 255, 255, 0.1);
+}
+
+StatCard, ProductFormWidget {
+    background-color: $surface;
+    border: 2px solid $border;
+    border-radius: 12px;
+    margin: 5px;
+}
+
+StatCard:hover {
+    border-color: $primary;
+}
+
+QWidget#lock_screen {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+        stop:0 $banner_start, stop:1 $banner_end);
+}
+
+QFrame#lock_card {
+    background-color: $surface;
+    border: 1px solid $border;
+    border-radius: 12px;
+}
+
+QWidget#login_dialog {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+        stop:0 #1e3c72, stop:1 #2a5298);
+}
+
+#login_dialog QFrame {
+    background: transparent;
+}
+
+#login_dialog QLabel {
+    color: #ffffff;
+    margin: 5px 0px;
+}
+
+#login_dialog QLabel[class="muted"] {
+    color: #cccccc;
+}
+
+#login_dialog QLabel[class="success"] {
+    color: $primary;
+}
+
+#login_dialog QLabel[class="info"] {
+    color: #2196F3;
+    font-weight: bold;
+}
+
+#login_dialog QLineEdit {
+    background-color: rgba(255, 255, 255, 0.1);
+    border: 2px solid rgba(255, 255, 255, 0.2);
+    border-radius: 8px;
+    padding: 12px 15px;
+    color: #ffffff;
+    margin: 5px 0px;
+}
+
+#login_dialog QLineEdit:focus {
+    border-color: $primary;
+    background-color: rgba(255, 255, 255, 0.15);
+}
+
+#login_dialog QMessageBox {
+    background-color: #2b2b2b;
+}
+""")
+
+def shade(color, factor):
+    """Darken (factor < 1) or lighten (factor > 1) a #rrggbb colour"""
+    channels = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return '#' + ''.join(f"{max(0, min(255, round(channel * factor))):02x}" for channel in channels)
+
+@lru_cache(maxsize=16)
+def build_stylesheet(theme=DEFAULT_THEME, primary_color=DEFAULT_PRIMARY_COLOR, font_family='Vazirmatn', font_size=11):
+    """Application stylesheet for a theme; built once per combination of arguments"""
+    palette = dict(THEMES.get(theme, THEMES[DEFAULT_THEME]))
+    if not COLOR_PATTERN.match(primary_color or ''):
+        primary_color = DEFAULT_PRIMARY_COLOR
+
+    palette['primary'] = primary_color
+    for name in ('primary', 'secondary', 'danger'):
+        palette[f'{name}_hover'] = shade(palette[name], 0.9)
+        palette[f'{name}_pressed'] = shade(palette[name], 0.8)
+
+    font_size = max(6, int(font_size))
+    return STYLESHEET.substitute(
+        palette,
+        font_family=font_family.replace("'", ''),
+        font_size=font_size,
+        small_font_size=font_size - 1,
+        large_font_size=font_size + 3
+    )
+
+def set_style_class(widget, style_class):
+    """Change a widget's class property and restyle it from the application stylesheet"""
+    widget.setProperty("class", style_class)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+class ThemeService:
+    """Applies the application stylesheet and follows the appearance settings"""
+
+    # Settings the theme follows
+    SETTINGS_KEYS = ('appearance.theme', 'appearance.primary_color',
+                     'appearance.font_family', 'appearance.font_size')
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger(__name__)
+        self.stylesheet = None
+        self.settings = {
+            'appearance.theme': DEFAULT_THEME,
+            'appearance.primary_color': DEFAULT_PRIMARY_COLOR,
+            'appearance.font_family': 'Vazirmatn',
+            'appearance.font_size': 11,
+        }
+
+    def bind_settings(self, settings_store):
+        """Apply appearance settings now and whenever they change"""
+        self.on_settings_changed({key: settings_store.get(key) for key in self.SETTINGS_KEYS})
+        settings_store.subscribe(self.on_settings_changed, self.SETTINGS_KEYS)
+
+    def on_settings_changed(self, changed):
+        """Settings store subscriber for appearance settings"""
+        self.settings.update({key: value for key, value in changed.items() if key in self.SETTINGS_KEYS})
+        self.apply()
+
+    def apply(self):
+        """Set the application stylesheet unless the current one is already in place"""
+        stylesheet = build_stylesheet(
+            self.settings['appearance.theme'],
+            self.settings['appearance.primary_color'],
+            self.settings['appearance.font_family'],
+            self.settings['appearance.font_size']
+        )
+        # Cached stylesheets are the same object, so unchanged settings cost nothing
+        if stylesheet is self.stylesheet:
+            return
+
+        started = time.perf_counter()
+        self.app.setStyleSheet(stylesheet)
+        self.stylesheet = stylesheet
+        self.logger.info(
+            f"Theme {self.settings['appearance.theme']} applied in "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
@@ -8,9 +8,9 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QTableWidgetItem, QHeaderView, QGroupBox,
                            QProgressBar, QSizePolicy)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QFont, QPixmap, QIcon
-from services.database_service import DatabaseService
-import jdatetime
+from PyQt6.QtGui import QFont, QPixmap, QIcon, QColor
+from services.database_service import get_database_service
+from services.persian_utils import format_amount
 
 class StatCard(QFrame):
     """Custom stat card widget"""
@@ -37,7 +37,7 @@ class StatCard(QFrame):
         
         title_label = QLabel(title)
         title_label.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #666;")
+        title_label.setProperty("class", "muted")
         header_layout.addWidget(title_label)
         header_layout.addStretch()
         
@@ -51,7 +51,7 @@ class StatCard(QFrame):
         if subtitle:
             subtitle_label = QLabel(subtitle)
             subtitle_label.setFont(QFont("Vazirmatn", 9))
-            subtitle_label.setStyleSheet("color: #999;")
+            subtitle_label.setProperty("class", "muted")
             subtitle_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             layout.addWidget(subtitle_label)
         
@@ -60,20 +60,6 @@ class StatCard(QFrame):
         
         self.setLayout(layout)
         
-        # Apply styling
-        self.setStyleSheet(f"""
-            StatCard {{
-                background-color: white;
-                border: 2px solid #f0f0f0;
-                border-radius: 12px;
-                margin: 5px;
-            }}
-            StatCard:hover {{
-                border-color: {color};
-                box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-            }}
-        """)
-        
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         self.setMinimumHeight(120)
         
@@ -85,13 +71,15 @@ class DashboardView(QWidget):
     """Enhanced dashboard with comprehensive statistics and refresh functionality"""
     
     refresh_requested = pyqtSignal()
+    backup_requested = pyqtSignal()
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
         self.setup_ui()
         self.setup_auto_refresh()
-        self.load_dashboard_data()
+        # Load once the window is on screen so the first paint does not wait for queries
+        QTimer.singleShot(0, self.load_dashboard_data)
         
     def setup_ui(self):
         """Setup the dashboard user interface"""
@@ -105,7 +93,7 @@ class DashboardView(QWidget):
         # Welcome message
         welcome_label = QLabel("داشبورد مدیریت")
         welcome_label.setFont(QFont("Vazirmatn", 18, QFont.Weight.Bold))
-        welcome_label.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
+        welcome_label.setProperty("class", "title")
         
         # Refresh button
         self.refresh_button = QPushButton("🔄 به‌روزرسانی")
@@ -116,7 +104,7 @@ class DashboardView(QWidget):
         # Last update label
         self.last_update_label = QLabel()
         self.last_update_label.setFont(QFont("Vazirmatn", 9))
-        self.last_update_label.setStyleSheet("color: #666;")
+        self.last_update_label.setProperty("class", "muted")
         
         header_layout.addWidget(welcome_label)
         header_layout.addStretch()
@@ -237,101 +225,8 @@ class DashboardView(QWidget):
         self.setup_styling()
         
     def setup_styling(self):
-        """Setup modern dashboard styling"""
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-            
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #dee2e6;
-                border-radius: 12px;
-                margin: 15px 0px;
-                padding-top: 15px;
-                background-color: white;
-            }
-            
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 8px 0 8px;
-                color: #495057;
-                background-color: white;
-            }
-            
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 20px;
-                font-size: 11pt;
-                font-weight: bold;
-                min-width: 120px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #45a049, stop:1 #3d8b40);
-                transform: translateY(-2px);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3d8b40, stop:1 #2e7d32);
-            }
-            
-            QPushButton#refresh_button {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2196F3, stop:1 #1976D2);
-            }
-            
-            QPushButton#refresh_button:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #1976D2, stop:1 #1565C0);
-            }
-            
-            QTableWidget {
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                background-color: white;
-                gridline-color: #f8f9fa;
-                font-size: 10pt;
-            }
-            
-            QTableWidget::item {
-                padding: 12px 8px;
-                border: none;
-            }
-            
-            QTableWidget::item:selected {
-                background-color: #e3f2fd;
-                color: #1976d2;
-            }
-            
-            QTableWidget::item:alternate {
-                background-color: #f8f9fa;
-            }
-            
-            QHeaderView::section {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f8f9fa, stop:1 #e9ecef);
-                padding: 12px 8px;
-                border: 1px solid #dee2e6;
-                font-weight: bold;
-                color: #495057;
-            }
-            
-            QLabel {
-                color: #495057;
-            }
-        """)
-        
-        # Set object names for specific styling
-        self.refresh_button.setObjectName("refresh_button")
+        """Set style classes used by the application stylesheet"""
+        self.refresh_button.setProperty("class", "secondary")
         
     def setup_auto_refresh(self):
         """Setup automatic refresh timer"""
@@ -347,14 +242,14 @@ class DashboardView(QWidget):
             
             # Update stat cards
             self.today_invoices_card.update_value(stats['today_invoices'])
-            self.today_revenue_card.update_value(f"{stats['today_revenue']:,} تومان")
+            self.today_revenue_card.update_value(format_amount(stats['today_revenue']))
             self.total_products_card.update_value(stats['total_products'])
             self.total_invoices_card.update_value(stats['total_invoices'])
             self.low_stock_card.update_value(stats['low_stock_products'])
             
             # Calculate monthly revenue
             monthly_revenue = self.get_monthly_revenue()
-            self.monthly_revenue_card.update_value(f"{monthly_revenue:,} تومان")
+            self.monthly_revenue_card.update_value(format_amount(monthly_revenue))
             
             # Load recent invoices
             self.load_recent_invoices()
@@ -364,9 +259,8 @@ class DashboardView(QWidget):
             
             # Update last refresh time
             current_time = datetime.now()
-            jdate = jdatetime.datetime.fromgregorian(datetime=current_time)
             self.last_update_label.setText(
-                f"آخرین به‌روزرسانی: {jdate.strftime('%H:%M:%S')}"
+                f"آخرین به‌روزرسانی: {current_time.strftime('%H:%M:%S')}"
             )
             
         except Exception as e:
@@ -377,16 +271,9 @@ class DashboardView(QWidget):
         try:
             # Get invoices for current month
             now = datetime.now()
-            month_start = datetime(now.year, now.month, 1)
-            
-            invoices = self.db_service.get_invoices()
-            monthly_total = 0
+            month_start = datetime(now.year, now.month, 1).date()
             
-            for invoice in invoices:
-                if invoice.issue_date >= month_start:
-                    monthly_total += invoice.final_amount
-            
-            return monthly_total
+            return self.db_service.get_sales_totals(month_start, now.date())['revenue']
         except:
             return 0
     
@@ -415,7 +302,7 @@ class DashboardView(QWidget):
                 self.recent_table.setItem(row, 2, date_item)
                 
                 # Amount
-                amount_item = QTableWidgetItem(f"{invoice.final_amount:,} تومان")
+                amount_item = QTableWidgetItem(format_amount(invoice.final_amount))
                 amount_item.setFlags(amount_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 self.recent_table.setItem(row, 3, amount_item)
                 
@@ -430,8 +317,7 @@ class DashboardView(QWidget):
     def load_low_stock_products(self):
         """Load low stock products into table"""
         try:
-            products = self.db_service.get_products()
-            low_stock_products = [p for p in products if p.stock_quantity <= 5]
+            low_stock_products = self.db_service.get_low_stock_products()
             
             self.stock_table.setRowCount(len(low_stock_products))
             
@@ -445,13 +331,13 @@ class DashboardView(QWidget):
                 stock_item = QTableWidgetItem(str(product.stock_quantity))
                 stock_item.setFlags(stock_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 if product.stock_quantity == 0:
-                    stock_item.setBackground(QPixmap(1, 1))  # Red background for zero stock
-                elif product.stock_quantity <= 2:
-                    stock_item.setBackground(QPixmap(1, 1))  # Orange background for very low
+                    stock_item.setBackground(QColor("#f8d7da"))  # Red background for zero stock
+                elif product.stock_quantity <= product.reorder_threshold // 2:
+                    stock_item.setBackground(QColor("#ffe5b4"))  # Orange background for very low
                 self.stock_table.setItem(row, 1, stock_item)
                 
                 # Sale price
-                price_item = QTableWidgetItem(f"{product.sale_price:,} تومان")
+                price_item = QTableWidgetItem(format_amount(product.sale_price))
                 price_item.setFlags(price_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 self.stock_table.setItem(row, 2, price_item)
                 
@@ -476,13 +362,15 @@ class DashboardView(QWidget):
         ))
     
     def create_backup(self):
-        """Create database backup"""
+        """Ask the main window's backup scheduler for a backup"""
+        self.backup_btn.setText("💾 در حال پشتیبان‌گیری...")
+        self.backup_btn.setEnabled(False)
+        
+        self.backup_requested.emit()
+        
+    def on_backup_finished(self, success, message):
+        """Show backup result on the button"""
         try:
-            self.backup_btn.setText("💾 در حال پشتیبان‌گیری...")
-            self.backup_btn.setEnabled(False)
-            
-            success, message = self.db_service.backup_database()
-            
             # Show result in status
             if success:
                 self.backup_btn.setText("✅ پشتیبان ایجاد شد")
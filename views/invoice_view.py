@@ -11,11 +11,11 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QHeaderView, QMessageBox, QFrame, QFileDialog,
                            QSplitter, QGroupBox, QCheckBox)
 from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QPixmap, QPainter, QPrintPreviewDialog, QPrinter
-from PyQt6.QtPrintSupport import QPrintDialog
-import jdatetime
-from services.database_service import DatabaseService
-from services.print_service import PrintService
+from PyQt6.QtGui import QFont
+from services.database_service import get_database_service
+from services.persian_utils import format_amount, parse_number
+from services.invoice_totals import compute_invoice
+from services.theme_service import set_style_class
 
 class InvoiceView(QWidget):
     """Enhanced invoice creation and management view"""
@@ -24,14 +24,23 @@ class InvoiceView(QWidget):
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
-        self.print_service = PrintService()
+        self.db_service = get_database_service()
+        self._print_service = None
         self.current_products = []
         self.invoice_items = []
         self.background_image_path = ""
         self.setup_ui()
         self.load_products()
         self.setup_styling()
+    
+    @property
+    def print_service(self):
+        """Print service, created with its fonts and template on first print, preview or export"""
+        if self._print_service is None:
+            from services.print_service import PrintService
+            self._print_service = PrintService()
+            self._print_service.bind_settings(self.db_service.get_settings_store())
+        return self._print_service
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -70,7 +79,7 @@ class InvoiceView(QWidget):
         self.bg_button = QPushButton("انتخاب تصویر")
         self.bg_button.clicked.connect(self.select_background_image)
         self.bg_label_path = QLabel("تصویر انتخاب نشده")
-        self.bg_label_path.setStyleSheet("color: #666; font-style: italic;")
+        self.bg_label_path.setProperty("class", "hint")
         
         # Header text
         header_text_label = QLabel("متن سربرگ:")
@@ -222,17 +231,23 @@ class InvoiceView(QWidget):
         self.discount_value = QLabel("0 تومان")
         self.discount_value.setAlignment(Qt.AlignmentFlag.AlignLeft)
         
+        tax_label = QLabel("مالیات بر ارزش افزوده:")
+        self.tax_value = QLabel("0 تومان")
+        self.tax_value.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        
         final_label = QLabel("مبلغ نهایی:")
         self.final_value = QLabel("0 تومان")
         self.final_value.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.final_value.setStyleSheet("font-weight: bold; font-size: 14pt; color: #2E7D32;")
+        self.final_value.setProperty("class", "total")
         
         totals_layout.addWidget(subtotal_label, 0, 0)
         totals_layout.addWidget(self.subtotal_value, 0, 1)
         totals_layout.addWidget(discount_label, 1, 0)
         totals_layout.addWidget(self.discount_value, 1, 1)
-        totals_layout.addWidget(final_label, 2, 0)
-        totals_layout.addWidget(self.final_value, 2, 1)
+        totals_layout.addWidget(tax_label, 2, 0)
+        totals_layout.addWidget(self.tax_value, 2, 1)
+        totals_layout.addWidget(final_label, 3, 0)
+        totals_layout.addWidget(self.final_value, 3, 1)
         
         # Export buttons
         export_group = QGroupBox("خروجی فاکتور")
@@ -259,104 +274,7 @@ class InvoiceView(QWidget):
         return panel_widget
         
     def setup_styling(self):
-        """Setup modern styling"""
-        self.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #ddd;
-                border-radius: 8px;
-                margin: 10px 0px;
-                padding-top: 10px;
-                background-color: #f9f9f9;
-            }
-            
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-                color: #333;
-                background-color: #f9f9f9;
-            }
-            
-            QLineEdit, QTextEdit, QComboBox, QSpinBox {
-                border: 2px solid #ddd;
-                border-radius: 6px;
-                padding: 8px;
-                font-size: 11pt;
-                background-color: white;
-            }
-            
-            QLineEdit:focus, QTextEdit:focus, QComboBox:focus, QSpinBox:focus {
-                border-color: #4CAF50;
-            }
-            
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 6px;
-                padding: 10px 15px;
-                font-size: 11pt;
-                font-weight: bold;
-                min-width: 100px;
-            }
-            
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            
-            QPushButton:pressed {
-                background-color: #3d8b40;
-            }
-            
-            QPushButton[class="secondary"] {
-                background-color: #2196F3;
-            }
-            
-            QPushButton[class="secondary"]:hover {
-                background-color: #1976D2;
-            }
-            
-            QPushButton[class="danger"] {
-                background-color: #f44336;
-            }
-            
-            QPushButton[class="danger"]:hover {
-                background-color: #d32f2f;
-            }
-            
-            QTableWidget {
-                border: 1px solid #ddd;
-                border-radius: 6px;
-                background-color: white;
-                gridline-color: #f0f0f0;
-                font-size: 10pt;
-            }
-            
-            QTableWidget::item {
-                padding: 8px;
-                border: none;
-            }
-            
-            QTableWidget::item:selected {
-                background-color: #E3F2FD;
-                color: #1976D2;
-            }
-            
-            QHeaderView::section {
-                background-color: #f5f5f5;
-                padding: 8px;
-                border: 1px solid #ddd;
-                font-weight: bold;
-            }
-            
-            QLabel {
-                color: #333;
-                font-size: 11pt;
-            }
-        """)
-        
-        # Set button classes
+        """Set style classes used by the application stylesheet"""
         self.clear_button.setProperty("class", "secondary")
         self.preview_button.setProperty("class", "secondary")
         self.export_pdf_button.setProperty("class", "secondary")
@@ -376,7 +294,7 @@ class InvoiceView(QWidget):
             self.background_image_path = file_path
             filename = os.path.basename(file_path)
             self.bg_label_path.setText(f"تصویر انتخاب شده: {filename}")
-            self.bg_label_path.setStyleSheet("color: #4CAF50; font-weight: bold;")
+            set_style_class(self.bg_label_path, "success")
         
     def load_products(self):
         """Load products into combo box"""
@@ -445,6 +363,7 @@ class InvoiceView(QWidget):
             'product_name': selected_product.name,
             'quantity': quantity,
             'unit_price': selected_product.sale_price,
+            'tax_rate': selected_product.tax_rate,
             'total_price': quantity * selected_product.sale_price
         }
         
@@ -472,13 +391,13 @@ class InvoiceView(QWidget):
             self.items_table.setItem(row, 1, quantity_item)
             
             # Unit price
-            unit_price_item = QTableWidgetItem(f"{item['unit_price']:,} تومان")
+            unit_price_item = QTableWidgetItem(format_amount(item['unit_price']))
             unit_price_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
             unit_price_item.setFlags(unit_price_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
             self.items_table.setItem(row, 2, unit_price_item)
             
             # Total price
-            total_price_item = QTableWidgetItem(f"{item['total_price']:,} تومان")
+            total_price_item = QTableWidgetItem(format_amount(item['total_price']))
             total_price_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
             total_price_item.setFlags(total_price_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
             self.items_table.setItem(row, 3, total_price_item)
@@ -498,21 +417,13 @@ class InvoiceView(QWidget):
     
     def update_totals(self):
         """Update total calculations"""
-        subtotal = sum(item['total_price'] for item in self.invoice_items)
-        
-        # Get discount
-        try:
-            discount_text = self.discount_edit.text().replace(',', '').replace('٬', '')
-            discount = int(float(discount_text)) if discount_text else 0
-        except (ValueError, TypeError):
-            discount = 0
-        
-        final_total = max(0, subtotal - discount)
+        totals = compute_invoice(self.invoice_items, parse_number(self.discount_edit.text()))
         
         # Update labels
-        self.subtotal_value.setText(f"{subtotal:,} تومان")
-        self.discount_value.setText(f"{discount:,} تومان")
-        self.final_value.setText(f"{final_total:,} تومان")
+        self.subtotal_value.setText(format_amount(totals.subtotal))
+        self.discount_value.setText(format_amount(totals.discount))
+        self.tax_value.setText(format_amount(totals.tax))
+        self.final_value.setText(format_amount(totals.final_amount))
     
     def clear_form(self):
         """Clear all form fields"""
@@ -524,7 +435,7 @@ class InvoiceView(QWidget):
         self.header_text_edit.clear()
         self.background_image_path = ""
         self.bg_label_path.setText("تصویر انتخاب نشده")
-        self.bg_label_path.setStyleSheet("color: #666; font-style: italic;")
+        set_style_class(self.bg_label_path, "hint")
         self.invoice_items.clear()
         self.update_items_table()
         self.update_totals()
@@ -548,11 +459,7 @@ class InvoiceView(QWidget):
         notes = self.notes_edit.toPlainText().strip()
         header_text = self.header_text_edit.toPlainText().strip()
         
-        try:
-            discount_text = self.discount_edit.text().replace(',', '').replace('٬', '')
-            discount_amount = int(float(discount_text)) if discount_text else 0
-        except (ValueError, TypeError):
-            discount_amount = 0
+        discount_amount = parse_number(self.discount_edit.text())
         
         # Save invoice
         success, message = self.db_service.create_invoice(
@@ -591,7 +498,7 @@ class InvoiceView(QWidget):
             'customer_phone': self.customer_phone_edit.text().strip(),
             'customer_address': self.customer_address_edit.toPlainText().strip(),
             'items': self.invoice_items,
-            'discount_amount': int(float(self.discount_edit.text().replace(',', ''))) if self.discount_edit.text() else 0,
+            'discount_amount': parse_number(self.discount_edit.text()),
             'notes': self.notes_edit.toPlainText().strip(),
             'header_text': self.header_text_edit.toPlainText().strip(),
             'background_image_path': self.background_image_path,
@@ -671,11 +578,7 @@ class InvoiceView(QWidget):
     
     def get_current_invoice_data(self):
         """Get current invoice data for export/print"""
-        try:
-            discount_text = self.discount_edit.text().replace(',', '').replace('٬', '')
-            discount_amount = int(float(discount_text)) if discount_text else 0
-        except (ValueError, TypeError):
-            discount_amount = 0
+        discount_amount = parse_number(self.discount_edit.text())
             
         return {
             'invoice_number': f"پیش‌نمایش-{datetime.now().strftime('%H%M%S')}",
@@ -692,11 +595,7 @@ class InvoiceView(QWidget):
     
     def show_print_preview(self, invoice_data):
         """Show print preview dialog"""
-        printer = QPrinter(QPrinter.Mode.HighResolution)
-        printer.setPageSize(QPrinter.PageSize.A4)
+        from views.print_preview import InvoicePreviewDialog
         
-        preview_dialog = QPrintPreviewDialog(printer, self)
-        preview_dialog.paintRequested.connect(
-            lambda printer: self.print_service.print_invoice(invoice_data, printer)
-        )
+        preview_dialog = InvoicePreviewDialog(self.print_service, invoice_data, self)
         preview_dialog.exec()
\ No newline at end of file
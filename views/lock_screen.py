@@ -0,0 +1,133 @@
+"""
+Lock Screen for Persian Invoicing System
+Re-authentication overlay covering the main window while the session is locked
+"""
+
+from PyQt6.QtWidgets import QWidget, QFrame, QVBoxLayout, QLabel, QLineEdit, QPushButton
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QFont
+
+class AuthenticationThread(QThread):
+    """Thread for checking or creating a user without blocking UI"""
+    
+    auth_finished = pyqtSignal(bool, str)
+    
+    def __init__(self, db_service, username, password, register=False):
+        super().__init__()
+        self.db_service = db_service
+        self.username = username
+        self.password = password
+        self.register = register
+    
+    def run(self):
+        """Hash or check the password in background"""
+        if self.register:
+            success, message = self.db_service.create_user(self.username, self.password)
+        else:
+            success, message = self.db_service.authenticate_user(self.username, self.password)
+        self.auth_finished.emit(success, message)
+
+class LockScreen(QWidget):
+    """Opaque overlay asking the signed-in user for their password again
+    
+    The main window, its views and the database stay as they are underneath,
+    so unlocking only hides the overlay.
+    """
+    
+    unlocked = pyqtSignal()
+    
+    def __init__(self, db_service, username, parent):
+        super().__init__(parent)
+        self.db_service = db_service
+        self.username = username
+        self.auth_thread = None
+        self.setup_ui()
+        self.hide()
+    
+    def setup_ui(self):
+        """Setup the lock screen UI"""
+        self.setObjectName("lock_screen")
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground)
+        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
+        
+        card = QFrame()
+        card.setObjectName("lock_card")
+        card.setFixedWidth(380)
+        card_layout = QVBoxLayout(card)
+        card_layout.setSpacing(12)
+        card_layout.setContentsMargins(30, 30, 30, 30)
+        
+        title_label = QLabel("🔒 برنامه قفل شده است")
+        title_label.setFont(QFont("Vazirmatn", 16, QFont.Weight.Bold))
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title_label.setProperty("class", "title")
+        
+        user_label = QLabel(f"برای ادامه، رمز عبور «{self.username}» را وارد کنید")
+        user_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        user_label.setWordWrap(True)
+        user_label.setProperty("class", "muted")
+        
+        self.password_edit = QLineEdit()
+        self.password_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        self.password_edit.setPlaceholderText("رمز عبور")
+        self.password_edit.returnPressed.connect(self.try_unlock)
+        
+        self.message_label = QLabel()
+        self.message_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.message_label.setWordWrap(True)
+        self.message_label.setProperty("class", "error")
+        
+        self.unlock_button = QPushButton("🔓 باز کردن قفل")
+        self.unlock_button.clicked.connect(self.try_unlock)
+        
+        card_layout.addWidget(title_label)
+        card_layout.addWidget(user_label)
+        card_layout.addWidget(self.password_edit)
+        card_layout.addWidget(self.message_label)
+        card_layout.addWidget(self.unlock_button)
+        
+        layout = QVBoxLayout(self)
+        layout.addStretch()
+        layout.addWidget(card, 0, Qt.AlignmentFlag.AlignHCenter)
+        layout.addStretch()
+    
+    def lock(self):
+        """Cover the whole parent window and wait for the password"""
+        self.password_edit.clear()
+        self.message_label.clear()
+        self.setGeometry(self.parentWidget().rect())
+        self.show()
+        self.raise_()
+        self.password_edit.setFocus()
+    
+    def is_locked(self):
+        """Whether the overlay is covering the window"""
+        return self.isVisible()
+    
+    def try_unlock(self):
+        """Check the password in a worker thread"""
+        password = self.password_edit.text()
+        if not password or (self.auth_thread and self.auth_thread.isRunning()):
+            return
+        
+        self.set_busy(True)
+        self.auth_thread = AuthenticationThread(self.db_service, self.username, password)
+        self.auth_thread.auth_finished.connect(self.on_authentication_finished)
+        self.auth_thread.start()
+    
+    def on_authentication_finished(self, success, message):
+        """Unlock, or show why the password was refused"""
+        self.set_busy(False)
+        if success:
+            self.hide()
+            self.unlocked.emit()
+        else:
+            self.message_label.setText(message)
+            self.password_edit.clear()
+            self.password_edit.setFocus()
+    
+    def set_busy(self, busy):
+        """Disable the form while the password is being checked"""
+        self.password_edit.setEnabled(not busy)
+        self.unlock_button.setEnabled(not busy)
+        self.unlock_button.setText("⏳ در حال بررسی..." if busy else "🔓 باز کردن قفل")
@@ -0,0 +1,281 @@
+"""
+Price Update Dialog for Persian Invoicing System
+Bulk repricing by rule with a preview of the changes and undo of past runs
+"""
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
+                           QLabel, QLineEdit, QPushButton, QComboBox, QDoubleSpinBox,
+                           QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+                           QGroupBox, QAbstractItemView)
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QIntValidator
+from services.price_update import PriceRule, RULE_LABELS, PERCENT_CHANGE
+from services.persian_utils import format_amount, jalali_date, parse_number
+
+# Rounding choices in Toman
+ROUNDING_CHOICES = [
+    (1, "بدون گرد کردن"),
+    (100, "۱۰۰ تومان"),
+    (1000, "۱٬۰۰۰ تومان"),
+    (10000, "۱۰٬۰۰۰ تومان")
+]
+
+# Rows shown in the preview table; the summary covers every matching product
+PREVIEW_LIMIT = 200
+
+class PriceUpdateDialog(QDialog):
+    """Rule form, preview table and repricing history"""
+    
+    prices_changed = pyqtSignal()
+    
+    def __init__(self, db_service, parent=None):
+        super().__init__(parent)
+        self.db_service = db_service
+        self.previewed_rule = None
+        self.setup_ui()
+        self.load_history()
+    
+    def setup_ui(self):
+        """Setup the price update dialog UI"""
+        self.setWindowTitle("تغییر گروهی قیمت")
+        self.setModal(True)
+        self.resize(800, 700)
+        
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(20, 20, 20, 20)
+        
+        # Rule
+        rule_group = QGroupBox("قاعده قیمت‌گذاری")
+        rule_layout = QGridLayout()
+        rule_layout.setSpacing(10)
+        
+        self.mode_combo = QComboBox()
+        for mode, label in RULE_LABELS.items():
+            self.mode_combo.addItem(label, mode)
+        self.mode_combo.currentIndexChanged.connect(self.on_rule_changed)
+        
+        self.percent_spin = QDoubleSpinBox()
+        self.percent_spin.setRange(-99.99, 1000)
+        self.percent_spin.setDecimals(2)
+        self.percent_spin.setSuffix(" ٪")
+        self.percent_spin.setValue(10)
+        self.percent_spin.valueChanged.connect(self.on_rule_changed)
+        
+        self.rounding_combo = QComboBox()
+        for rounding, label in ROUNDING_CHOICES:
+            self.rounding_combo.addItem(label, rounding)
+        self.rounding_combo.setCurrentIndex(2)
+        self.rounding_combo.currentIndexChanged.connect(self.on_rule_changed)
+        
+        self.name_edit = QLineEdit()
+        self.name_edit.setPlaceholderText("همه کالاها")
+        self.name_edit.textChanged.connect(self.on_rule_changed)
+        
+        self.min_price_edit = QLineEdit()
+        self.min_price_edit.setPlaceholderText("بدون حداقل")
+        self.min_price_edit.setValidator(QIntValidator(0, 2147483647))
+        self.min_price_edit.textChanged.connect(self.on_rule_changed)
+        
+        self.max_price_edit = QLineEdit()
+        self.max_price_edit.setPlaceholderText("بدون حداکثر")
+        self.max_price_edit.setValidator(QIntValidator(0, 2147483647))
+        self.max_price_edit.textChanged.connect(self.on_rule_changed)
+        
+        rule_layout.addWidget(QLabel("نوع قاعده:"), 0, 0)
+        rule_layout.addWidget(self.mode_combo, 0, 1)
+        rule_layout.addWidget(QLabel("درصد:"), 0, 2)
+        rule_layout.addWidget(self.percent_spin, 0, 3)
+        rule_layout.addWidget(QLabel("گرد کردن به:"), 1, 0)
+        rule_layout.addWidget(self.rounding_combo, 1, 1)
+        rule_layout.addWidget(QLabel("نام شامل:"), 1, 2)
+        rule_layout.addWidget(self.name_edit, 1, 3)
+        rule_layout.addWidget(QLabel("قیمت فروش از:"), 2, 0)
+        rule_layout.addWidget(self.min_price_edit, 2, 1)
+        rule_layout.addWidget(QLabel("تا:"), 2, 2)
+        rule_layout.addWidget(self.max_price_edit, 2, 3)
+        rule_group.setLayout(rule_layout)
+        
+        # Preview
+        preview_group = QGroupBox("پیش‌نمایش تغییرات")
+        preview_layout = QVBoxLayout()
+        
+        self.preview_table = QTableWidget()
+        self.preview_table.setColumnCount(4)
+        self.preview_table.setHorizontalHeaderLabels(["نام کالا", "قیمت فعلی", "قیمت جدید", "تغییر"])
+        self.preview_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.preview_table.verticalHeader().setVisible(False)
+        self.preview_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        
+        self.summary_label = QLabel("برای مشاهده تغییرات، پیش‌نمایش را بزنید")
+        self.summary_label.setFont(QFont("Vazirmatn", 10, QFont.Weight.Bold))
+        
+        preview_layout.addWidget(self.preview_table)
+        preview_layout.addWidget(self.summary_label)
+        preview_group.setLayout(preview_layout)
+        
+        # History
+        history_group = QGroupBox("تغییرات قبلی")
+        history_layout = QVBoxLayout()
+        
+        self.history_table = QTableWidget()
+        self.history_table.setColumnCount(4)
+        self.history_table.setHorizontalHeaderLabels(["تاریخ", "قاعده", "تعداد کالا", "وضعیت"])
+        self.history_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.history_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.history_table.verticalHeader().setVisible(False)
+        self.history_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.history_table.setMaximumHeight(180)
+        
+        history_layout.addWidget(self.history_table)
+        history_group.setLayout(history_layout)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        
+        self.undo_button = QPushButton("↩️ بازگردانی تغییر انتخاب‌شده")
+        self.undo_button.clicked.connect(self.undo_selected)
+        
+        self.close_button = QPushButton("بستن")
+        self.close_button.clicked.connect(self.reject)
+        
+        self.preview_button = QPushButton("👁️ پیش‌نمایش")
+        self.preview_button.clicked.connect(self.preview)
+        
+        self.apply_button = QPushButton("✅ اعمال تغییر قیمت")
+        self.apply_button.clicked.connect(self.apply)
+        self.apply_button.setEnabled(False)
+        
+        button_layout.addWidget(self.undo_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.close_button)
+        button_layout.addWidget(self.preview_button)
+        button_layout.addWidget(self.apply_button)
+        
+        layout.addWidget(rule_group)
+        layout.addWidget(preview_group)
+        layout.addWidget(history_group)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
+    
+    def current_rule(self):
+        """Rule described by the form"""
+        min_price = self.min_price_edit.text().strip()
+        max_price = self.max_price_edit.text().strip()
+        return PriceRule(
+            mode=self.mode_combo.currentData(),
+            percent=round(self.percent_spin.value(), 2),
+            rounding=self.rounding_combo.currentData(),
+            name_filter=self.name_edit.text().strip(),
+            min_price=parse_number(min_price) if min_price else None,
+            max_price=parse_number(max_price) if max_price else None
+        )
+    
+    def on_rule_changed(self):
+        """A changed rule must be previewed again before it is applied"""
+        self.previewed_rule = None
+        self.apply_button.setEnabled(False)
+        self.percent_spin.setMinimum(-99.99 if self.mode_combo.currentData() == PERCENT_CHANGE else 0)
+    
+    def preview(self):
+        """Show the products the rule would change"""
+        rule = self.current_rule()
+        success, message, preview = self.db_service.preview_price_update(rule, PREVIEW_LIMIT)
+        if not success:
+            QMessageBox.warning(self, "خطا", message)
+            return
+        
+        rows = preview['rows']
+        self.preview_table.setRowCount(len(rows))
+        for row, product in enumerate(rows):
+            change = product['change']
+            values = [
+                product['name'],
+                format_amount(product['old_price']),
+                format_amount(product['new_price']),
+                f"{'+' if change > 0 else ''}{change:,}"
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 3:
+                    item.setForeground(QColor("#27ae60" if change > 0 else "#e74c3c"))
+                self.preview_table.setItem(row, column, item)
+        
+        summary = (f"{message} — مجموع قیمت‌ها از {format_amount(preview['old_total'])} "
+                   f"به {format_amount(preview['new_total'])}")
+        if preview['count'] > len(rows):
+            summary += f" (نمایش {len(rows):,} کالای نخست)"
+        self.summary_label.setText(summary)
+        
+        self.previewed_rule = rule if preview['count'] else None
+        self.apply_button.setEnabled(self.previewed_rule is not None)
+    
+    def apply(self):
+        """Apply the previewed rule after confirmation"""
+        if self.previewed_rule is None:
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "تأیید تغییر قیمت",
+            f"{self.summary_label.text()}\n\nتغییر قیمت اعمال شود؟",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        success, message = self.db_service.apply_price_update(self.previewed_rule)
+        if success:
+            QMessageBox.information(self, "موفقیت", message)
+            self.on_rule_changed()
+            self.preview_table.setRowCount(0)
+            self.summary_label.setText("")
+            self.load_history()
+            self.prices_changed.emit()
+        else:
+            QMessageBox.critical(self, "خطا", message)
+    
+    def load_history(self):
+        """Fill the table of recent repricing runs"""
+        self.history = self.db_service.get_price_updates()
+        self.history_table.setRowCount(len(self.history))
+        for row, price_update in enumerate(self.history):
+            status = "بازگردانده شد" if price_update['undone_at'] else "اعمال شده"
+            values = [
+                jalali_date(price_update['created_at'], with_time=True),
+                price_update['description'] or "",
+                f"{price_update['product_count']:,}",
+                status
+            ]
+            for column, value in enumerate(values):
+                self.history_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def undo_selected(self):
+        """Restore the prices replaced by the selected run"""
+        row = self.history_table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "خطا", "لطفاً یک تغییر قیمت را انتخاب کنید")
+            return
+        
+        price_update = self.history[row]
+        reply = QMessageBox.question(
+            self,
+            "تأیید بازگردانی",
+            f"قیمت‌های پیش از «{price_update['description']}» بازگردانده شود؟",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        success, message = self.db_service.undo_price_update(price_update['id'])
+        if success:
+            QMessageBox.information(self, "موفقیت", message)
+            self.load_history()
+            self.prices_changed.emit()
+        else:
+            QMessageBox.critical(self, "خطا", message)
@@ -0,0 +1,266 @@
+"""
+Print Preview for Persian Invoicing System
+Renders invoice pages off the GUI thread and caches them per zoom level
+"""
+
+from collections import OrderedDict
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                           QPushButton, QComboBox, QScrollArea, QWidget,
+                           QMessageBox)
+from PyQt6.QtCore import Qt, QRect, QSize, QThread, pyqtSignal
+from PyQt6.QtGui import QFont, QPainter, QColor, QImage
+from PyQt6.QtPrintSupport import QPrintDialog
+
+PAGE_SPACING = 20
+ZOOM_LEVELS = [0.5, 0.75, 1.0, 1.25, 1.5, 2.0]
+DEFAULT_ZOOM = 1.0
+
+# Number of zoom levels whose rendered pages are kept in memory
+ZOOM_CACHE_SIZE = 3
+
+class PageRenderThread(QThread):
+    """Thread for rendering invoice pages to images without blocking UI"""
+
+    page_rendered = pyqtSignal(float, int, QImage)
+
+    def __init__(self, print_service, invoice_data, page_size, pages, zoom, page_order):
+        super().__init__()
+        self.print_service = print_service
+        self.invoice_data = invoice_data
+        self.page_size = page_size
+        self.pages = pages
+        self.zoom = zoom
+        self.page_order = page_order
+
+    def run(self):
+        """Render pages in the requested order, stopping early if interrupted"""
+        for page_index in self.page_order:
+            if self.isInterruptionRequested():
+                return
+
+            try:
+                image = self.print_service.render_page_image(
+                    self.invoice_data, self.page_size, page_index, self.pages, self.zoom
+                )
+            except Exception as e:
+                print(f"Error rendering preview page {page_index}: {e}")
+                continue
+
+            self.page_rendered.emit(self.zoom, page_index, image)
+
+class PreviewCanvas(QWidget):
+    """Widget that paints rendered pages and placeholders for pending ones"""
+
+    def __init__(self, logical_page_size, page_count):
+        super().__init__()
+        self.logical_page_size = logical_page_size
+        self.page_count = page_count
+        self.zoom = DEFAULT_ZOOM
+        self.images = {}
+        self.update_size()
+
+    def page_size(self):
+        """Size of one page at the current zoom"""
+        return QSize(
+            int(self.logical_page_size.width() * self.zoom),
+            int(self.logical_page_size.height() * self.zoom)
+        )
+
+    def page_rect(self, page_index):
+        """Rectangle of a page inside the canvas"""
+        size = self.page_size()
+        x = max(PAGE_SPACING, (self.width() - size.width()) // 2)
+        y = PAGE_SPACING + page_index * (size.height() + PAGE_SPACING)
+        return QRect(x, y, size.width(), size.height())
+
+    def update_size(self):
+        """Resize canvas to fit all pages at the current zoom"""
+        size = self.page_size()
+        self.setMinimumSize(
+            size.width() + 2 * PAGE_SPACING,
+            self.page_count * (size.height() + PAGE_SPACING) + PAGE_SPACING
+        )
+
+    def set_zoom(self, zoom, images):
+        """Switch to another zoom level and its cached page images"""
+        self.zoom = zoom
+        self.images = images
+        self.update_size()
+        self.update()
+
+    def visible_pages(self, visible_rect):
+        """Return indexes of pages intersecting visible_rect"""
+        return [
+            page_index for page_index in range(self.page_count)
+            if self.page_rect(page_index).intersects(visible_rect)
+        ]
+
+    def paintEvent(self, event):
+        """Paint only the pages inside the exposed area"""
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), QColor(120, 120, 120))
+
+        for page_index in self.visible_pages(event.rect()):
+            rect = self.page_rect(page_index)
+            image = self.images.get(page_index)
+
+            if image is not None:
+                painter.drawImage(rect.topLeft(), image)
+            else:
+                painter.fillRect(rect, QColor(245, 245, 245))
+                painter.setPen(QColor(150, 150, 150))
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "در حال آماده‌سازی صفحه...")
+
+        painter.end()
+
+class InvoicePreviewDialog(QDialog):
+    """Invoice print preview with progressive page rendering"""
+
+    def __init__(self, print_service, invoice_data, parent=None):
+        super().__init__(parent)
+        self.print_service = print_service
+        # Snapshot the data so the render thread never sees later edits
+        self.invoice_data = dict(invoice_data)
+        self.invoice_data['items'] = [dict(item) for item in invoice_data.get('items', [])]
+        # Paginate on the same logical page the printer and PDF output use
+        page_rect = print_service.printer_page_rect(print_service.create_printer())
+        self.page_size = page_rect.size()
+        self.pages = print_service.paginate(self.invoice_data, page_rect)
+        self.zoom_cache = OrderedDict()
+        self.render_thread = None
+        self.retired_threads = []
+        self.setup_ui()
+        self.set_zoom(DEFAULT_ZOOM)
+
+    def setup_ui(self):
+        """Setup preview dialog UI"""
+        self.setWindowTitle("پیش‌نمایش فاکتور")
+        self.resize(950, 900)
+
+        layout = QVBoxLayout()
+
+        # Toolbar
+        toolbar_layout = QHBoxLayout()
+
+        self.zoom_out_button = QPushButton("➖")
+        self.zoom_out_button.clicked.connect(lambda: self.step_zoom(-1))
+
+        self.zoom_combo = QComboBox()
+        for zoom in ZOOM_LEVELS:
+            self.zoom_combo.addItem(f"{int(zoom * 100)}%", zoom)
+        self.zoom_combo.setCurrentIndex(ZOOM_LEVELS.index(DEFAULT_ZOOM))
+        self.zoom_combo.currentIndexChanged.connect(
+            lambda index: self.set_zoom(self.zoom_combo.itemData(index))
+        )
+
+        self.zoom_in_button = QPushButton("➕")
+        self.zoom_in_button.clicked.connect(lambda: self.step_zoom(1))
+
+        self.pages_label = QLabel(f"تعداد صفحات: {len(self.pages)}")
+        self.pages_label.setFont(QFont("Vazirmatn", 10))
+
+        self.print_button = QPushButton("🖨️ چاپ")
+        self.print_button.clicked.connect(self.print_invoice)
+
+        self.close_button = QPushButton("بستن")
+        self.close_button.clicked.connect(self.reject)
+
+        toolbar_layout.addWidget(self.zoom_out_button)
+        toolbar_layout.addWidget(self.zoom_combo)
+        toolbar_layout.addWidget(self.zoom_in_button)
+        toolbar_layout.addWidget(self.pages_label)
+        toolbar_layout.addStretch()
+        toolbar_layout.addWidget(self.print_button)
+        toolbar_layout.addWidget(self.close_button)
+
+        # Pages
+        self.canvas = PreviewCanvas(self.page_size, len(self.pages))
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidget(self.canvas)
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+
+        layout.addLayout(toolbar_layout)
+        layout.addWidget(self.scroll_area)
+
+        self.setLayout(layout)
+
+    def step_zoom(self, step):
+        """Move zoom combo one level in or out"""
+        index = self.zoom_combo.currentIndex() + step
+        if 0 <= index < self.zoom_combo.count():
+            self.zoom_combo.setCurrentIndex(index)
+
+    def cached_images(self, zoom):
+        """Return cached images for zoom, evicting least recently used levels"""
+        if zoom in self.zoom_cache:
+            self.zoom_cache.move_to_end(zoom)
+        else:
+            self.zoom_cache[zoom] = {}
+            while len(self.zoom_cache) > ZOOM_CACHE_SIZE:
+                self.zoom_cache.popitem(last=False)
+        return self.zoom_cache[zoom]
+
+    def set_zoom(self, zoom):
+        """Show pages at zoom, rendering only the pages not cached yet"""
+        images = self.cached_images(zoom)
+        self.canvas.set_zoom(zoom, images)
+        self.stop_render_thread()
+
+        # Visible pages first so the user sees something immediately
+        viewport = self.scroll_area.viewport()
+        visible_rect = QRect(
+            -self.canvas.x(), -self.canvas.y(), viewport.width(), viewport.height()
+        )
+        visible = self.canvas.visible_pages(visible_rect) or [0]
+        page_order = visible + [i for i in range(len(self.pages)) if i not in visible]
+        page_order = [i for i in page_order if i not in images]
+
+        if not page_order:
+            return
+
+        self.render_thread = PageRenderThread(
+            self.print_service, self.invoice_data, self.page_size, self.pages, zoom, page_order
+        )
+        self.render_thread.page_rendered.connect(self.on_page_rendered)
+        self.render_thread.start()
+
+    def on_page_rendered(self, zoom, page_index, image):
+        """Store a rendered page and repaint it if it belongs to the shown zoom"""
+        if zoom not in self.zoom_cache:
+            return
+
+        self.zoom_cache[zoom][page_index] = image
+        if zoom == self.canvas.zoom:
+            self.canvas.update(self.canvas.page_rect(page_index))
+
+    def stop_render_thread(self):
+        """Ask the running render thread to stop without waiting for it"""
+        if self.render_thread is None:
+            return
+
+        thread = self.render_thread
+        self.render_thread = None
+        if thread.isRunning():
+            thread.requestInterruption()
+            # Keep a reference until the thread finishes
+            self.retired_threads.append(thread)
+            thread.finished.connect(lambda: self.retired_threads.remove(thread))
+
+    def print_invoice(self):
+        """Send the invoice to a printer"""
+        printer = self.print_service.create_printer()
+        print_dialog = QPrintDialog(printer, self)
+
+        if print_dialog.exec() == QDialog.DialogCode.Accepted:
+            try:
+                self.print_service.print_invoice(self.invoice_data, printer)
+            except Exception as e:
+                QMessageBox.critical(self, "خطا", f"خطا در چاپ: {str(e)}")
+
+    def done(self, result):
+        """Stop rendering before the dialog closes"""
+        self.stop_render_thread()
+        for thread in list(self.retired_threads):
+            thread.wait()
+        super().done(result)
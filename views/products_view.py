@@ -6,11 +6,16 @@ Enhanced with improved validation and UI
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QLabel, QLineEdit, QPushButton, QTableWidget, 
                            QTableWidgetItem, QHeaderView, QMessageBox, 
-                           QFrame, QGroupBox, QTextEdit, QSpinBox,
-                           QSplitter, QSizePolicy, QAbstractItemView)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QDoubleValidator, QIntValidator
-from services.database_service import DatabaseService
+                           QFrame, QGroupBox, QTextEdit, QSpinBox, QDoubleSpinBox,
+                           QSplitter, QSizePolicy, QAbstractItemView, QFileDialog)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QDoubleValidator, QIntValidator
+from services.database_service import get_database_service
+from services.persian_utils import format_amount, format_number, to_latin_digits, parse_number
+from services.invoice_totals import tax_rate_from_percent
+from services.product_import import ProductImporter, write_error_report
+from views.price_update_dialog import PriceUpdateDialog
+from database.models import Product
 
 class ProductFormWidget(QFrame):
     """Enhanced product form widget"""
@@ -19,7 +24,7 @@ class ProductFormWidget(QFrame):
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
         self.current_product_id = None
         self.setup_ui()
         self.setup_validation()
@@ -33,7 +38,7 @@ class ProductFormWidget(QFrame):
         # Form title
         title_label = QLabel("افزودن / ویرایش کالا")
         title_label.setFont(QFont("Vazirmatn", 14, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #2c3e50; margin-bottom: 15px;")
+        title_label.setProperty("class", "title")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Form fields
@@ -73,6 +78,27 @@ class ProductFormWidget(QFrame):
         self.stock_spin.setFont(QFont("Vazirmatn", 11))
         self.stock_spin.setSuffix(" عدد")
         
+        # Reorder threshold
+        threshold_label = QLabel("حد سفارش مجدد:")
+        threshold_label.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
+        self.threshold_spin = QSpinBox()
+        self.threshold_spin.setMinimum(0)
+        self.threshold_spin.setMaximum(1000000)
+        self.threshold_spin.setValue(Product.DEFAULT_REORDER_THRESHOLD)
+        self.threshold_spin.setFont(QFont("Vazirmatn", 11))
+        self.threshold_spin.setSuffix(" عدد")
+        self.threshold_spin.setToolTip("با رسیدن موجودی به این مقدار، کالا کم‌موجود اعلام می‌شود")
+        
+        # VAT rate
+        tax_label = QLabel("نرخ مالیات بر ارزش افزوده:")
+        tax_label.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
+        self.tax_spin = QDoubleSpinBox()
+        self.tax_spin.setRange(0, 100)
+        self.tax_spin.setDecimals(2)
+        self.tax_spin.setValue(Product.DEFAULT_TAX_RATE / 100)
+        self.tax_spin.setFont(QFont("Vazirmatn", 11))
+        self.tax_spin.setSuffix(" ٪")
+        
         # Description
         desc_label = QLabel("توضیحات:")
         desc_label.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
@@ -90,8 +116,12 @@ class ProductFormWidget(QFrame):
         form_layout.addWidget(self.sale_edit, 2, 1)
         form_layout.addWidget(stock_label, 3, 0)
         form_layout.addWidget(self.stock_spin, 3, 1)
-        form_layout.addWidget(desc_label, 4, 0)
-        form_layout.addWidget(self.desc_edit, 4, 1)
+        form_layout.addWidget(threshold_label, 4, 0)
+        form_layout.addWidget(self.threshold_spin, 4, 1)
+        form_layout.addWidget(tax_label, 5, 0)
+        form_layout.addWidget(self.tax_spin, 5, 1)
+        form_layout.addWidget(desc_label, 6, 0)
+        form_layout.addWidget(self.desc_edit, 6, 1)
         
         # Buttons
         button_layout = QHBoxLayout()
@@ -125,11 +155,11 @@ class ProductFormWidget(QFrame):
     def format_price_input(self):
         """Format price input with thousand separators"""
         sender = self.sender()
-        text = sender.text().replace(',', '').replace('٬', '')
+        text = to_latin_digits(sender.text())
         
         if text and text.isdigit():
             # Format with thousand separators
-            formatted = f"{int(text):,}"
+            formatted = format_number(text)
             
             # Prevent infinite loop
             if sender.text() != formatted:
@@ -148,19 +178,10 @@ class ProductFormWidget(QFrame):
             is_valid = False
         
         # Check prices (they can be 0)
-        try:
-            purchase_text = self.purchase_edit.text().replace(',', '').replace('٬', '')
-            if purchase_text and not purchase_text.isdigit():
+        for price_edit in (self.purchase_edit, self.sale_edit):
+            price_text = to_latin_digits(price_edit.text())
+            if price_text and not price_text.isdigit():
                 is_valid = False
-        except:
-            is_valid = False
-            
-        try:
-            sale_text = self.sale_edit.text().replace(',', '').replace('٬', '')
-            if sale_text and not sale_text.isdigit():
-                is_valid = False
-        except:
-            is_valid = False
         
         # Enable/disable save button
         self.save_button.setEnabled(is_valid)
@@ -173,6 +194,8 @@ class ProductFormWidget(QFrame):
         self.purchase_edit.clear()
         self.sale_edit.clear()
         self.stock_spin.setValue(0)
+        self.threshold_spin.setValue(Product.DEFAULT_REORDER_THRESHOLD)
+        self.tax_spin.setValue(Product.DEFAULT_TAX_RATE / 100)
         self.desc_edit.clear()
         self.current_product_id = None
         
@@ -192,20 +215,13 @@ class ProductFormWidget(QFrame):
         # Get form data
         name = self.name_edit.text().strip()
         
-        # Parse prices (remove commas)
-        try:
-            purchase_text = self.purchase_edit.text().replace(',', '').replace('٬', '')
-            purchase_price = int(purchase_text) if purchase_text else 0
-        except:
-            purchase_price = 0
-            
-        try:
-            sale_text = self.sale_edit.text().replace(',', '').replace('٬', '')
-            sale_price = int(sale_text) if sale_text else 0
-        except:
-            sale_price = 0
+        # Parse prices (remove commas, accept Persian digits)
+        purchase_price = parse_number(self.purchase_edit.text())
+        sale_price = parse_number(self.sale_edit.text())
         
         stock_quantity = self.stock_spin.value()
+        reorder_threshold = self.threshold_spin.value()
+        tax_rate = tax_rate_from_percent(self.tax_spin.value())
         description = self.desc_edit.toPlainText().strip()
         
         # Save to database
@@ -213,12 +229,12 @@ class ProductFormWidget(QFrame):
             # Update existing product
             success, message = self.db_service.update_product(
                 self.current_product_id, name, purchase_price, 
-                sale_price, stock_quantity, description
+                sale_price, stock_quantity, description, reorder_threshold, tax_rate
             )
         else:
             # Add new product
             success, message = self.db_service.add_product(
-                name, purchase_price, sale_price, stock_quantity, description
+                name, purchase_price, sale_price, stock_quantity, description, reorder_threshold, tax_rate
             )
         
         if success:
@@ -232,9 +248,11 @@ class ProductFormWidget(QFrame):
         """Load product data into form for editing"""
         self.current_product_id = product.id
         self.name_edit.setText(product.name)
-        self.purchase_edit.setText(f"{product.purchase_price:,}")
-        self.sale_edit.setText(f"{product.sale_price:,}")
+        self.purchase_edit.setText(format_number(product.purchase_price))
+        self.sale_edit.setText(format_number(product.sale_price))
         self.stock_spin.setValue(product.stock_quantity)
+        self.threshold_spin.setValue(product.reorder_threshold)
+        self.tax_spin.setValue(product.tax_percent)
         self.desc_edit.setPlainText(product.description or "")
         
         # Update form title
@@ -244,13 +262,36 @@ class ProductFormWidget(QFrame):
             
         self.save_button.setText("به‌روزرسانی کالا")
 
+class ProductImportThread(QThread):
+    """Thread for importing a product file without blocking UI"""
+    
+    progress_updated = pyqtSignal(int)
+    import_finished = pyqtSignal(bool, str, list)
+    
+    def __init__(self, db_service, file_path):
+        super().__init__()
+        self.db_service = db_service
+        self.file_path = file_path
+    
+    def run(self):
+        """Import products in background"""
+        try:
+            result = ProductImporter(self.db_service).import_file(self.file_path, self.progress_updated.emit)
+            message = f"{result.inserted:,} کالای جدید اضافه و {result.updated:,} کالا به‌روزرسانی شد"
+            if result.errors:
+                message += f"\n{len(result.errors):,} ردیف به دلیل خطا وارد نشد"
+            self.import_finished.emit(True, message, result.errors)
+        except Exception as e:
+            self.import_finished.emit(False, f"خطا در ورود کالاها: {str(e)}", [])
+
 class ProductsView(QWidget):
     """Enhanced products management view"""
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
         self.current_products = []
+        self.import_thread = None
         self.setup_ui()
         self.setup_styling()
         self.load_products()
@@ -290,7 +331,7 @@ class ProductsView(QWidget):
         
         title_label = QLabel("لیست کالاها")
         title_label.setFont(QFont("Vazirmatn", 14, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #2c3e50;")
+        title_label.setProperty("class", "title")
         
         # Search box
         self.search_edit = QLineEdit()
@@ -305,9 +346,23 @@ class ProductsView(QWidget):
         self.refresh_button.clicked.connect(self.load_products)
         self.refresh_button.setMaximumWidth(120)
         
+        # Bulk repricing button
+        self.price_update_button = QPushButton("💲 تغییر گروهی قیمت")
+        self.price_update_button.setFont(QFont("Vazirmatn", 10, QFont.Weight.Bold))
+        self.price_update_button.clicked.connect(self.open_price_update)
+        self.price_update_button.setMinimumWidth(140)
+        
+        # Bulk import button
+        self.import_button = QPushButton("📥 ورود گروهی")
+        self.import_button.setFont(QFont("Vazirmatn", 10, QFont.Weight.Bold))
+        self.import_button.clicked.connect(self.import_products)
+        self.import_button.setMinimumWidth(120)
+        
         header_layout.addWidget(title_label)
         header_layout.addStretch()
         header_layout.addWidget(self.search_edit)
+        header_layout.addWidget(self.import_button)
+        header_layout.addWidget(self.price_update_button)
         header_layout.addWidget(self.refresh_button)
         
         # Products table
@@ -348,7 +403,7 @@ class ProductsView(QWidget):
         
         for label in [self.total_products_label, self.total_value_label, self.low_stock_label]:
             label.setFont(QFont("Vazirmatn", 10))
-            label.setStyleSheet("color: #495057; padding: 5px;")
+            label.setProperty("class", "stat")
         
         stats_layout.addWidget(self.total_products_label, 0, 0)
         stats_layout.addWidget(self.total_value_label, 0, 1)
@@ -362,137 +417,11 @@ class ProductsView(QWidget):
         return panel_widget
         
     def setup_styling(self):
-        """Setup modern styling"""
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-            
-            ProductFormWidget {
-                background-color: white;
-                border: 2px solid #dee2e6;
-                border-radius: 12px;
-                margin: 5px;
-            }
-            
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #dee2e6;
-                border-radius: 8px;
-                margin: 10px 0px;
-                padding-top: 15px;
-                background-color: white;
-            }
-            
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 8px 0 8px;
-                color: #495057;
-                background-color: white;
-            }
-            
-            QLineEdit, QTextEdit, QSpinBox {
-                border: 2px solid #dee2e6;
-                border-radius: 8px;
-                padding: 10px;
-                font-size: 11pt;
-                background-color: white;
-                color: #495057;
-            }
-            
-            QLineEdit:focus, QTextEdit:focus, QSpinBox:focus {
-                border-color: #4CAF50;
-                outline: none;
-            }
-            
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 20px;
-                font-size: 11pt;
-                font-weight: bold;
-                min-width: 100px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #45a049, stop:1 #3d8b40);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3d8b40, stop:1 #2e7d32);
-            }
-            
-            QPushButton:disabled {
-                background: #cccccc;
-                color: #666666;
-            }
-            
-            QPushButton[class="secondary"] {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2196F3, stop:1 #1976D2);
-            }
-            
-            QPushButton[class="secondary"]:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #1976D2, stop:1 #1565C0);
-            }
-            
-            QPushButton[class="danger"] {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f44336, stop:1 #d32f2f);
-            }
-            
-            QPushButton[class="danger"]:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #d32f2f, stop:1 #c62828);
-            }
-            
-            QTableWidget {
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                background-color: white;
-                gridline-color: #f1f3f4;
-                font-size: 10pt;
-            }
-            
-            QTableWidget::item {
-                padding: 12px 8px;
-                border: none;
-            }
-            
-            QTableWidget::item:selected {
-                background-color: #e3f2fd;
-                color: #1976d2;
-            }
-            
-            QTableWidget::item:alternate {
-                background-color: #f8f9fa;
-            }
-            
-            QHeaderView::section {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f8f9fa, stop:1 #e9ecef);
-                padding: 12px 8px;
-                border: 1px solid #dee2e6;
-                font-weight: bold;
-                color: #495057;
-            }
-            
-            QLabel {
-                color: #495057;
-            }
-        """)
-        
-        # Set button classes
+        """Set style classes used by the application stylesheet"""
         self.form_widget.clear_button.setProperty("class", "secondary")
         self.refresh_button.setProperty("class", "secondary")
+        self.import_button.setProperty("class", "secondary")
+        self.price_update_button.setProperty("class", "secondary")
     
     def load_products(self):
         """Load products into table"""
@@ -514,13 +443,13 @@ class ProductsView(QWidget):
             self.products_table.setItem(row, 0, name_item)
             
             # Purchase price
-            purchase_item = QTableWidgetItem(f"{product.purchase_price:,} تومان")
+            purchase_item = QTableWidgetItem(format_amount(product.purchase_price))
             purchase_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
             purchase_item.setFlags(purchase_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
             self.products_table.setItem(row, 1, purchase_item)
             
             # Sale price
-            sale_item = QTableWidgetItem(f"{product.sale_price:,} تومان")
+            sale_item = QTableWidgetItem(format_amount(product.sale_price))
             sale_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
             sale_item.setFlags(sale_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
             self.products_table.setItem(row, 2, sale_item)
@@ -532,9 +461,9 @@ class ProductsView(QWidget):
             
             # Color code based on stock level
             if product.stock_quantity == 0:
-                stock_item.setBackground(QFont().defaultFamily())  # Red background
-            elif product.stock_quantity <= 5:
-                stock_item.setBackground(QFont().defaultFamily())  # Yellow background
+                stock_item.setBackground(QColor("#f8d7da"))  # Red background
+            elif product.is_low_stock:
+                stock_item.setBackground(QColor("#fff3cd"))  # Yellow background
             
             self.products_table.setItem(row, 3, stock_item)
             
@@ -570,7 +499,7 @@ class ProductsView(QWidget):
         try:
             total_products = len(self.current_products)
             total_value = sum(p.stock_quantity * p.sale_price for p in self.current_products)
-            low_stock_count = len([p for p in self.current_products if p.stock_quantity <= 5])
+            low_stock_count = len([p for p in self.current_products if p.is_low_stock])
             
             self.total_products_label.setText(f"تعداد کل: {total_products}")
             self.total_value_label.setText(f"ارزش کل موجودی: {total_value:,} تومان")
@@ -615,4 +544,70 @@ class ProductsView(QWidget):
                 QMessageBox.information(self, "موفقیت", message)
                 self.load_products()
             else:
-                QMessageBox.critical(self, "خطا", message)
\ No newline at end of file
+                QMessageBox.critical(self, "خطا", message)
+    
+    def open_price_update(self):
+        """Open the bulk repricing dialog and reload products after any change"""
+        dialog = PriceUpdateDialog(self.db_service, self)
+        dialog.prices_changed.connect(self.load_products)
+        dialog.exec()
+    
+    def import_products(self):
+        """Import products from an Excel or CSV file in a worker thread"""
+        if self.import_thread and self.import_thread.isRunning():
+            return
+        
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "ورود گروهی کالا",
+            "",
+            "Excel / CSV (*.xlsx *.csv *.tsv)"
+        )
+        
+        if not file_path:
+            return
+        
+        self.import_button.setEnabled(False)
+        self.import_button.setText("در حال ورود...")
+        
+        self.import_thread = ProductImportThread(self.db_service, file_path)
+        self.import_thread.progress_updated.connect(self.on_import_progress)
+        self.import_thread.import_finished.connect(self.on_import_finished)
+        self.import_thread.start()
+    
+    def on_import_progress(self, rows):
+        """Show the number of rows read so far"""
+        self.import_button.setText(f"{rows:,} ردیف")
+    
+    def on_import_finished(self, success, message, errors):
+        """Report the import result, offer the error report and reload the list"""
+        self.import_button.setText("📥 ورود گروهی")
+        self.import_button.setEnabled(True)
+        
+        if not success:
+            QMessageBox.critical(self, "خطا", message)
+            return
+        
+        self.load_products()
+        if not errors:
+            QMessageBox.information(self, "موفقیت", message)
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "ورود گروهی کالا",
+            f"{message}\n\nگزارش خطاها ذخیره شود؟",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره گزارش خطاها", "import_errors.csv", "CSV (*.csv)"
+        )
+        if file_path:
+            try:
+                write_error_report(file_path, errors)
+            except Exception as e:
+                QMessageBox.critical(self, "خطا", f"خطا در ذخیره فایل: {str(e)}")
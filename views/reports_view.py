@@ -9,11 +9,14 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QLabel, QPushButton, QTableWidget, QTableWidgetItem,
                            QHeaderView, QGroupBox, QDateEdit, QComboBox,
                            QTextEdit, QSplitter, QFrame, QMessageBox,
-                           QFileDialog, QProgressBar)
+                           QFileDialog, QProgressBar, QCheckBox)
 from PyQt6.QtCore import Qt, QDate, pyqtSignal, QThread
-from PyQt6.QtGui import QFont
-from services.database_service import DatabaseService
-import jdatetime
+from PyQt6.QtGui import QFont, QColor
+from services.database_service import get_database_service
+from services.sales_summary import PERIOD_LABELS
+from services.tax_summary import TAX_REPORT_PERIODS
+from services.export_pipeline import EXPORT_FORMATS, available_formats, export_report, format_of
+from services.persian_utils import format_amount, jalali_date
 
 class ReportGeneratorThread(QThread):
     """Thread for generating reports without blocking UI"""
@@ -34,14 +37,22 @@ class ReportGeneratorThread(QThread):
         try:
             self.progress_updated.emit(10)
             
-            if self.report_type == "sales":
-                report_data = self.generate_sales_report()
-            elif self.report_type == "products":
-                report_data = self.generate_products_report()
-            elif self.report_type == "customers":
-                report_data = self.generate_customers_report()
-            else:
-                report_data = {}
+            # Every query of the report reads the same snapshot
+            with self.db_service.read_snapshot(self.start_date, self.end_date) as snapshot:
+                if self.report_type == "sales":
+                    report_data = self.generate_sales_report(snapshot)
+                elif self.report_type == "products":
+                    report_data = self.generate_products_report(snapshot)
+                elif self.report_type == "customers":
+                    report_data = self.generate_customers_report(snapshot)
+                elif self.report_type == "stock":
+                    report_data = self.generate_stock_report(snapshot)
+                elif self.report_type in PERIOD_LABELS:
+                    report_data = self.generate_period_report(snapshot)
+                elif self.report_type in TAX_REPORT_PERIODS:
+                    report_data = self.generate_tax_report(snapshot)
+                else:
+                    report_data = {}
             
             self.progress_updated.emit(100)
             self.report_ready.emit(report_data)
@@ -49,31 +60,21 @@ class ReportGeneratorThread(QThread):
         except Exception as e:
             self.error_occurred.emit(str(e))
     
-    def generate_sales_report(self):
+    def generate_sales_report(self, snapshot):
         """Generate sales report"""
-        invoices = self.db_service.get_invoices()
-        
-        # Filter by date range
-        filtered_invoices = []
-        for invoice in invoices:
-            if self.start_date <= invoice.issue_date.date() <= self.end_date:
-                filtered_invoices.append(invoice)
+        filtered_invoices = snapshot.get_invoices()
         
         self.progress_updated.emit(50)
         
-        # Calculate statistics
-        total_invoices = len(filtered_invoices)
-        total_revenue = sum(inv.final_amount for inv in filtered_invoices)
-        total_discount = sum(inv.discount_amount for inv in filtered_invoices)
-        
-        # Group by date
-        daily_sales = {}
-        for invoice in filtered_invoices:
-            date_key = invoice.issue_date.date()
-            if date_key not in daily_sales:
-                daily_sales[date_key] = {'count': 0, 'revenue': 0}
-            daily_sales[date_key]['count'] += 1
-            daily_sales[date_key]['revenue'] += invoice.final_amount
+        # Totals come from the daily summary, one row per day
+        days = snapshot.get_daily_sales()
+        total_invoices = sum(day['invoice_count'] for day in days)
+        total_revenue = sum(day['revenue'] for day in days)
+        total_discount = sum(day['discount'] for day in days)
+        daily_sales = {
+            day['date']: {'count': day['invoice_count'], 'revenue': day['revenue']}
+            for day in days
+        }
         
         self.progress_updated.emit(80)
         
@@ -89,16 +90,16 @@ class ReportGeneratorThread(QThread):
             'invoices': filtered_invoices
         }
     
-    def generate_products_report(self):
+    def generate_products_report(self, snapshot):
         """Generate products report"""
-        products = self.db_service.get_products()
+        products = snapshot.get_products()
         
         self.progress_updated.emit(50)
         
         # Calculate statistics
         total_products = len(products)
         total_stock_value = sum(p.stock_quantity * p.sale_price for p in products)
-        low_stock_products = [p for p in products if p.stock_quantity <= 5]
+        low_stock_products = [p for p in products if p.is_low_stock]
         zero_stock_products = [p for p in products if p.stock_quantity == 0]
         
         self.progress_updated.emit(80)
@@ -116,15 +117,9 @@ class ReportGeneratorThread(QThread):
             'zero_stock_products': zero_stock_products
         }
     
-    def generate_customers_report(self):
+    def generate_customers_report(self, snapshot):
         """Generate customers report"""
-        invoices = self.db_service.get_invoices()
-        
-        # Filter by date range
-        filtered_invoices = []
-        for invoice in invoices:
-            if self.start_date <= invoice.issue_date.date() <= self.end_date:
-                filtered_invoices.append(invoice)
+        filtered_invoices = snapshot.get_invoices()
         
         self.progress_updated.emit(50)
         
@@ -158,16 +153,117 @@ class ReportGeneratorThread(QThread):
             'customers_data': customers_data
         }
 
+    def generate_stock_report(self, snapshot):
+        """Generate stock movements report from the ledger"""
+        movements = snapshot.get_stock_movements()
+        
+        self.progress_updated.emit(50)
+        
+        total_in = sum(m['quantity'] for m in movements if m['quantity'] > 0)
+        total_out = -sum(m['quantity'] for m in movements if m['quantity'] < 0)
+        
+        self.progress_updated.emit(80)
+        
+        return {
+            'type': 'stock',
+            'summary': {
+                'total_movements': len(movements),
+                'total_in': total_in,
+                'total_out': total_out
+            },
+            'movements': movements
+        }
+
+    def generate_period_report(self, snapshot):
+        """Generate monthly, quarterly or yearly sales from the daily summary"""
+        periods = snapshot.get_sales_by_period(self.report_type)
+        
+        self.progress_updated.emit(50)
+        
+        total_invoices = sum(period['invoice_count'] for period in periods)
+        total_revenue = sum(period['revenue'] for period in periods)
+        
+        self.progress_updated.emit(80)
+        
+        return {
+            'type': 'periods',
+            'period': self.report_type,
+            'summary': {
+                'period_count': len(periods),
+                'total_invoices': total_invoices,
+                'total_revenue': total_revenue,
+                'total_discount': sum(period['discount'] for period in periods),
+                'total_items': sum(period['items_sold'] for period in periods),
+                'average_period': total_revenue // len(periods) if periods else 0
+            },
+            'periods': periods
+        }
+
+    def generate_tax_report(self, snapshot):
+        """Generate monthly or quarterly VAT per rate from the monthly tax summary"""
+        period = TAX_REPORT_PERIODS[self.report_type]
+        rows = snapshot.get_tax_by_period(period)
+        
+        self.progress_updated.emit(50)
+        
+        rates = {}
+        for row in rows:
+            rate = rates.setdefault(row['tax_rate'], {'taxable_amount': 0, 'tax_amount': 0})
+            rate['taxable_amount'] += row['taxable_amount']
+            rate['tax_amount'] += row['tax_amount']
+        
+        self.progress_updated.emit(80)
+        
+        return {
+            'type': 'tax',
+            'period': period,
+            'summary': {
+                'period_count': len({row['period'] for row in rows}),
+                'total_taxable': sum(row['taxable_amount'] for row in rows),
+                'total_tax': sum(row['tax_amount'] for row in rows),
+                'rates': [{'tax_rate': tax_rate, **totals} for tax_rate, totals in sorted(rates.items())]
+            },
+            'rows': rows
+        }
+
+class ReportExportThread(QThread):
+    """Thread for streaming a report into a file without blocking UI"""
+    
+    progress_updated = pyqtSignal(int)
+    export_finished = pyqtSignal(bool, str)
+    
+    def __init__(self, db_service, report_type, start_date, end_date, file_path, file_format, persian_digits):
+        super().__init__()
+        self.db_service = db_service
+        self.report_type = report_type
+        self.start_date = start_date
+        self.end_date = end_date
+        self.file_path = file_path
+        self.file_format = file_format
+        self.persian_digits = persian_digits
+    
+    def run(self):
+        """Export report in background"""
+        try:
+            rows = export_report(
+                self.db_service, self.report_type, self.start_date, self.end_date,
+                self.file_path, self.file_format, self.persian_digits, self.progress_updated.emit
+            )
+            self.export_finished.emit(True, f"{rows:,} ردیف در مسیر زیر ذخیره شد:\n{self.file_path}")
+        except Exception as e:
+            self.export_finished.emit(False, f"خطا در ذخیره فایل: {str(e)}")
+
 class ReportsView(QWidget):
     """Enhanced reports view with comprehensive reporting"""
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
         self.report_thread = None
+        self.export_thread = None
         self.current_report_data = None
+        self.report_request = None
         self.setup_ui()
-        self.setup_styling()
         
     def setup_ui(self):
         """Setup the reports user interface"""
@@ -178,7 +274,7 @@ class ReportsView(QWidget):
         # Header
         header_label = QLabel("گزارشات و آمار")
         header_label.setFont(QFont("Vazirmatn", 16, QFont.Weight.Bold))
-        header_label.setStyleSheet("color: #2c3e50; margin-bottom: 15px;")
+        header_label.setProperty("class", "title")
         header_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Controls section
@@ -191,7 +287,13 @@ class ReportsView(QWidget):
         self.report_type_combo.addItems([
             "گزارش فروش",
             "گزارش کالاها", 
-            "گزارش مشتریان"
+            "گزارش مشتریان",
+            "گزارش گردش موجودی",
+            "گزارش ماهانه فروش",
+            "گزارش فصلی فروش",
+            "گزارش سالانه فروش",
+            "گزارش ماهانه مالیات",
+            "گزارش فصلی مالیات"
         ])
         self.report_type_combo.setFont(QFont("Vazirmatn", 11))
         
@@ -213,11 +315,14 @@ class ReportsView(QWidget):
         self.generate_button.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
         self.generate_button.clicked.connect(self.generate_report)
         
-        self.export_button = QPushButton("خروجی اکسل")
+        self.export_button = QPushButton("خروجی گزارش")
         self.export_button.setFont(QFont("Vazirmatn", 11, QFont.Weight.Bold))
         self.export_button.clicked.connect(self.export_report)
         self.export_button.setEnabled(False)
         
+        self.persian_digits_check = QCheckBox("ارقام فارسی در خروجی")
+        self.persian_digits_check.setToolTip("تاریخ‌ها و متن‌ها با ارقام فارسی نوشته می‌شوند؛ مبالغ عددی می‌مانند")
+        
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -231,7 +336,8 @@ class ReportsView(QWidget):
         controls_layout.addWidget(self.end_date_edit, 0, 5)
         controls_layout.addWidget(self.generate_button, 1, 0, 1, 2)
         controls_layout.addWidget(self.export_button, 1, 2, 1, 2)
-        controls_layout.addWidget(self.progress_bar, 1, 4, 1, 2)
+        controls_layout.addWidget(self.persian_digits_check, 1, 4)
+        controls_layout.addWidget(self.progress_bar, 1, 5)
         
         # Results section
         results_splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -268,133 +374,6 @@ class ReportsView(QWidget):
         
         self.setLayout(main_layout)
         
-    def setup_styling(self):
-        """Setup modern styling"""
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-            
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #dee2e6;
-                border-radius: 12px;
-                margin: 10px 0px;
-                padding-top: 15px;
-                background-color: white;
-            }
-            
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 8px 0 8px;
-                color: #495057;
-                background-color: white;
-            }
-            
-            QComboBox, QDateEdit {
-                border: 2px solid #dee2e6;
-                border-radius: 6px;
-                padding: 8px;
-                font-size: 11pt;
-                background-color: white;
-                min-height: 20px;
-            }
-            
-            QComboBox:focus, QDateEdit:focus {
-                border-color: #4CAF50;
-            }
-            
-            QComboBox::drop-down {
-                border: none;
-                width: 20px;
-            }
-            
-            QComboBox::down-arrow {
-                image: url(down-arrow.png);
-                width: 12px;
-                height: 12px;
-            }
-            
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 20px;
-                font-size: 11pt;
-                font-weight: bold;
-                min-width: 100px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #45a049, stop:1 #3d8b40);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3d8b40, stop:1 #2e7d32);
-            }
-            
-            QPushButton:disabled {
-                background: #cccccc;
-                color: #666666;
-            }
-            
-            QTableWidget {
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                background-color: white;
-                gridline-color: #f1f3f4;
-                font-size: 10pt;
-            }
-            
-            QTableWidget::item {
-                padding: 10px 8px;
-                border: none;
-            }
-            
-            QTableWidget::item:selected {
-                background-color: #e3f2fd;
-                color: #1976d2;
-            }
-            
-            QTableWidget::item:alternate {
-                background-color: #f8f9fa;
-            }
-            
-            QHeaderView::section {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f8f9fa, stop:1 #e9ecef);
-                padding: 12px 8px;
-                border: 1px solid #dee2e6;
-                font-weight: bold;
-                color: #495057;
-            }
-            
-            QTextEdit {
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-                background-color: white;
-                padding: 10px;
-            }
-            
-            QProgressBar {
-                border: 2px solid #dee2e6;
-                border-radius: 5px;
-                background-color: #f8f9fa;
-                text-align: center;
-            }
-            
-            QProgressBar::chunk {
-                background-color: #4CAF50;
-                border-radius: 3px;
-            }
-        """)
-    
     def generate_report(self):
         """Generate selected report"""
         if self.report_thread and self.report_thread.isRunning():
@@ -404,12 +383,18 @@ class ReportsView(QWidget):
         report_type_map = {
             "گزارش فروش": "sales",
             "گزارش کالاها": "products",
-            "گزارش مشتریان": "customers"
+            "گزارش مشتریان": "customers",
+            "گزارش گردش موجودی": "stock",
+            "گزارش ماهانه فروش": "monthly",
+            "گزارش فصلی فروش": "quarterly",
+            "گزارش سالانه فروش": "yearly",
+            "گزارش ماهانه مالیات": "tax_monthly",
+            "گزارش فصلی مالیات": "tax_quarterly"
         }
         
         report_type = report_type_map[self.report_type_combo.currentText()]
-        start_date = self.start_date_edit.date().toPython()
-        end_date = self.end_date_edit.date().toPython()
+        start_date = self.start_date_edit.date().toPyDate()
+        end_date = self.end_date_edit.date().toPyDate()
         
         # Validate date range
         if start_date > end_date:
@@ -433,6 +418,9 @@ class ReportsView(QWidget):
     def on_report_ready(self, report_data):
         """Handle completed report"""
         self.current_report_data = report_data
+        self.report_request = (
+            self.report_thread.report_type, self.report_thread.start_date, self.report_thread.end_date
+        )
         self.display_report(report_data)
         
         # Hide progress and enable buttons
@@ -459,6 +447,12 @@ class ReportsView(QWidget):
             self.display_products_report(report_data)
         elif report_type == 'customers':
             self.display_customers_report(report_data)
+        elif report_type == 'stock':
+            self.display_stock_report(report_data)
+        elif report_type == 'periods':
+            self.display_period_report(report_data)
+        elif report_type == 'tax':
+            self.display_tax_report(report_data)
     
     def display_sales_report(self, report_data):
         """Display sales report"""
@@ -487,15 +481,14 @@ class ReportsView(QWidget):
         
         for row, invoice in enumerate(invoices):
             # Convert to Persian date
-            jdate = jdatetime.datetime.fromgregorian(datetime=invoice.issue_date)
-            persian_date = jdate.strftime('%Y/%m/%d')
+            persian_date = jalali_date(invoice.issue_date)
             
             items = [
                 invoice.invoice_number,
                 invoice.customer_name,
                 persian_date,
-                f"{invoice.final_amount:,} تومان",
-                f"{invoice.discount_amount:,} تومان"
+                format_amount(invoice.final_amount),
+                format_amount(invoice.discount_amount)
             ]
             
             for col, item in enumerate(items):
@@ -535,10 +528,10 @@ class ReportsView(QWidget):
             
             items = [
                 product.name,
-                f"{product.purchase_price:,} تومان",
-                f"{product.sale_price:,} تومان",
+                format_amount(product.purchase_price),
+                format_amount(product.sale_price),
                 f"{product.stock_quantity:,}",
-                f"{stock_value:,} تومان"
+                format_amount(stock_value)
             ]
             
             for col, item in enumerate(items):
@@ -546,11 +539,11 @@ class ReportsView(QWidget):
                 table_item.setFlags(table_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 
                 # Color code low stock
-                if col == 3 and product.stock_quantity <= 5:
+                if col == 3 and product.is_low_stock:
                     if product.stock_quantity == 0:
-                        table_item.setBackground(QFont().defaultFamily())  # Red
+                        table_item.setBackground(QColor("#f8d7da"))  # Red
                     else:
-                        table_item.setBackground(QFont().defaultFamily())  # Orange
+                        table_item.setBackground(QColor("#ffe5b4"))  # Orange
                 
                 self.report_table.setItem(row, col, table_item)
         
@@ -584,13 +577,12 @@ class ReportsView(QWidget):
         
         for row, (customer_name, data) in enumerate(customers_data.items()):
             # Convert to Persian date
-            jdate = jdatetime.datetime.fromgregorian(datetime=data['last_purchase'])
-            persian_date = jdate.strftime('%Y/%m/%d')
+            persian_date = jalali_date(data['last_purchase'])
             
             items = [
                 customer_name,
                 str(data['invoice_count']),
-                f"{data['total_amount']:,} تومان",
+                format_amount(data['total_amount']),
                 data['phone'] or "ندارد",
                 persian_date
             ]
@@ -604,127 +596,196 @@ class ReportsView(QWidget):
         header = self.report_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
     
+    def display_stock_report(self, report_data):
+        """Display stock movements report"""
+        summary = report_data['summary']
+        
+        # Update summary
+        summary_text = f"""
+🔄 خلاصه گزارش گردش موجودی
+
+📋 تعداد گردش‌ها: {summary['total_movements']:,}
+📥 مجموع ورودی: {summary['total_in']:,}
+📤 مجموع خروجی: {summary['total_out']:,}
+
+📅 بازه زمانی: {self.start_date_edit.date().toString('yyyy/MM/dd')} تا {self.end_date_edit.date().toString('yyyy/MM/dd')}
+        """
+        self.summary_text.setText(summary_text.strip())
+        
+        # Update table
+        movements = report_data['movements']
+        self.report_table.setColumnCount(6)
+        self.report_table.setHorizontalHeaderLabels([
+            "تاریخ", "نام کالا", "نوع گردش", "تعداد", "موجودی پس از گردش", "سند مرجع"
+        ])
+        self.report_table.setRowCount(len(movements))
+        
+        for row, movement in enumerate(movements):
+            items = [
+                jalali_date(movement['date'], with_time=True),
+                movement['product_name'],
+                movement['type_label'],
+                f"{movement['quantity']:+,}",
+                f"{movement['balance_after']:,}",
+                movement['reference']
+            ]
+            
+            for col, item in enumerate(items):
+                table_item = QTableWidgetItem(str(item))
+                table_item.setFlags(table_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.report_table.setItem(row, col, table_item)
+        
+        # Resize columns
+        header = self.report_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    
+    def display_period_report(self, report_data):
+        """Display monthly, quarterly or yearly sales report"""
+        summary = report_data['summary']
+        period_label = PERIOD_LABELS[report_data['period']]
+        
+        # Update summary
+        summary_text = f"""
+📆 خلاصه گزارش دوره‌ای فروش
+
+🗂️ تعداد دوره‌ها: {summary['period_count']:,}
+🧾 تعداد کل فاکتورها: {summary['total_invoices']:,}
+💰 مجموع درآمد: {summary['total_revenue']:,} تومان
+🎯 مجموع تخفیفات: {summary['total_discount']:,} تومان
+📦 تعداد اقلام فروخته‌شده: {summary['total_items']:,}
+📈 میانگین درآمد هر {period_label}: {summary['average_period']:,} تومان
+
+📅 بازه زمانی: {self.start_date_edit.date().toString('yyyy/MM/dd')} تا {self.end_date_edit.date().toString('yyyy/MM/dd')}
+        """
+        self.summary_text.setText(summary_text.strip())
+        
+        # Update table
+        periods = report_data['periods']
+        self.report_table.setColumnCount(5)
+        self.report_table.setHorizontalHeaderLabels([
+            period_label, "تعداد فاکتور", "درآمد", "تخفیف", "اقلام فروخته‌شده"
+        ])
+        self.report_table.setRowCount(len(periods))
+        
+        for row, period in enumerate(periods):
+            items = [
+                period['period'],
+                f"{period['invoice_count']:,}",
+                format_amount(period['revenue']),
+                format_amount(period['discount']),
+                f"{period['items_sold']:,}"
+            ]
+            
+            for col, item in enumerate(items):
+                table_item = QTableWidgetItem(str(item))
+                table_item.setFlags(table_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.report_table.setItem(row, col, table_item)
+        
+        # Resize columns
+        header = self.report_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    
+    def display_tax_report(self, report_data):
+        """Display monthly or quarterly VAT report"""
+        summary = report_data['summary']
+        period_label = PERIOD_LABELS[report_data['period']]
+        
+        rate_lines = "\n".join(
+            f"   {rate['tax_rate'] / 100:g}٪: {rate['tax_amount']:,} تومان از {rate['taxable_amount']:,} تومان"
+            for rate in summary['rates']
+        )
+        
+        # Update summary
+        summary_text = f"""
+🧾 خلاصه گزارش مالیات بر ارزش افزوده
+
+🗂️ تعداد دوره‌ها: {summary['period_count']:,}
+💰 مجموع مبلغ مشمول مالیات: {summary['total_taxable']:,} تومان
+🏛️ مجموع مالیات: {summary['total_tax']:,} تومان
+📊 به تفکیک نرخ:
+{rate_lines}
+
+📅 بازه زمانی (ماه‌های کامل): {self.start_date_edit.date().toString('yyyy/MM/dd')} تا {self.end_date_edit.date().toString('yyyy/MM/dd')}
+        """
+        self.summary_text.setText(summary_text.strip())
+        
+        # Update table
+        rows = report_data['rows']
+        self.report_table.setColumnCount(5)
+        self.report_table.setHorizontalHeaderLabels([
+            period_label, "نرخ مالیات", "تعداد اقلام", "مبلغ مشمول مالیات", "مالیات"
+        ])
+        self.report_table.setRowCount(len(rows))
+        
+        for row, tax_row in enumerate(rows):
+            items = [
+                tax_row['period'],
+                f"{tax_row['tax_rate'] / 100:g}٪",
+                f"{tax_row['line_count']:,}",
+                format_amount(tax_row['taxable_amount']),
+                format_amount(tax_row['tax_amount'])
+            ]
+            
+            for col, item in enumerate(items):
+                table_item = QTableWidgetItem(str(item))
+                table_item.setFlags(table_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.report_table.setItem(row, col, table_item)
+        
+        # Resize columns
+        header = self.report_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    
     def export_report(self):
-        """Export report to Excel"""
+        """Export the current report to a file in a worker thread"""
         if not self.current_report_data:
             QMessageBox.warning(self, "خطا", "لطفاً ابتدا گزارشی تولید کنید")
             return
+        if self.export_thread and self.export_thread.isRunning():
+            return
         
-        # Get save path
-        file_path, _ = QFileDialog.getSaveFileName(
+        # One filter per installed export format; the first is the default
+        filters = [f"{EXPORT_FORMATS[name][0]} (*.{name})" for name in available_formats()]
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             "ذخیره گزارش",
             f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            "Excel Files (*.xlsx)"
+            ";;".join(filters)
         )
         
         if not file_path:
             return
         
-        try:
-            self.save_excel_report(file_path)
-            QMessageBox.information(self, "موفقیت", f"گزارش در مسیر زیر ذخیره شد:\\n{file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "خطا", f"خطا در ذخیره فایل: {str(e)}")
-    
-    def save_excel_report(self, file_path):
-        """Save report to Excel file"""
-        try:
-            import pandas as pd
-            
-            # Create Excel writer
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                report_type = self.current_report_data['type']
-                
-                if report_type == 'sales':
-                    self.save_sales_excel(writer)
-                elif report_type == 'products':
-                    self.save_products_excel(writer)
-                elif report_type == 'customers':
-                    self.save_customers_excel(writer)
-                    
-        except ImportError:
-            # Fallback to simple CSV if pandas not available
-            self.save_csv_report(file_path.replace('.xlsx', '.csv'))
-    
-    def save_sales_excel(self, writer):
-        """Save sales report to Excel"""
-        import pandas as pd
-        
-        invoices = self.current_report_data['invoices']
-        
-        # Prepare data
-        data = []
-        for invoice in invoices:
-            jdate = jdatetime.datetime.fromgregorian(datetime=invoice.issue_date)
-            data.append({
-                'شماره فاکتور': invoice.invoice_number,
-                'نام مشتری': invoice.customer_name,
-                'تاریخ': jdate.strftime('%Y/%m/%d'),
-                'مبلغ نهایی': invoice.final_amount,
-                'تخفیف': invoice.discount_amount
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name='گزارش فروش', index=False)
-    
-    def save_products_excel(self, writer):
-        """Save products report to Excel"""
-        import pandas as pd
-        
-        products = self.current_report_data['products']
-        
-        # Prepare data
-        data = []
-        for product in products:
-            data.append({
-                'نام کالا': product.name,
-                'قیمت خرید': product.purchase_price,
-                'قیمت فروش': product.sale_price,
-                'موجودی': product.stock_quantity,
-                'ارزش موجودی': product.stock_quantity * product.sale_price
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name='گزارش کالاها', index=False)
+        file_format = format_of(file_path)
+        if file_format not in EXPORT_FORMATS:
+            file_format = available_formats()[filters.index(selected_filter)] if selected_filter in filters else 'xlsx'
+            file_path = f"{file_path}.{file_format}"
+        
+        self.export_button.setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setFormat("")
+        self.progress_bar.setVisible(True)
+        
+        report_type, start_date, end_date = self.report_request
+        self.export_thread = ReportExportThread(
+            self.db_service, report_type, start_date, end_date, file_path, file_format,
+            self.persian_digits_check.isChecked()
+        )
+        self.export_thread.progress_updated.connect(self.on_export_progress)
+        self.export_thread.export_finished.connect(self.on_export_finished)
+        self.export_thread.start()
     
-    def save_customers_excel(self, writer):
-        """Save customers report to Excel"""
-        import pandas as pd
-        
-        customers_data = self.current_report_data['customers_data']
-        
-        # Prepare data
-        data = []
-        for customer_name, customer_data in customers_data.items():
-            jdate = jdatetime.datetime.fromgregorian(datetime=customer_data['last_purchase'])
-            data.append({
-                'نام مشتری': customer_name,
-                'تعداد فاکتور': customer_data['invoice_count'],
-                'مجموع خرید': customer_data['total_amount'],
-                'شماره تماس': customer_data['phone'] or '',
-                'آخرین خرید': jdate.strftime('%Y/%m/%d')
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name='گزارش مشتریان', index=False)
+    def on_export_progress(self, rows):
+        """Show the number of rows exported so far"""
+        self.progress_bar.setFormat(f"{rows:,} ردیف")
     
-    def save_csv_report(self, file_path):
-        """Save report as CSV (fallback)"""
-        # Simple CSV export without pandas
-        import csv
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            if self.current_report_data['type'] == 'sales':
-                writer = csv.writer(csvfile)
-                writer.writerow(['شماره فاکتور', 'نام مشتری', 'تاریخ', 'مبلغ نهایی', 'تخفیف'])
-                
-                for invoice in self.current_report_data['invoices']:
-                    jdate = jdatetime.datetime.fromgregorian(datetime=invoice.issue_date)
-                    writer.writerow([
-                        invoice.invoice_number,
-                        invoice.customer_name,
-                        jdate.strftime('%Y/%m/%d'),
-                        invoice.final_amount,
-                        invoice.discount_amount
-                    ])
\ No newline at end of file
+    def on_export_finished(self, success, message):
+        """Report the export result and restore the controls"""
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setVisible(False)
+        self.export_button.setEnabled(True)
+        
+        if success:
+            QMessageBox.information(self, "موفقیت", message)
+        else:
+            QMessageBox.critical(self, "خطا", message)
@@ -4,20 +4,105 @@ Enhanced settings management with user preferences
 """
 
 import os
+from datetime import datetime
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QLabel, QLineEdit, QPushButton, QTabWidget, 
                            QGroupBox, QCheckBox, QSpinBox, QComboBox,
                            QTextEdit, QFileDialog, QMessageBox, QFrame,
-                           QColorDialog, QFontDialog, QSlider)
-from PyQt6.QtCore import Qt, pyqtSignal
+                           QColorDialog, QFontDialog, QSlider, QProgressBar)
+from PyQt6.QtCore import Qt, pyqtSignal, QThread
 from PyQt6.QtGui import QFont, QColor, QPalette
-from services.database_service import DatabaseService
+from services.database_service import get_database_service
+from services.settings_store import default_settings
+from services.auth_service import MIN_ROUNDS, MAX_ROUNDS
+from services.maintenance_service import MaintenanceService
+from services.archive_service import ArchiveService
+from services.sales_summary import SalesSummaryService
+from services.tax_summary import TaxSummaryService
+from services.jalali_calendar import JalaliCalendar
+
+def set_combo_data(combo, value):
+    """Select the combo item whose data equals value"""
+    index = combo.findData(value)
+    if index >= 0:
+        combo.setCurrentIndex(index)
+
+def format_size(size):
+    """Format a byte count in megabytes"""
+    return f"{size / (1024 * 1024):.2f} مگابایت"
+
+def format_database_stats(stats):
+    """Describe database page statistics"""
+    free_ratio = stats['freelist_count'] * 100 / stats['page_count'] if stats['page_count'] else 0
+    return (
+        f"اندازه فایل: {format_size(stats['file_size'])} "
+        f"(WAL: {format_size(stats['wal_size'])})\n"
+        f"صفحات: {stats['page_count']:,} × {stats['page_size']:,} بایت، "
+        f"صفحات خالی: {stats['freelist_count']:,} ({free_ratio:.1f}%)"
+    )
+
+def format_stats_report(message, before, after):
+    """Result message with whichever page statistics a maintenance run returned"""
+    parts = [message]
+    if before:
+        parts.append(f"قبل:\n{format_database_stats(before)}")
+    if after:
+        parts.append(f"بعد:\n{format_database_stats(after)}")
+    if before and after:
+        parts.append(
+            f"صفحات خالی از {before['freelist_count']:,} به {after['freelist_count']:,} رسید؛ "
+            f"اندازه فایل از {format_size(before['file_size'])} به {format_size(after['file_size'])}"
+        )
+    return "\n\n".join(parts)
+
+class MaintenanceWorker(QThread):
+    """Thread for running database maintenance without blocking UI"""
+    
+    progress = pyqtSignal(int, str)
+    maintenance_finished = pyqtSignal(bool, str, object, object)
+    
+    def __init__(self, db_path, operation, keep_years=None):
+        super().__init__()
+        self.db_path = db_path
+        self.operation = operation
+        self.keep_years = keep_years
+        
+    def run(self):
+        """Run the requested maintenance operation"""
+        maintenance_service = MaintenanceService(self.db_path)
+        if self.operation == 'repair':
+            result = maintenance_service.repair(self.progress.emit)
+        elif self.operation == 'archive':
+            before = maintenance_service.database_stats()
+            archive_service = ArchiveService(self.db_path)
+            try:
+                success, message = archive_service.archive_old_years(self.keep_years, self.progress.emit)
+            finally:
+                archive_service.engine.dispose()
+            result = (success, message, before, maintenance_service.current_stats())
+        elif self.operation == 'rebuild_summary':
+            before = maintenance_service.database_stats()
+            archive_service = ArchiveService(self.db_path)
+            try:
+                sales_summary = SalesSummaryService(archive_service, JalaliCalendar(archive_service.engine))
+                success, message = sales_summary.rebuild(self.progress.emit)
+                if success:
+                    success, tax_message = TaxSummaryService(archive_service).rebuild(self.progress.emit)
+                    message = f"{message}\n{tax_message}"
+            finally:
+                archive_service.engine.dispose()
+            result = (success, message, before, maintenance_service.current_stats())
+        else:
+            result = maintenance_service.optimize(self.progress.emit)
+        self.maintenance_finished.emit(*result)
 
 class AppearanceTab(QFrame):
     """Appearance settings tab"""
     
     def __init__(self):
         super().__init__()
+        self.selected_font = QFont("Vazirmatn", 11)
+        self.selected_color = QColor("#4CAF50")
         self.setup_ui()
         
     def setup_ui(self):
@@ -38,7 +123,8 @@ class AppearanceTab(QFrame):
         # Theme selection
         theme_label = QLabel("تم رنگی:")
         self.theme_combo = QComboBox()
-        self.theme_combo.addItems(["تیره", "روشن", "آبی", "سبز"])
+        for text, theme in [("تیره", "dark"), ("روشن", "light"), ("آبی", "blue"), ("سبز", "green")]:
+            self.theme_combo.addItem(text, theme)
         
         # Color customization
         primary_color_label = QLabel("رنگ اصلی:")
@@ -50,7 +136,8 @@ class AppearanceTab(QFrame):
         # Language settings
         lang_label = QLabel("زبان رابط:")
         self.lang_combo = QComboBox()
-        self.lang_combo.addItems(["فارسی", "English"])
+        self.lang_combo.addItem("فارسی", "fa")
+        self.lang_combo.addItem("English", "en")
         
         theme_layout.addWidget(font_label, 0, 0)
         theme_layout.addWidget(self.font_button, 0, 1)
@@ -84,30 +171,67 @@ class AppearanceTab(QFrame):
         
     def select_font(self):
         """Select application font"""
-        current_font = QFont("Vazirmatn", 11)
-        font, ok = QFontDialog.getFont(current_font, self)
+        font, ok = QFontDialog.getFont(self.selected_font, self)
         
         if ok:
-            self.current_font_label.setText(f"{font.family()}, {font.pointSize()}pt")
-            self.selected_font = font
+            self.set_font(font)
+            
+    def set_font(self, font):
+        """Show font as the selected application font"""
+        self.current_font_label.setText(f"{font.family()}, {font.pointSize()}pt")
+        self.selected_font = font
             
     def select_primary_color(self):
         """Select primary color"""
-        color = QColorDialog.getColor(QColor("#4CAF50"), self)
+        color = QColorDialog.getColor(self.selected_color, self)
         
         if color.isValid():
-            self.primary_color_button.setStyleSheet(
-                f"background-color: {color.name()}; border-radius: 4px;"
-            )
-            self.selected_color = color
+            self.set_primary_color(color)
+            
+    def set_primary_color(self, color):
+        """Show color as the selected primary color"""
+        self.primary_color_button.setStyleSheet(
+            f"background-color: {color.name()}; border-radius: 4px;"
+        )
+        self.selected_color = color
+            
+    def load_settings(self, settings):
+        """Fill widgets from a settings dict"""
+        self.set_font(QFont(settings['appearance.font_family'], settings['appearance.font_size']))
+        set_combo_data(self.theme_combo, settings['appearance.theme'])
+        self.set_primary_color(QColor(settings['appearance.primary_color']))
+        set_combo_data(self.lang_combo, settings['appearance.language'])
+        self.remember_size_check.setChecked(settings['window.remember_size'])
+        self.remember_position_check.setChecked(settings['window.remember_position'])
+        self.maximize_startup_check.setChecked(settings['window.maximize_startup'])
+        self.show_statusbar_check.setChecked(settings['window.show_statusbar'])
+        
+    def get_settings(self):
+        """Collect widget values as a settings dict"""
+        return {
+            'appearance.font_family': self.selected_font.family(),
+            'appearance.font_size': self.selected_font.pointSize(),
+            'appearance.theme': self.theme_combo.currentData(),
+            'appearance.primary_color': self.selected_color.name(),
+            'appearance.language': self.lang_combo.currentData(),
+            'window.remember_size': self.remember_size_check.isChecked(),
+            'window.remember_position': self.remember_position_check.isChecked(),
+            'window.maximize_startup': self.maximize_startup_check.isChecked(),
+            'window.show_statusbar': self.show_statusbar_check.isChecked(),
+        }
 
 class DatabaseTab(QFrame):
     """Database settings tab"""
     
-    def __init__(self):
+    def __init__(self, backup_scheduler):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
+        self.backup_scheduler = backup_scheduler
+        self.backup_pending = False
+        self.maintenance_worker = None
         self.setup_ui()
+        self.backup_scheduler.status_changed.connect(self.on_backup_status)
+        self.backup_scheduler.backup_finished.connect(self.on_backup_finished)
         
     def setup_ui(self):
         """Setup database settings UI"""
@@ -140,6 +264,12 @@ class DatabaseTab(QFrame):
         self.max_backups_spin.setValue(10)
         self.max_backups_spin.setSuffix(" فایل")
         
+        # Compression
+        compression_label = QLabel("فشرده‌سازی:")
+        self.compression_combo = QComboBox()
+        for text, compression in [("بدون فشرده‌سازی", "none"), ("gzip", "gzip"), ("zstd", "zstd")]:
+            self.compression_combo.addItem(text, compression)
+        
         backup_layout.addWidget(self.auto_backup_check, 0, 0, 1, 2)
         backup_layout.addWidget(backup_interval_label, 1, 0)
         backup_layout.addWidget(self.backup_interval_spin, 1, 1)
@@ -148,6 +278,8 @@ class DatabaseTab(QFrame):
         backup_layout.addWidget(self.backup_location_button, 2, 2)
         backup_layout.addWidget(max_backups_label, 3, 0)
         backup_layout.addWidget(self.max_backups_spin, 3, 1)
+        backup_layout.addWidget(compression_label, 4, 0)
+        backup_layout.addWidget(self.compression_combo, 4, 1)
         
         # Database maintenance
         maintenance_group = QGroupBox("نگهداری دیتابیس")
@@ -169,14 +301,41 @@ class DatabaseTab(QFrame):
         buttons_layout.addWidget(self.optimize_button)
         buttons_layout.addWidget(self.repair_button)
         
+        self.rebuild_summary_button = QPushButton("بازسازی خلاصه فروش")
+        self.rebuild_summary_button.setToolTip("محاسبه دوباره جمع فروش روزانه و مالیات ماهانه از روی همه فاکتورها")
+        self.rebuild_summary_button.clicked.connect(self.rebuild_sales_summary)
+        buttons_layout.addWidget(self.rebuild_summary_button)
+        
+        # Archiving of old fiscal years
+        archive_layout = QHBoxLayout()
+        
+        archive_label = QLabel("نگه‌داشتن سال‌های مالی اخیر:")
+        self.archive_keep_spin = QSpinBox()
+        self.archive_keep_spin.setRange(1, 20)
+        self.archive_keep_spin.setValue(2)
+        self.archive_keep_spin.setSuffix(" سال")
+        
+        self.archive_button = QPushButton("بایگانی سال‌های قدیمی")
+        self.archive_button.clicked.connect(self.archive_old_invoices)
+        
+        archive_layout.addWidget(archive_label)
+        archive_layout.addWidget(self.archive_keep_spin)
+        archive_layout.addWidget(self.archive_button)
+        
+        # Maintenance progress
+        self.maintenance_progress = QProgressBar()
+        self.maintenance_progress.setVisible(False)
+        
         # Database info
         info_label = QLabel("اطلاعات دیتابیس:")
         self.db_info_text = QTextEdit()
-        self.db_info_text.setMaximumHeight(100)
+        self.db_info_text.setMaximumHeight(140)
         self.db_info_text.setReadOnly(True)
         self.load_database_info()
         
         maintenance_layout.addLayout(buttons_layout)
+        maintenance_layout.addLayout(archive_layout)
+        maintenance_layout.addWidget(self.maintenance_progress)
         maintenance_layout.addWidget(info_label)
         maintenance_layout.addWidget(self.db_info_text)
         
@@ -196,21 +355,43 @@ class DatabaseTab(QFrame):
             self.backup_location_edit.setText(directory)
     
     def backup_now(self):
-        """Create immediate backup"""
-        try:
-            self.backup_now_button.setText("در حال پشتیبان‌گیری...")
-            self.backup_now_button.setEnabled(False)
-            
-            success, message = self.db_service.backup_database()
+        """Create an immediate backup through the backup scheduler"""
+        # The scheduler runs one backup at a time and remembers what it backed up
+        if not self.backup_scheduler.backup_now():
+            QMessageBox.information(self, "پشتیبان‌گیری", "پشتیبان‌گیری در حال انجام است")
+            return
+        
+        self.backup_pending = True
+        self.backup_now_button.setText("در حال پشتیبان‌گیری...")
+        self.backup_now_button.setEnabled(False)
+        
+    def on_backup_status(self, text):
+        """Show the progress of the backup started here"""
+        if self.backup_pending and "%" in text:
+            self.backup_now_button.setText(text.replace("💾 ", ""))
+        
+    def on_backup_finished(self, success, message):
+        """Show the result of the backup started here"""
+        if not self.backup_pending:
+            return
+        self.backup_pending = False
+        self.backup_now_button.setText("پشتیبان فوری")
+        self.backup_now_button.setEnabled(True)
+        
+        if success:
+            QMessageBox.information(self, "موفقیت", message)
+        else:
+            QMessageBox.critical(self, "خطا", message)
             
-            if success:
-                QMessageBox.information(self, "موفقیت", message)
-            else:
-                QMessageBox.critical(self, "خطا", message)
-                
-        finally:
-            self.backup_now_button.setText("پشتیبان فوری")
-            self.backup_now_button.setEnabled(True)
+    def release(self):
+        """Wait for a running maintenance task and stop following the backup scheduler
+        
+        A backup started here keeps running in the scheduler; the main window reports it.
+        """
+        if self.maintenance_worker is not None:
+            self.maintenance_worker.wait()
+        self.backup_scheduler.status_changed.disconnect(self.on_backup_status)
+        self.backup_scheduler.backup_finished.disconnect(self.on_backup_finished)
     
     def optimize_database(self):
         """Optimize database"""
@@ -219,8 +400,7 @@ class DatabaseTab(QFrame):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            # Implement database optimization
-            QMessageBox.information(self, "موفقیت", "دیتابیس با موفقیت بهینه‌سازی شد")
+            self.start_maintenance('optimize')
     
     def repair_database(self):
         """Repair database"""
@@ -229,22 +409,71 @@ class DatabaseTab(QFrame):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            # Implement database repair
-            QMessageBox.information(self, "موفقیت", "دیتابیس با موفقیت تعمیر شد")
+            self.start_maintenance('repair')
+            
+    def archive_old_invoices(self):
+        """Move invoices of old fiscal years into yearly archive files"""
+        reply = QMessageBox.question(
+            self, "تأیید",
+            f"فاکتورهای قدیمی‌تر از {self.archive_keep_spin.value()} سال مالی اخیر به فایل‌های بایگانی منتقل شوند؟"
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            self.start_maintenance('archive')
+            
+    def rebuild_sales_summary(self):
+        """Recompute daily sales and monthly tax totals from all invoices"""
+        self.start_maintenance('rebuild_summary')
+            
+    def start_maintenance(self, operation):
+        """Run a maintenance operation in a worker thread"""
+        self.optimize_button.setEnabled(False)
+        self.repair_button.setEnabled(False)
+        self.archive_button.setEnabled(False)
+        self.rebuild_summary_button.setEnabled(False)
+        self.maintenance_progress.setValue(0)
+        self.maintenance_progress.setVisible(True)
+        
+        self.maintenance_worker = MaintenanceWorker(
+            self.db_service.db_path, operation, self.archive_keep_spin.value()
+        )
+        self.maintenance_worker.progress.connect(self.on_maintenance_progress)
+        self.maintenance_worker.maintenance_finished.connect(self.on_maintenance_finished)
+        self.maintenance_worker.start()
+        
+    def on_maintenance_progress(self, percent, step):
+        """Show maintenance progress"""
+        self.maintenance_progress.setValue(percent)
+        self.maintenance_progress.setFormat(f"{step} - %p%")
+        
+    def on_maintenance_finished(self, success, message, before, after):
+        """Show maintenance result with before/after statistics"""
+        self.optimize_button.setEnabled(True)
+        self.repair_button.setEnabled(True)
+        self.archive_button.setEnabled(True)
+        self.rebuild_summary_button.setEnabled(True)
+        self.maintenance_progress.setVisible(False)
+        
+        # Statistics are shown after failures too; they tell how far a run got
+        self.db_info_text.setText(format_stats_report(message, before, after))
+        if success:
+            QMessageBox.information(self, "موفقیت", message)
+        else:
+            QMessageBox.critical(self, "خطا", message)
     
     def load_database_info(self):
         """Load database information"""
         try:
             # Get database file info
-            db_path = "invoicing.db"
+            db_path = self.db_service.db_path
             if os.path.exists(db_path):
-                size = os.path.getsize(db_path)
-                size_mb = size / (1024 * 1024)
+                stats = MaintenanceService(db_path).database_stats()
+                modified = datetime.fromtimestamp(os.path.getmtime(db_path))
                 
                 info_text = f"""
 مسیر دیتابیس: {os.path.abspath(db_path)}
-اندازه فایل: {size_mb:.2f} مگابایت
-تاریخ آخرین تغییر: {os.path.getmtime(db_path)}
+{format_database_stats(stats)}
+تاریخ آخرین تغییر: {modified.strftime('%Y/%m/%d %H:%M')}
                 """
             else:
                 info_text = "فایل دیتابیس یافت نشد"
@@ -253,6 +482,26 @@ class DatabaseTab(QFrame):
             
         except Exception as e:
             self.db_info_text.setText(f"خطا در خواندن اطلاعات: {str(e)}")
+            
+    def load_settings(self, settings):
+        """Fill widgets from a settings dict"""
+        self.auto_backup_check.setChecked(settings['database.auto_backup'])
+        self.backup_interval_spin.setValue(settings['database.backup_interval_days'])
+        self.backup_location_edit.setText(settings['database.backup_location'])
+        self.max_backups_spin.setValue(settings['database.max_backups'])
+        set_combo_data(self.compression_combo, settings['database.backup_compression'])
+        self.archive_keep_spin.setValue(settings['database.archive_keep_years'])
+        
+    def get_settings(self):
+        """Collect widget values as a settings dict"""
+        return {
+            'database.auto_backup': self.auto_backup_check.isChecked(),
+            'database.backup_interval_days': self.backup_interval_spin.value(),
+            'database.backup_location': self.backup_location_edit.text().strip(),
+            'database.max_backups': self.max_backups_spin.value(),
+            'database.backup_compression': self.compression_combo.currentData(),
+            'database.archive_keep_years': self.archive_keep_spin.value(),
+        }
 
 class PrintingTab(QFrame):
     """Printing settings tab"""
@@ -273,17 +522,20 @@ class PrintingTab(QFrame):
         # Default printer
         printer_label = QLabel("چاپگر پیش‌فرض:")
         self.printer_combo = QComboBox()
-        self.printer_combo.addItems(["سیستمی", "PDF", "خودکار"])
+        for text, printer in [("سیستمی", "system"), ("PDF", "pdf"), ("خودکار", "auto")]:
+            self.printer_combo.addItem(text, printer)
         
         # Paper size
         paper_label = QLabel("اندازه کاغذ:")
         self.paper_combo = QComboBox()
-        self.paper_combo.addItems(["A4", "A5", "Letter"])
+        for paper in ["A4", "A5", "Letter"]:
+            self.paper_combo.addItem(paper, paper)
         
         # Print quality
         quality_label = QLabel("کیفیت چاپ:")
         self.quality_combo = QComboBox()
-        self.quality_combo.addItems(["بالا", "متوسط", "پایین"])
+        for text, quality in [("بالا", "high"), ("متوسط", "medium"), ("پایین", "low")]:
+            self.quality_combo.addItem(text, quality)
         
         # Margins
         margin_label = QLabel("حاشیه (میلی‌متر):")
@@ -318,24 +570,68 @@ class PrintingTab(QFrame):
         self.footer_edit = QLineEdit()
         self.footer_edit.setPlaceholderText("با تشکر از خرید شما")
         
+        # Template file
+        template_file_label = QLabel("فایل قالب:")
+        self.template_path_edit = QLineEdit()
+        self.template_path_edit.setPlaceholderText("قالب پیش‌فرض")
+        self.template_path_button = QPushButton("انتخاب فایل")
+        self.template_path_button.clicked.connect(self.select_template_file)
+        
         template_layout.addWidget(self.show_logo_check, 0, 0, 1, 2)
         template_layout.addWidget(company_label, 1, 0)
         template_layout.addWidget(self.company_edit, 1, 1)
         template_layout.addWidget(footer_label, 2, 0)
         template_layout.addWidget(self.footer_edit, 2, 1)
+        template_layout.addWidget(template_file_label, 3, 0)
+        template_layout.addWidget(self.template_path_edit, 3, 1)
+        template_layout.addWidget(self.template_path_button, 3, 2)
         
         layout.addWidget(print_group)
         layout.addWidget(template_group)
         layout.addStretch()
         
         self.setLayout(layout)
+        
+    def select_template_file(self):
+        """Select invoice template file"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "انتخاب قالب فاکتور", self.template_path_edit.text() or "./templates/",
+            "Template Files (*.json *.yaml *.yml)"
+        )
+        
+        if file_path:
+            self.template_path_edit.setText(file_path)
+            
+    def load_settings(self, settings):
+        """Fill widgets from a settings dict"""
+        set_combo_data(self.printer_combo, settings['printing.printer'])
+        set_combo_data(self.paper_combo, settings['printing.paper_size'])
+        set_combo_data(self.quality_combo, settings['printing.quality'])
+        self.margin_spin.setValue(settings['printing.margin_mm'])
+        self.show_logo_check.setChecked(settings['printing.show_logo'])
+        self.company_edit.setPlainText(settings['printing.company_info'])
+        self.footer_edit.setText(settings['printing.footer_text'])
+        self.template_path_edit.setText(settings['printing.template_path'])
+        
+    def get_settings(self):
+        """Collect widget values as a settings dict"""
+        return {
+            'printing.printer': self.printer_combo.currentData(),
+            'printing.paper_size': self.paper_combo.currentData(),
+            'printing.quality': self.quality_combo.currentData(),
+            'printing.margin_mm': self.margin_spin.value(),
+            'printing.show_logo': self.show_logo_check.isChecked(),
+            'printing.company_info': self.company_edit.toPlainText().strip(),
+            'printing.footer_text': self.footer_edit.text().strip(),
+            'printing.template_path': self.template_path_edit.text().strip(),
+        }
 
 class SecurityTab(QFrame):
     """Security settings tab"""
     
     def __init__(self):
         super().__init__()
-        self.db_service = DatabaseService()
+        self.db_service = get_database_service()
         self.setup_ui()
         
     def setup_ui(self):
@@ -361,11 +657,19 @@ class SecurityTab(QFrame):
         # Auto lock
         self.auto_lock_check = QCheckBox("قفل خودکار برنامه")
         
+        # Password hashing cost; existing passwords are rehashed at their next login
+        rounds_label = QLabel("هزینه رمزنگاری رمز عبور:")
+        self.password_rounds_spin = QSpinBox()
+        self.password_rounds_spin.setRange(MIN_ROUNDS, MAX_ROUNDS)
+        self.password_rounds_spin.setToolTip("هر واحد افزایش، زمان بررسی رمز عبور را دو برابر می‌کند")
+        
         user_layout.addWidget(change_pass_label, 0, 0)
         user_layout.addWidget(self.change_pass_button, 0, 1)
         user_layout.addWidget(timeout_label, 1, 0)
         user_layout.addWidget(self.timeout_spin, 1, 1)
         user_layout.addWidget(self.auto_lock_check, 2, 0, 1, 2)
+        user_layout.addWidget(rounds_label, 3, 0)
+        user_layout.addWidget(self.password_rounds_spin, 3, 1)
         
         # Data security
         security_group = QGroupBox("امنیت اطلاعات")
@@ -428,16 +732,39 @@ class SecurityTab(QFrame):
         
         # TODO: Implement password change logic
         QMessageBox.information(self, "موفقیت", "رمز عبور با موفقیت تغییر کرد")
+        
+    def load_settings(self, settings):
+        """Fill widgets from a settings dict"""
+        self.timeout_spin.setValue(settings['security.session_timeout'])
+        self.auto_lock_check.setChecked(settings['security.auto_lock'])
+        self.encrypt_backup_check.setChecked(settings['security.encrypt_backups'])
+        self.secure_delete_check.setChecked(settings['security.secure_delete'])
+        self.audit_log_check.setChecked(settings['security.audit_log'])
+        self.retention_spin.setValue(settings['security.log_retention_days'])
+        self.password_rounds_spin.setValue(settings['security.password_rounds'])
+        
+    def get_settings(self):
+        """Collect widget values as a settings dict"""
+        return {
+            'security.session_timeout': self.timeout_spin.value(),
+            'security.auto_lock': self.auto_lock_check.isChecked(),
+            'security.encrypt_backups': self.encrypt_backup_check.isChecked(),
+            'security.secure_delete': self.secure_delete_check.isChecked(),
+            'security.audit_log': self.audit_log_check.isChecked(),
+            'security.log_retention_days': self.retention_spin.value(),
+            'security.password_rounds': self.password_rounds_spin.value(),
+        }
 
 class SettingsDialog(QDialog):
     """Enhanced settings dialog with tabbed interface"""
     
     settings_changed = pyqtSignal()
     
-    def __init__(self, parent=None):
+    def __init__(self, backup_scheduler, parent=None):
         super().__init__(parent)
+        self.backup_scheduler = backup_scheduler
+        self.settings_store = get_database_service().get_settings_store()
         self.setup_ui()
-        self.setup_styling()
         self.load_settings()
         
     def setup_ui(self):
@@ -455,14 +782,14 @@ class SettingsDialog(QDialog):
         header_label = QLabel("تنظیمات سیستم")
         header_label.setFont(QFont("Vazirmatn", 16, QFont.Weight.Bold))
         header_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        header_label.setStyleSheet("color: #2c3e50; margin-bottom: 15px;")
+        header_label.setProperty("class", "title")
         
         # Tab widget
         self.tab_widget = QTabWidget()
         
         # Create tabs
         self.appearance_tab = AppearanceTab()
-        self.database_tab = DatabaseTab()
+        self.database_tab = DatabaseTab(self.backup_scheduler)
         self.printing_tab = PrintingTab()
         self.security_tab = SecurityTab()
         
@@ -500,155 +827,39 @@ class SettingsDialog(QDialog):
         
         self.setLayout(layout)
         
-    def setup_styling(self):
-        """Setup dialog styling"""
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #f8f9fa;
-                font-family: 'Vazirmatn', Arial, sans-serif;
-            }
-            
-            QTabWidget::pane {
-                border: 2px solid #dee2e6;
-                border-radius: 8px;
-                background-color: white;
-                margin-top: 10px;
-            }
-            
-            QTabBar::tab {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f8f9fa, stop:1 #e9ecef);
-                border: 2px solid #dee2e6;
-                border-bottom: none;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-                min-width: 120px;
-                padding: 12px 15px;
-                margin: 2px;
-                color: #495057;
-                font-weight: bold;
-                font-size: 11pt;
-            }
-            
-            QTabBar::tab:selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border-color: #4CAF50;
-            }
-            
-            QTabBar::tab:hover:!selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #e3f2fd, stop:1 #bbdefb);
-                border-color: #2196F3;
-            }
-            
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #dee2e6;
-                border-radius: 8px;
-                margin: 15px 0px;
-                padding-top: 15px;
-                background-color: white;
-            }
-            
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 8px 0 8px;
-                color: #495057;
-                background-color: white;
-            }
-            
-            QLineEdit, QTextEdit, QComboBox, QSpinBox {
-                border: 2px solid #dee2e6;
-                border-radius: 6px;
-                padding: 8px;
-                font-size: 11pt;
-                background-color: white;
-            }
-            
-            QLineEdit:focus, QTextEdit:focus, QComboBox:focus, QSpinBox:focus {
-                border-color: #4CAF50;
-            }
-            
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                color: white;
-                border: none;
-                border-radius: 6px;
-                padding: 10px 15px;
-                font-size: 11pt;
-                font-weight: bold;
-                min-width: 80px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #45a049, stop:1 #3d8b40);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3d8b40, stop:1 #2e7d32);
-            }
-            
-            QCheckBox {
-                font-size: 11pt;
-                color: #495057;
-                spacing: 8px;
-            }
-            
-            QCheckBox::indicator {
-                width: 18px;
-                height: 18px;
-                border: 2px solid #dee2e6;
-                border-radius: 4px;
-                background-color: white;
-            }
-            
-            QCheckBox::indicator:checked {
-                background-color: #4CAF50;
-                border-color: #4CAF50;
-                image: url(checkmark.png);
-            }
-            
-            QLabel {
-                color: #495057;
-                font-size: 11pt;
-            }
-        """)
-        
-    def load_settings(self):
-        """Load current settings"""
-        # Load settings from database or config file
-        # This is a placeholder - implement actual settings loading
-        pass
+    def settings_tabs(self):
+        """Tabs that load and collect settings"""
+        return [self.appearance_tab, self.database_tab, self.printing_tab, self.security_tab]
+        
+    def load_settings(self, settings=None):
+        """Load current settings into every tab"""
+        if settings is None:
+            settings = self.settings_store.as_dict()
+        for tab in self.settings_tabs():
+            tab.load_settings(settings)
         
     def apply_settings(self):
         """Apply settings without closing dialog"""
-        self.save_settings()
-        self.settings_changed.emit()
-        QMessageBox.information(self, "موفقیت", "تنظیمات با موفقیت اعمال شد")
+        if self.save_settings():
+            self.settings_changed.emit()
+            QMessageBox.information(self, "موفقیت", "تنظیمات با موفقیت اعمال شد")
         
     def accept_settings(self):
         """Accept and save settings"""
-        self.save_settings()
-        self.settings_changed.emit()
-        self.accept()
+        if self.save_settings():
+            self.settings_changed.emit()
+            self.accept()
         
     def save_settings(self):
-        """Save settings to database or config file"""
-        # Implement actual settings saving
-        try:
-            # Save appearance settings
-            # Save database settings
-            # Save printing settings
-            # Save security settings
-            pass
-        except Exception as e:
-            QMessageBox.critical(self, "خطا", f"خطا در ذخیره تنظیمات: {str(e)}")
+        """Save all tabs in a single transaction"""
+        values = {}
+        for tab in self.settings_tabs():
+            values.update(tab.get_settings())
+        
+        success, message = self.settings_store.set_many(values)
+        if not success:
+            QMessageBox.critical(self, "خطا", message)
+        return success
             
     def reset_to_defaults(self):
         """Reset all settings to default values"""
@@ -665,8 +876,12 @@ class SettingsDialog(QDialog):
             self.load_default_settings()
             QMessageBox.information(self, "موفقیت", "تنظیمات به حالت پیش‌فرض بازگردانده شد")
             
+    def done(self, result):
+        """Let a running maintenance task finish before the dialog is destroyed"""
+        self.database_tab.release()
+        super().done(result)
+        
     def load_default_settings(self):
         """Load default settings"""
-        # Reset all tabs to default values
-        # This is a placeholder - implement actual default loading
-        pass
\ No newline at end of file
+        # Defaults are only shown; they are saved on apply
+        self.load_settings(default_settings())
\ No newline at end of file